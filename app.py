@@ -1,8 +1,14 @@
 import streamlit as st
-from core.file_handler import save_uploaded_files
+from core.file_handler import ingest_uploaded_files, load_image_hashes
 from core.image_processor import remove_duplicates
+from core.dedup_index import HASH_FUNCTIONS
 from core.ocr_handler import process_images, flexible_name_match
-from core.result_handler import download_results
+from core.result_handler import (download_results, build_result_records, match_result_records, render_record,
+                                 make_result_record, remove_stale_exports)
+from core.engine_pool import get_engine_pool
+from core.worker_pool import DEFAULT_NUM_WORKERS, DEFAULT_THREADS_PER_WORKER
+from core.result_cache import get_result_cache
+from core.text_index import OCRTextIndex, PINYIN_AVAILABLE
 import json
 import os
 from rich.console import Console
@@ -24,6 +30,19 @@ log = logging.getLogger("rich")
 
 CONFIG_FILE = "app_config.json"
 UPLOAD_FOLDER = "upload"
+CACHE_FOLDER = "ocr_cache"  # OCR 结果缓存目录
+# 导出的压缩包放在 Streamlit 静态文件目录中，由静态文件路由分块发送给浏览器，
+# 需要 .streamlit/config.toml 中的 server.enableStaticServing
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+EXPORT_FOLDER = os.path.join(STATIC_FOLDER, "exports")
+
+# OCR 处理模式
+PIPELINE_MODES = {
+    'serial': '逐张处理',
+    'batched': '批量处理',
+    'workers': '多进程处理 (仅CPU)',
+    'roi': '只找名字 (找到即停止识别)',
+}
 
 # 检查CUDA是否可用
 use_gpu = paddle.is_compiled_with_cuda()
@@ -64,8 +83,28 @@ def main():
         st.title("配置参数")
         user_name = st.text_input("请输入你的名字", value=config.get('user_name', ''))
         similarity_threshold = st.slider("图片相似度阈值", 80, 100, config.get('similarity_threshold', 95))
+        hash_methods = list(HASH_FUNCTIONS)
+        hash_method = st.selectbox("去重哈希算法", hash_methods,
+                                   index=hash_methods.index(config.get('hash_method', 'average')))
         name_match_threshold = st.slider("名字匹配阈值", 60, 100, config.get('name_match_threshold', 80))
+        use_pinyin = st.checkbox("重新匹配时包含同音字", value=config.get('use_pinyin', False) and PINYIN_AVAILABLE,
+                                 disabled=not PINYIN_AVAILABLE,
+                                 help="按拼音匹配识别成同音字的名字，需要安装 pypinyin")
         ocr_lang = st.selectbox("OCR 语言", ["ch", "en"], index=0 if config.get('ocr_lang', 'ch') == 'ch' else 1)
+        pipeline_modes = list(PIPELINE_MODES)
+        pipeline_mode = st.selectbox("处理模式", pipeline_modes, format_func=PIPELINE_MODES.get,
+                                     index=pipeline_modes.index(config.get('pipeline_mode', 'serial')))
+        num_workers = config.get('num_workers', DEFAULT_NUM_WORKERS)
+        threads_per_worker = config.get('threads_per_worker', DEFAULT_THREADS_PER_WORKER)
+        if pipeline_mode == 'workers':
+            cpu_count = os.cpu_count() or 1
+            num_workers = st.number_input("OCR 进程数", 1, cpu_count, min(num_workers, cpu_count))
+            threads_per_worker = st.number_input("每个进程的线程数", 1, cpu_count, min(threads_per_worker, cpu_count))
+        use_cache = st.checkbox("使用 OCR 结果缓存", value=config.get('use_cache', True))
+        adaptive_resolution = st.checkbox("自适应检测分辨率", value=config.get('adaptive_resolution', False))
+        reduced_decode = st.checkbox("大图 JPEG 缩小解码", value=config.get('reduced_decode', False))
+        name_lexicon = st.checkbox("名字词典约束识别", value=config.get('name_lexicon', False),
+                                   help="只包含名字的文本行按名字词典解码，不支持多进程模式")
         use_gpu_option = st.checkbox("使用 GPU 加速 (如果可用)", value=use_gpu)
         gpu_id = 0
         if use_gpu_option and use_gpu:
@@ -76,8 +115,17 @@ def main():
             new_config = {
                 'user_name': user_name,
                 'similarity_threshold': similarity_threshold,
+                'hash_method': hash_method,
                 'name_match_threshold': name_match_threshold,
-                'ocr_lang': ocr_lang
+                'use_pinyin': use_pinyin,
+                'ocr_lang': ocr_lang,
+                'pipeline_mode': pipeline_mode,
+                'num_workers': num_workers,
+                'threads_per_worker': threads_per_worker,
+                'use_cache': use_cache,
+                'adaptive_resolution': adaptive_resolution,
+                'reduced_decode': reduced_decode,
+                'name_lexicon': name_lexicon
             }
             save_config(new_config)
             st.success("配置已保存")
@@ -93,8 +141,17 @@ def main():
     # 存储当前配置到session state
     st.session_state['user_name'] = user_name
     st.session_state['similarity_threshold'] = similarity_threshold
+    st.session_state['hash_method'] = hash_method
     st.session_state['name_match_threshold'] = name_match_threshold
+    st.session_state['use_pinyin'] = use_pinyin
     st.session_state['ocr_lang'] = ocr_lang
+    st.session_state['pipeline_mode'] = pipeline_mode
+    st.session_state['num_workers'] = num_workers
+    st.session_state['threads_per_worker'] = threads_per_worker
+    st.session_state['use_cache'] = use_cache
+    st.session_state['adaptive_resolution'] = adaptive_resolution
+    st.session_state['reduced_decode'] = reduced_decode
+    st.session_state['name_lexicon'] = name_lexicon
     st.session_state['use_gpu'] = use_gpu_option and use_gpu
     st.session_state['gpu_id'] = gpu_id
 
@@ -112,10 +169,12 @@ def show_upload_page():
     uploaded_files = st.file_uploader("上传图片", accept_multiple_files=True, type=['png', 'jpg', 'jpeg'])
     
     if uploaded_files:
-        saved_files = save_uploaded_files(uploaded_files, UPLOAD_FOLDER)
+        saved_files, ingest_stats = ingest_uploaded_files(uploaded_files, UPLOAD_FOLDER)
         st.session_state['uploaded_files'] = saved_files
         log_success(f"成功上传并保存了 {len(saved_files)} 个文件到 {UPLOAD_FOLDER} 目录")
         st.success(f"成功上传 {len(saved_files)} 个文件！")
+        st.caption(f"新增 {ingest_stats.new_files} 个文件，共 {ingest_stats.total_bytes / (1024 * 1024):.1f}MB，"
+                   f"保存速度 {ingest_stats.mb_per_second:.1f}MB/s")
         st.info("请前往 '2. 处理材料' 步骤继续操作。")
 
 def show_process_page():
@@ -128,6 +187,10 @@ def show_process_page():
 
     show_ocr_results = st.checkbox("显示详细的 OCR 结果", value=False)
 
+    if st.session_state.get('text_index_path') is not None:
+        if st.button("按当前名字重新匹配 (不重新OCR)", key="rematch_button"):
+            rematch_results()
+
     if st.button("开始处理", key="process_button"):
         with st.spinner("正在处理中..."):
             progress_bar = st.progress(0)
@@ -136,33 +199,56 @@ def show_process_page():
                 # 去重
                 log_info("开始去重处理")
                 progress_bar.progress(25)
-                unique_images = remove_duplicates(
+                # 上传时已计算的哈希记录在清单中，这些图片不再解码
+                known_hashes = load_image_hashes(st.session_state['uploaded_files'],
+                                                 st.session_state['hash_method'])
+                unique_files = remove_duplicates(
                     st.session_state['uploaded_files'], 
                     "",  # 不再使用文件夹路径
-                    st.session_state['similarity_threshold']
+                    st.session_state['similarity_threshold'],
+                    hash_method=st.session_state['hash_method'],
+                    known_hashes=known_hashes
                 )
                 
                 # OCR 处理
                 log_info("开始OCR处理")
                 progress_bar.progress(50)
                 ocr_result = process_images(
-                    unique_images, 
+                    unique_files, 
                     st.session_state['user_name'],
                     st.session_state['ocr_lang'],
                     st.session_state['use_gpu'],
                     st.session_state['gpu_id'],
-                    st.session_state['name_match_threshold']
+                    st.session_state['name_match_threshold'],
+                    pipeline_mode=st.session_state['pipeline_mode'],
+                    num_workers=st.session_state['num_workers'],
+                    threads_per_worker=st.session_state['threads_per_worker'],
+                    use_cache=st.session_state['use_cache'],
+                    cache_dir=CACHE_FOLDER,
+                    adaptive_resolution=st.session_state['adaptive_resolution'],
+                    reduced_decode=st.session_state['reduced_decode'],
+                    name_lexicon=st.session_state['name_lexicon']
                 )
-                processed_images = ocr_result.processed_images
+                match_results = ocr_result.match_results
                 all_ocr_results = ocr_result.ocr_results
+                roi_stats = [result['roi_stats'] for result in ocr_result.individual_ocr_results
+                             if 'roi_stats' in result]
+                # 每次处理都会保存新的文本索引，会话之前的索引文件不再使用
+                previous_index_path = st.session_state.get('text_index_path')
+                if previous_index_path and previous_index_path != ocr_result.text_index_path \
+                        and os.path.exists(previous_index_path):
+                    os.remove(previous_index_path)
+                st.session_state['text_index_path'] = ocr_result.text_index_path
+                st.session_state['processed_files'] = unique_files
                 
                 # 显示详细的OCR和匹配结果
                 if show_ocr_results:
                     st.subheader("OCR 和匹配结果")
-                    for idx, (ocr_result, processed_image) in enumerate(zip(all_ocr_results, processed_images)):
-                        img, is_matched, _ = processed_image
-                        with st.expander(f"图片 {idx+1} {'(匹配)' if is_matched else '(未匹配)'}"):
-                            st.image(img, caption=f"图片 {idx+1}", use_column_width=True)
+                    for idx, (ocr_result, match_result) in enumerate(zip(all_ocr_results, match_results)):
+                        record = make_result_record(unique_files[idx], match_result)
+                        with st.expander(f"图片 {idx+1} {'(匹配)' if record.is_matched else '(未匹配)'}"):
+                            # 逐张从原文件加载并标注，不保留整批图片
+                            st.image(render_record(record), caption=f"图片 {idx+1}", use_column_width=True)
                             st.text_area("OCR 结果", value="\n".join([item['text'] for item in ocr_result]), height=100)
                             
                             # 显示匹配结果
@@ -180,20 +266,12 @@ def show_process_page():
                 # 分离结果
                 log_info("分离处理结果")
                 progress_bar.progress(75)
-                matched = []
-                unmatched = []
-                for item in processed_images:
-                    if isinstance(item, tuple) and len(item) >= 2:
-                        img, is_matched = item[:2]
-                        if is_matched:
-                            matched.append(img)
-                        else:
-                            unmatched.append(img)
-                    else:
-                        log_error(f"Unexpected item format in processed_images: {item}")
+                # 只保存原图路径和匹配位置，预览和导出时再加载图片
+                matched, unmatched = build_result_records(unique_files, match_results)
 
                 st.session_state['matched'] = matched
                 st.session_state['unmatched'] = unmatched
+                remove_export()  # 结果已变化，之前导出的压缩包作废
                 
                 progress_bar.progress(100)
             
@@ -206,13 +284,60 @@ def show_process_page():
                     st.metric("匹配材料数量", len(matched))
                 with col2:
                     st.metric("未匹配材料数量", len(unmatched))
+                if roi_stats:
+                    detected = sum(stats['detected'] for stats in roi_stats)
+                    skipped = sum(stats['skipped'] for stats in roi_stats)
+                    st.caption(f"共检测到 {detected} 个文本行，找到名字后跳过识别 {skipped} 个")
                 
                 st.success("处理完成！")
                 st.info("请前往 '3. 查看结果' 步骤查看处理结果。")
+                show_engine_stats()
             except Exception as e:
                 log_error(f"处理过程中出现错误: {str(e)}")
                 st.error(f"处理过程中出现错误: {str(e)}")
 
+def rematch_results():
+    if not st.session_state['user_name'].strip():
+        st.warning("请先在侧边栏输入名字！")
+        return
+    log_info("使用文本索引重新匹配")
+    try:
+        text_index = OCRTextIndex.load(st.session_state['text_index_path'])
+    except (OSError, ValueError, KeyError) as e:
+        log_error(f"读取文本索引时出现错误: {str(e)}")
+        st.error("文本索引已失效，请重新处理材料。")
+        return
+    matched, unmatched = match_result_records(
+        text_index,
+        st.session_state['processed_files'],
+        st.session_state['user_name'].strip(),
+        st.session_state['name_match_threshold'],
+        use_pinyin=st.session_state['use_pinyin']
+    )
+    st.session_state['matched'] = matched
+    st.session_state['unmatched'] = unmatched
+    remove_export()  # 结果已变化，之前导出的压缩包作废
+    log_success("重新匹配完成！")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("匹配材料数量", len(st.session_state['matched']))
+    with col2:
+        st.metric("未匹配材料数量", len(st.session_state['unmatched']))
+    st.info("请前往 '3. 查看结果' 步骤查看处理结果。")
+
+def show_engine_stats():
+    pool = get_engine_pool()
+    with st.expander("OCR 引擎状态"):
+        st.write(f"引擎复用次数: {pool.hits}，新建次数: {pool.misses}，淘汰次数: {pool.evictions}")
+        for stats in pool.stats():
+            st.write(f"- {stats.key['lang']} / {'GPU' if stats.key['use_gpu'] else 'CPU'}: "
+                     f"冷启动 {stats.cold_start_seconds:.2f}s，预热 {stats.warmup_seconds:.2f}s，"
+                     f"约 {stats.memory_mb:.0f}MB，已使用 {stats.uses} 次")
+        cache_stats = get_result_cache(CACHE_FOLDER).stats()
+        st.write(f"OCR 结果缓存: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+                 f"共 {cache_stats['entries']} 条 ({cache_stats['size_mb']:.1f}MB)")
+
 def show_results_page():
     log_step("3. 查看结果")
     st.header("3. 查看结果")
@@ -231,13 +356,25 @@ def show_results_page():
 
     if st.button("下载结果", key="download_button"):
         try:
-            download_results(st.session_state['matched'], st.session_state['unmatched'])
-            log_success("结果下载成功！")
-            st.success("结果下载成功！")
+            # 每个会话只保留最近一次导出的压缩包，其他会话遗留的过期压缩包一并清理
+            remove_export()
+            remove_stale_exports(EXPORT_FOLDER)
+            os.makedirs(EXPORT_FOLDER, exist_ok=True)
+            with st.spinner("正在打包结果..."):
+                st.session_state['export_path'] = download_results(
+                    st.session_state['matched'], st.session_state['unmatched'], output_dir=EXPORT_FOLDER)
+            log_success("结果打包成功！")
         except Exception as e:
             log_error(f"下载结果时出现错误: {str(e)}")
             st.error(f"下载结果时出现错误: {str(e)}")
 
+    export_path = st.session_state.get('export_path')
+    if export_path and os.path.exists(export_path):
+        # 浏览器直接从静态文件路由下载，压缩包不会被读入内存
+        export_url = f"app/static/exports/{os.path.basename(export_path)}"
+        st.markdown(f'<a href="{export_url}" download="results.zip">保存 results.zip</a> '
+                    f'({os.path.getsize(export_path) / (1024 * 1024):.1f}MB)', unsafe_allow_html=True)
+
     # 预览结果
     st.subheader("结果预览")
     preview_tab1, preview_tab2 = st.tabs(["匹配的材料", "未匹配的材料"])
@@ -248,23 +385,31 @@ def show_results_page():
     with preview_tab2:
         show_image_preview(st.session_state['unmatched'], "未匹配")
 
-def show_image_preview(images, category):
-    if not images:
+def remove_export():
+    export_path = st.session_state.pop('export_path', None)
+    if export_path and os.path.exists(export_path):
+        os.remove(export_path)
+
+def show_image_preview(records, category):
+    if not records:
         st.info(f"没有{category}的材料")
         return
     
     cols = st.columns(3)
-    for idx, img in enumerate(images[:9]):  # 只显示前9张图片
+    for idx, record in enumerate(records[:9]):  # 只显示前9张图片
         with cols[idx % 3]:
-            if isinstance(img, (tuple, list)):
-                img = img[0] if len(img) > 0 else None
+            try:
+                img = render_record(record)
+            except Exception as e:
+                log_error(f"加载{category}材料 {idx+1} 时出错: {str(e)}")
+                img = None
             if img is not None:
                 st.image(img, caption=f"{category}材料 {idx+1}", use_column_width=True)
             else:
                 st.write(f"无法显示 {category}材料 {idx+1}")
     
-    if len(images) > 9:
-        st.info(f"还有 {len(images) - 9} 张{category}材料未显示")
+    if len(records) > 9:
+        st.info(f"还有 {len(records) - 9} 张{category}材料未显示")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,133 @@
+"""CTC 解码性能测试。
+
+用随机生成的识别输出（[B, T, 类别数]）比较逐行解码和批量向量化解码，
+并校验两者的文本和置信度完全一致；另外在带有形近字干扰的名字上比较
+贪心、束搜索和名单词典约束束搜索的吞吐量和准确率。
+
+用法:
+    python benchmarks/bench_ctc_decode.py --batch_sizes 6 64 256 --steps 40 --beam_width 10
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.postprocess.rec_postprocess import BaseRecLabelDecode, CTCLabelDecode
+
+console = Console()
+
+DEFAULT_DICT_PATH = os.path.join(PROJECT_DIR, 'ppocr', 'utils', 'ppocr_keys_v1.txt')
+
+
+def make_preds(batch_size, steps, num_classes, seed=0):
+    # 大部分时间步是空白，其余随机字符，并带有连续重复，接近真实的 CTC 输出
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(1, num_classes, (batch_size, steps))
+    labels[rng.random((batch_size, steps)) < 0.5] = 0
+    repeat = rng.random((batch_size, steps)) < 0.3
+    labels[:, 1:][repeat[:, 1:]] = labels[:, :-1][repeat[:, 1:]]
+    preds = rng.random((batch_size, steps, num_classes)).astype(np.float32) * 0.1
+    np.put_along_axis(preds, labels[:, :, None], 1.0, axis=2)
+    return preds / preds.sum(axis=2, keepdims=True)
+
+
+def make_name_preds(names, decoder, noise_rate, seed=0):
+    # 每个字占两个时间步加一个空白；按 noise_rate 把部分字的概率分给一个随机的干扰字，
+    # 干扰字概率略高于正确字，贪心解码会选错
+    rng = np.random.default_rng(seed)
+    num_classes = len(decoder.character)
+    steps = max(len(name) for name in names) * 3
+    preds = np.full((len(names), steps, num_classes), 1e-4, dtype=np.float32)
+    for row, name in enumerate(names):
+        preds[row, :, 0] = 0.9
+        for i, char in enumerate(name):
+            idx = decoder.dict[char]
+            for t in (3 * i, 3 * i + 1):
+                preds[row, t, 0] = 1e-4
+                if rng.random() < noise_rate:
+                    preds[row, t, idx] = 0.45
+                    preds[row, t, rng.integers(1, num_classes)] = 0.5
+                else:
+                    preds[row, t, idx] = 0.9
+    return preds / preds.sum(axis=2, keepdims=True)
+
+
+def legacy_decode(decoder, preds_idx, preds_prob):
+    # 原来的逐行解码路径
+    return BaseRecLabelDecode.decode(decoder, list(preds_idx), list(preds_prob), is_remove_duplicate=True)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CTC 解码性能测试")
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[6, 64, 256])
+    parser.add_argument('--steps', type=int, default=40)
+    parser.add_argument('--dict_path', default=DEFAULT_DICT_PATH)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--beam_width', type=int, default=10)
+    parser.add_argument('--names', type=int, default=200, help="名单人数")
+    parser.add_argument('--noise_rate', type=float, default=0.1, help="被干扰的时间步比例")
+    args = parser.parse_args()
+
+    decoder = CTCLabelDecode(args.dict_path, use_space_char=True)
+    decoder.get_char_table()
+    table = Table(title=f"CTC 贪心解码耗时 ({len(decoder.character)} 类, {args.steps} 步)")
+    table.add_column("批大小", justify="right")
+    table.add_column("逐行 (ms)", justify="right")
+    table.add_column("批量 (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("结果一致")
+
+    for batch_size in args.batch_sizes:
+        preds = make_preds(batch_size, args.steps, len(decoder.character))
+        # argmax 两条路径相同，只比较解码本身
+        preds_idx, preds_prob = preds.argmax(axis=2), preds.max(axis=2)
+        legacy, legacy_time = timed(lambda: legacy_decode(decoder, preds_idx, preds_prob), args.repeat)
+        batched, batched_time = timed(lambda: decoder.decode_batch(preds_idx, preds_prob, is_remove_duplicate=True),
+                                      args.repeat)
+        table.add_row(str(batch_size), f"{legacy_time:.2f}", f"{batched_time:.2f}",
+                      f"{legacy_time / batched_time:.1f}x", "是" if legacy == batched else "否")
+
+    console.print(table)
+    bench_beam(args.dict_path, args.names, args.beam_width, args.noise_rate, args.repeat)
+
+
+def bench_beam(dict_path, num_names, beam_width, noise_rate, repeat):
+    decoders = {
+        "greedy": CTCLabelDecode(dict_path, use_space_char=True),
+        "beam": CTCLabelDecode(dict_path, use_space_char=True, decode_mode="beam", beam_width=beam_width),
+        "lexicon": CTCLabelDecode(dict_path, use_space_char=True, decode_mode="lexicon", beam_width=beam_width),
+    }
+    # 从字典中的常用汉字随机组成 2-4 字的名单
+    rng = np.random.default_rng(0)
+    chars = [char for char in decoders["greedy"].character[1:3000] if '\u4e00' <= char <= '\u9fa5']
+    names = ["".join(rng.choice(chars, rng.integers(2, 5))) for _ in range(num_names)]
+    decoders["lexicon"].set_lexicon(names)
+    preds = make_name_preds(names, decoders["greedy"], noise_rate)
+
+    table = Table(title=f"名字识别解码 ({num_names} 人, 束宽 {beam_width}, 干扰比例 {noise_rate:.0%})")
+    table.add_column("模式")
+    table.add_column("耗时 (ms)", justify="right")
+    table.add_column("吞吐量 (行/秒)", justify="right")
+    table.add_column("准确率", justify="right")
+    for mode, decoder in decoders.items():
+        result, elapsed = timed(lambda: decoder(preds), max(1, repeat // 5))
+        accuracy = np.mean([text == name for (text, _), name in zip(result, names)])
+        table.add_row(mode, f"{elapsed:.1f}", f"{len(names) / elapsed * 1000:.0f}", f"{accuracy:.1%}")
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
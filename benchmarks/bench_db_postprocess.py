@@ -0,0 +1,123 @@
+"""DB 后处理性能测试。
+
+在合成的概率图（大量随机旋转的文本框）上比较 DBPostProcess 逐轮廓处理的
+contour 模式和批量处理的 batched 模式，并检查两者输出的框是否完全相同；
+另外比较 box_score_fast 与积分图打分（逐框和向量化）的耗时和最大误差。
+
+用法:
+    python benchmarks/bench_db_postprocess.py --boxes 200 500 1000 --size 1280
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.postprocess.db_postprocess import DBPostProcess, IntegralBoxScorer
+
+console = Console()
+
+
+def make_prob_map(num_boxes, size, seed=0):
+    # 按网格排布互不重叠、略有旋转的文本行，模拟密集的证书扫描件
+    rng = np.random.default_rng(seed)
+    prob = rng.uniform(0, 0.2, (size, size)).astype(np.float32)
+    cols = max(1, int(np.sqrt(num_boxes / 4)))
+    rows = int(np.ceil(num_boxes / cols))
+    cell_w, cell_h = size / cols, size / rows
+    for i in range(num_boxes):
+        row, col = divmod(i, cols)
+        center = ((col + 0.5) * cell_w, (row + 0.5) * cell_h)
+        box_size = (rng.uniform(0.5, 0.9) * cell_w, rng.uniform(0.4, 0.6) * cell_h)
+        angle = rng.uniform(-3, 3)
+        points = cv2.boxPoints((center, box_size, angle)).astype(np.int32)
+        cv2.fillPoly(prob, [points], float(rng.uniform(0.6, 0.95)))
+    return cv2.GaussianBlur(prob, (3, 3), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 后处理性能测试")
+    parser.add_argument('--boxes', type=int, nargs='+', default=[200, 500, 1000])
+    parser.add_argument('--size', type=int, default=1280)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    table = Table(title=f"DB 后处理耗时 ({args.size}x{args.size} 概率图)")
+    table.add_column("文本框数", justify="right")
+    table.add_column("contour 框数", justify="right")
+    table.add_column("batched 框数", justify="right")
+    table.add_column("contour (ms)", justify="right")
+    table.add_column("batched (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("输出一致", justify="right")
+
+    for num_boxes in args.boxes:
+        prob = make_prob_map(num_boxes, args.size)
+        outs_dict = {"maps": prob[None, None]}
+        shape_list = [(args.size, args.size, 1.0, 1.0)]
+
+        results = {}
+        timings = {}
+        for mode in ["contour", "batched"]:
+            post_process = DBPostProcess(thresh=0.3, box_thresh=0.6, unclip_ratio=1.5, postprocess_mode=mode)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results[mode] = post_process(outs_dict, shape_list)[0]["points"]
+            timings[mode] = (time.perf_counter() - start) / args.repeat * 1000
+
+        same = np.array_equal(results["contour"], results["batched"])
+        table.add_row(str(num_boxes), str(len(results["contour"])), str(len(results["batched"])),
+                      f"{timings['contour']:.1f}", f"{timings['batched']:.1f}",
+                      f"{timings['contour'] / timings['batched']:.1f}x", "是" if same else "否")
+
+    console.print(table)
+    bench_scoring(args.boxes, args.size, args.repeat)
+
+
+def bench_scoring(box_counts, size, repeat):
+    table = Table(title="文本框打分耗时")
+    table.add_column("文本框数", justify="right")
+    table.add_column("fast (ms)", justify="right")
+    table.add_column("integral 逐框 (ms)", justify="right")
+    table.add_column("integral 向量化 (ms)", justify="right")
+    table.add_column("最大误差", justify="right")
+
+    post_process = DBPostProcess()
+    for num_boxes in box_counts:
+        prob = make_prob_map(num_boxes, size)
+        contours, _ = cv2.findContours(((prob > 0.3) * 255).astype(np.uint8), cv2.RETR_LIST,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        quads = np.array([post_process.get_mini_boxes(contour)[0] for contour in contours], dtype=np.float32)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fast_scores = np.array([post_process.box_score_fast(prob, quad) for quad in quads])
+        fast_time = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scorer = IntegralBoxScorer(prob)
+            integral_scores = np.array([scorer.score(quad) for quad in quads])
+        integral_time = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            vector_scores = IntegralBoxScorer(prob).score_quads(quads)
+        vector_time = (time.perf_counter() - start) / repeat * 1000
+
+        error = max(np.abs(integral_scores - fast_scores).max(initial=0),
+                    np.abs(vector_scores - fast_scores).max(initial=0))
+        table.add_row(str(len(quads)), f"{fast_time:.1f}", f"{integral_time:.1f}", f"{vector_time:.1f}",
+                      f"{error:.2e}")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""图片去重索引性能测试。
+
+用合成的 64 位哈希（包含成簇的近似重复）比较逐个比较的旧算法和多索引哈希，
+并校验两者保留的图片完全一致。
+
+指定 --image_dir 时另外测试并行解码+哈希阶段在不同线程数下的耗时。
+
+用法:
+    python benchmarks/bench_dedup.py --sizes 10000 100000 --similarity_threshold 95
+    python benchmarks/bench_dedup.py --sizes 10000 --image_dir upload --workers 1 2 4 8
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from core.dedup_index import find_unique
+from core.image_processor import hash_images, get_files_from_folder
+
+console = Console()
+
+
+def make_hashes(count, duplicate_ratio=0.3, max_flips=6, seed=0):
+    rng = np.random.default_rng(seed)
+    hashes = []
+    for _ in range(count):
+        if hashes and rng.random() < duplicate_ratio:
+            value = hashes[rng.integers(len(hashes))]
+            for bit in rng.choice(64, size=rng.integers(0, max_flips + 1), replace=False):
+                value ^= 1 << int(bit)
+        else:
+            value = int(rng.integers(0, 2 ** 63, dtype=np.int64)) << 1 | int(rng.integers(2))
+        hashes.append(value)
+    return hashes
+
+
+def legacy_find_unique(hash_values, max_distance):
+    # 与原 remove_duplicates 相同：逐个与已保留的哈希比较
+    kept = []
+    kept_hashes = []
+    for i, value in enumerate(hash_values):
+        if not any((value ^ existing).bit_count() <= max_distance for existing in kept_hashes):
+            kept.append(i)
+            kept_hashes.append(value)
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片去重索引性能测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--similarity_threshold', type=int, default=95)
+    parser.add_argument('--legacy_limit', type=int, default=20000,
+                        help="超过该数量时跳过旧算法（平方复杂度）")
+    parser.add_argument('--image_dir', default=None)
+    parser.add_argument('--hash_method', default='average')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    max_distance = 99 - args.similarity_threshold
+    table = Table(title=f"去重耗时 (相似度阈值 {args.similarity_threshold})")
+    table.add_column("图片数", justify="right")
+    table.add_column("保留数", justify="right")
+    table.add_column("旧算法 (s)", justify="right")
+    table.add_column("索引 (s)", justify="right")
+    table.add_column("结果一致")
+
+    for size in args.sizes:
+        hashes = make_hashes(size)
+
+        start = time.perf_counter()
+        kept, _ = find_unique(hashes, max_distance)
+        indexed_time = time.perf_counter() - start
+
+        legacy_time, same = "-", "-"
+        if size <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy_kept = legacy_find_unique(hashes, max_distance)
+            legacy_time = f"{time.perf_counter() - start:.2f}"
+            same = "是" if legacy_kept == kept else "否"
+
+        table.add_row(str(size), str(len(kept)), legacy_time, f"{indexed_time:.2f}", same)
+
+    console.print(table)
+
+    if args.image_dir:
+        bench_hashing(get_files_from_folder(args.image_dir), args.hash_method, args.workers)
+
+
+def bench_hashing(file_paths, hash_method, worker_counts):
+    table = Table(title=f"解码+哈希耗时 ({len(file_paths)} 张图片, {hash_method})")
+    table.add_column("线程数", justify="right")
+    table.add_column("耗时 (s)", justify="right")
+    table.add_column("图片/秒", justify="right")
+
+    for workers in worker_counts:
+        start = time.perf_counter()
+        for _ in hash_images(file_paths, hash_method, max_workers=workers):
+            pass
+        elapsed = time.perf_counter() - start
+        table.add_row(str(workers), f"{elapsed:.2f}", f"{len(file_paths) / elapsed:.1f}")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""检测评估性能测试。
+
+在合成的评估集（每张图若干文本框，检测结果带有抖动、漏检、误检和不关心区域）上
+比较 DetectionIoUEvaluator 的 shapely 逐对计算和 vectorized 后端（可选进程池），
+并校验每张图的统计量和最终 precision/recall/hmean 完全一致。
+
+用法:
+    python benchmarks/bench_det_eval.py --images 2000 --boxes 30 --workers 0 4
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.metrics.eval_det_iou import DetectionIoUEvaluator
+
+console = Console()
+
+
+def make_dataset(num_images, num_boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    gts, preds = [], []
+    for _ in range(num_images):
+        gt, pred = [], []
+        for i in range(num_boxes):
+            # 每行一个文本框，模拟证书上的逐行文字
+            center = (rng.uniform(100, 900), (i + 0.5) * 1000 / num_boxes)
+            size = (rng.uniform(80, 400), rng.uniform(0.5, 0.8) * 1000 / num_boxes)
+            angle = rng.uniform(-5, 5)
+            points = cv2.boxPoints((center, size, angle))
+            gt.append({"points": points, "text": "", "ignore": bool(rng.random() < 0.05)})
+            if rng.random() < 0.9:
+                jitter = rng.normal(0, size[1] * 0.15, (4, 2)).astype(np.float32)
+                pred.append({"points": points + jitter, "text": ""})
+        for _ in range(max(1, num_boxes // 10)):
+            points = cv2.boxPoints(((rng.uniform(0, 1000), rng.uniform(0, 1000)), (60, 20), 0))
+            pred.append({"points": points, "text": ""})
+        gts.append(gt)
+        preds.append(pred)
+    return gts, preds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测评估性能测试")
+    parser.add_argument('--images', type=int, default=2000)
+    parser.add_argument('--boxes', type=int, default=30, help="每张图的文本框数")
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 4], help="vectorized 后端的进程数")
+    args = parser.parse_args()
+
+    gts, preds = make_dataset(args.images, args.boxes)
+    table = Table(title=f"检测评估耗时 ({args.images} 张图, 每张 {args.boxes} 个文本框)")
+    table.add_column("后端")
+    table.add_column("进程数", justify="right")
+    table.add_column("耗时 (s)", justify="right")
+    table.add_column("张/秒", justify="right")
+    table.add_column("hmean", justify="right")
+    table.add_column("结果一致")
+
+    baseline = DetectionIoUEvaluator(backend="shapely")
+    start = time.perf_counter()
+    reference = baseline.evaluate_images(gts, preds)
+    elapsed = time.perf_counter() - start
+    reference_metrics = baseline.combine_results(reference)
+    table.add_row("shapely", "0", f"{elapsed:.2f}", f"{args.images / elapsed:.0f}",
+                  f"{reference_metrics['hmean']:.5f}", "-")
+
+    for workers in args.workers:
+        evaluator = DetectionIoUEvaluator(backend="vectorized", num_workers=workers)
+        start = time.perf_counter()
+        results = evaluator.evaluate_images(gts, preds)
+        elapsed = time.perf_counter() - start
+        evaluator.close()
+        metrics = evaluator.combine_results(results)
+        same = results == reference and metrics == reference_metrics
+        table.add_row("vectorized", str(workers), f"{elapsed:.2f}", f"{args.images / elapsed:.0f}",
+                      f"{metrics['hmean']:.5f}", "是" if same else "否")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
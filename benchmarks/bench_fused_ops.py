@@ -0,0 +1,94 @@
+"""检测预处理算子融合性能测试。
+
+比较 DecodeImage -> NormalizeImage -> ToCHWImage 分步执行和 create_operators
+自动融合成的 NormalizeToCHWImage 的耗时与峰值内存，并校验输出一致（允许浮点误差）。
+
+用法:
+    python benchmarks/bench_fused_ops.py --sizes 960 1920 4000 --repeat 10
+"""
+import os
+import sys
+import copy
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import paddleocr
+# ppocr.data 依赖 PaddleOCR 的 tools 包，使用 pip 安装的 paddleocr 中的版本
+sys.path.append(os.path.dirname(paddleocr.__file__))
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.data.imaug import create_operators, transform
+
+console = Console()
+
+# 与 PP-OCR 检测推理配置相同的预处理（去掉了缩放，单独比较解码和归一化）
+OPS_CONFIG = [
+    {'DecodeImage': {'img_mode': 'RGB', 'channel_first': False}},
+    {'NormalizeImage': {'std': [0.229, 0.224, 0.225], 'mean': [0.485, 0.456, 0.406],
+                        'scale': '1./255.', 'order': 'hwc'}},
+    {'ToCHWImage': None},
+]
+
+
+def make_image(side, seed=0):
+    # 平滑背景加噪声，压缩后的大小接近真实照片
+    rng = np.random.default_rng(seed)
+    height, width = side * 3 // 4, side
+    base = cv2.resize(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8), (width, height),
+                      interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-8, 9, (height, width, 3))
+    img = np.clip(base.astype(np.int32) + noise, 0, 255).astype(np.uint8)
+    return cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def measure(ops, data, repeat):
+    tracemalloc.start()
+    result = transform({'image': data}, ops)['image']
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        transform({'image': data}, ops)
+    return result, (time.perf_counter() - start) / repeat * 1000, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测预处理算子融合性能测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[960, 1920, 4000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    separate_ops = create_operators(copy.deepcopy(OPS_CONFIG), fuse=False)
+    fused_ops = create_operators(copy.deepcopy(OPS_CONFIG), fuse=True)
+    console.print(f"融合后的算子: {[type(op).__name__ for op in fused_ops]}")
+
+    table = Table(title="解码 + 归一化 + HWC->CHW")
+    table.add_column("图片尺寸", justify="right")
+    table.add_column("分步 (ms)", justify="right")
+    table.add_column("融合 (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("分步峰值内存 (MB)", justify="right")
+    table.add_column("融合峰值内存 (MB)", justify="right")
+    table.add_column("最大误差", justify="right")
+
+    for side in args.sizes:
+        data = make_image(side)
+        ref, ref_time, ref_peak = measure(separate_ops, data, args.repeat)
+        fused, fused_time, fused_peak = measure(fused_ops, data, args.repeat)
+        max_err = float(np.abs(ref - fused).max())
+        table.add_row(f"{side}x{side * 3 // 4}", f"{ref_time:.1f}", f"{fused_time:.1f}",
+                      f"{ref_time / fused_time:.1f}x", f"{ref_peak:.1f}", f"{fused_peak:.1f}",
+                      f"{max_err:.1e}")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
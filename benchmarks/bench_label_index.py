@@ -0,0 +1,111 @@
+"""SimpleDataSet 标注索引性能测试。
+
+生成一个指向少量图片的大标注文件，比较 SimpleDataSet 读入全部标注行（默认方式）和
+use_label_index 编译标注索引两种方式：建立数据集的耗时、每个进程常驻的 Python 内存，
+以及随机读取样本（读取图片字节，不解码）的每秒样本数。
+
+用法:
+    python benchmarks/bench_label_index.py --lines 1000000 --reads 50000
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+import cv2
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import paddleocr
+# ppocr.data 依赖 PaddleOCR 的 tools 包，使用 pip 安装的 paddleocr 中的版本
+sys.path.append(os.path.dirname(paddleocr.__file__))
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.data.simple_dataset import SimpleDataSet
+
+console = Console()
+logger = logging.getLogger("bench_label_index")
+
+NUM_IMAGES = 256
+
+
+def make_label_file(root, num_lines, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(root, 'images'), exist_ok=True)
+    for i in range(NUM_IMAGES):
+        img = rng.integers(0, 256, (32, 100, 3), dtype=np.uint8)
+        cv2.imwrite(os.path.join(root, 'images', f"{i:04d}.jpg"), img)
+    label_file = os.path.join(root, 'label.txt')
+    image_ids = rng.integers(0, NUM_IMAGES, num_lines)
+    with open(label_file, 'w', encoding='utf-8') as f:
+        for i, image_id in enumerate(image_ids):
+            f.write(f"images/{image_id:04d}.jpg\t识别标签{i}\n")
+    return label_file
+
+
+def make_config(root, label_file, use_label_index):
+    dataset = {
+        'name': 'SimpleDataSet',
+        'data_dir': root,
+        'label_file_list': [label_file],
+        'use_label_index': use_label_index,
+        'transforms': [{'KeepKeys': {'keep_keys': ['image', 'label']}}],
+    }
+    return {'Global': {}, 'Eval': {'dataset': dataset, 'loader': {'shuffle': False}}}
+
+
+def build(root, label_file, use_label_index):
+    config = make_config(root, label_file, use_label_index)
+    start = time.perf_counter()
+    dataset = SimpleDataSet(config, 'Eval', logger)
+    elapsed = time.perf_counter() - start
+    # tracemalloc 会拖慢构建，内存单独再建一次测量（此时索引已经构建好）
+    del dataset
+    tracemalloc.start()
+    dataset = SimpleDataSet(make_config(root, label_file, use_label_index), 'Eval', logger)
+    memory = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+    return dataset, elapsed, memory
+
+
+def read_rate(dataset, indices):
+    start = time.perf_counter()
+    for idx in indices:
+        dataset[idx]
+    return len(indices) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SimpleDataSet 标注索引性能测试")
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--reads', type=int, default=50000)
+    args = parser.parse_args()
+
+    table = Table(title=f"SimpleDataSet 标注加载，{args.lines} 行")
+    table.add_column("方式")
+    table.add_column("建立数据集 (s)", justify="right")
+    table.add_column("常驻内存 (MB)", justify="right")
+    table.add_column("随机读取 (样本/秒)", justify="right")
+
+    with tempfile.TemporaryDirectory() as root:
+        console.print(f"[cyan]生成 {args.lines} 行标注...[/cyan]")
+        label_file = make_label_file(root, args.lines)
+        indices = np.random.default_rng(1).integers(0, args.lines, args.reads)
+
+        rows = [("逐行读入 (默认)", False), ("编译索引 (首次构建)", True), ("编译索引 (已构建)", True)]
+        for name, use_label_index in rows:
+            dataset, elapsed, memory = build(root, label_file, use_label_index)
+            rate = read_rate(dataset, indices)
+            table.add_row(name, f"{elapsed:.2f}", f"{memory:.1f}", f"{rate:,.0f}")
+            del dataset
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
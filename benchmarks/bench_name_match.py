@@ -0,0 +1,93 @@
+"""批量名字匹配性能测试。
+
+用合成的名单和OCR文本比较逐个调用 flexible_name_match 和批量 NameMatcher，
+并校验两者的综合分、是否匹配和最佳匹配名字完全一致。
+
+用法:
+    python benchmarks/bench_name_match.py --names 300 --texts 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from core.ocr_handler import flexible_name_match
+from core.name_matcher import NameMatcher
+
+console = Console()
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤"
+GIVEN_CHARS = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华玉萍红娥玲芬芳燕彩春菊兰凤洁梅琳素云莲真环雪荣爱妹霞香月莺媛艳瑞凡佳嘉琼勤珍贞莉桂娣叶璧璐娅琦晶妍茜秋珊莎锦黛青倩婷姣婉娴瑾颖露瑶怡婵雁蓓纨仪荷丹蓉眉君琴蕊薇菁梦岚苑婕馨瑗琰韵融园艺咏卿聪澜纯毓悦昭冰爽琬茗羽希宁欣飘育滢馥筠柔竹霭凝晓欢霄枫芸菲寒伊亚宜可姬舒影荔枝丽阳妮宝贝初程梵罡恒鸿桦骅剑娇纪宽苛灵玛媚琪晴容睿烁堂唯威韦雯苇萱阅彦宇雨洋忠宗曼紫逸贤蝶菡绿蓝儿翠烟小轩"
+FILLER = "学生姓名班级学号成绩考试语文数学英语第一二三四五六七八九十次期中末年月日签字备注"
+
+
+def make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2))))
+    return sorted(names)
+
+
+def make_texts(count, names, rng, names_per_text=3):
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(names_per_text):
+            parts.append("".join(rng.choice(FILLER) for _ in range(rng.randint(2, 6))))
+            parts.append(rng.choice(names) if rng.random() < 0.5 else "".join(rng.choice(GIVEN_CHARS) for _ in range(3)))
+            parts.append(" %d " % rng.randint(1, 100))
+        texts.append("".join(parts))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量名字匹配性能测试")
+    parser.add_argument('--names', type=int, default=300)
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--threshold', type=int, default=70)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_names(args.names, rng)
+    texts = make_texts(args.texts, names, rng)
+
+    start = time.perf_counter()
+    loop_results = [[flexible_name_match(name, text, args.threshold) for text in texts] for name in names]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = NameMatcher(texts)
+    index_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = matcher.match(names, args.threshold)
+    match_time = time.perf_counter() - start
+
+    loop_scores = np.array([[max([score for _, score in all_matches], default=0) for _, _, all_matches in row]
+                            for row in loop_results])
+    same = (np.array_equal(loop_scores, batch.scores)
+            and all(found == batch.matched[i, j] and best == batch.best_matches[i][j]
+                    for i, row in enumerate(loop_results)
+                    for j, (found, best, _) in enumerate(row)))
+
+    pairs = len(names) * len(texts)
+    table = Table(title=f"名字匹配耗时 ({len(names)} 个名字 × {len(texts)} 段文本, 候选词表 {len(matcher.vocab)})")
+    table.add_column("方法")
+    table.add_column("耗时 (s)", justify="right")
+    table.add_column("对/秒", justify="right")
+    table.add_row("逐个调用 flexible_name_match", f"{loop_time:.2f}", f"{pairs / loop_time:.0f}")
+    table.add_row("NameMatcher 建索引", f"{index_time:.2f}", "-")
+    table.add_row("NameMatcher 打分", f"{match_time:.2f}", f"{pairs / match_time:.0f}")
+    console.print(table)
+    console.print(f"结果一致: {'是' if same else '否'}, 匹配对数: {int(batch.matched.sum())}")
+
+
+if __name__ == '__main__':
+    main()
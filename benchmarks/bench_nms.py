@@ -0,0 +1,86 @@
+"""四边形 NMS 性能测试。
+
+在随机分布、互有重叠的旋转文本框上比较原来逐对构造 shapely 多边形的 NMS
+和网格索引 + 向量化四边形 IoU 的 NMS，框数不超过 --legacy_max 时校验两者保留的框完全一致。
+
+用法:
+    python benchmarks/bench_nms.py --boxes 1000 10000 50000 --legacy_max 1000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.postprocess.locality_aware_nms import intersection, nms, grid_candidate_pairs, quad_aabbs
+
+console = Console()
+
+
+def make_boxes(num_boxes, seed=0):
+    # 文本框密度固定（每个框平均约 40x40 的面积），框数越多图越大
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(num_boxes) * 40
+    centers = rng.uniform(0, size, (num_boxes, 2))
+    sizes = rng.uniform(20, 120, (num_boxes, 2)) * [1.0, 0.4]
+    angles = rng.uniform(-15, 15, num_boxes)
+    quads = np.array([cv2.boxPoints((tuple(c), tuple(s), a)) for c, s, a in zip(centers, sizes, angles)])
+    return np.concatenate([quads.reshape(num_boxes, 8), rng.random((num_boxes, 1))], axis=1)
+
+
+def legacy_nms(S, thres):
+    # 原来的实现：每保留一个框就与剩余的所有框逐个计算 shapely IoU
+    order = np.argsort(S[:, 8])[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+        order = order[np.where(ovr <= thres)[0] + 1]
+    return keep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="四边形 NMS 性能测试")
+    parser.add_argument('--boxes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--thresh', type=float, default=0.3)
+    parser.add_argument('--legacy_max', type=int, default=1000, help="超过该框数不再运行原实现")
+    args = parser.parse_args()
+
+    table = Table(title=f"NMS 耗时 (IoU 阈值 {args.thresh})")
+    table.add_column("框数", justify="right")
+    table.add_column("候选对数", justify="right")
+    table.add_column("保留框数", justify="right")
+    table.add_column("网格 NMS (ms)", justify="right")
+    table.add_column("原实现 (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("结果一致")
+
+    for num_boxes in args.boxes:
+        S = make_boxes(num_boxes)
+        num_pairs = len(grid_candidate_pairs(quad_aabbs(S[:, :8].reshape((-1, 4, 2)))))
+        start = time.perf_counter()
+        keep = nms(S, args.thresh)
+        grid_time = (time.perf_counter() - start) * 1000
+
+        legacy_cell, speedup_cell, same_cell = "-", "-", "-"
+        if num_boxes <= args.legacy_max:
+            start = time.perf_counter()
+            legacy_keep = legacy_nms(S, args.thresh)
+            legacy_time = (time.perf_counter() - start) * 1000
+            legacy_cell, speedup_cell = f"{legacy_time:.0f}", f"{legacy_time / grid_time:.0f}x"
+            same_cell = "是" if list(legacy_keep) == list(keep) else "否"
+        table.add_row(str(num_boxes), str(num_pairs), str(len(keep)), f"{grid_time:.0f}",
+                      legacy_cell, speedup_cell, same_cell)
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
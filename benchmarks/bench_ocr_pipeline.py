@@ -0,0 +1,99 @@
+"""OCR 流水线吞吐量测试。
+
+用法:
+    python benchmarks/bench_ocr_pipeline.py --image_dir upload --modes serial batched
+    python benchmarks/bench_ocr_pipeline.py --image_dir upload --modes workers --workers 1 2 4 8 --threads_per_worker 4
+"""
+import os
+import sys
+import time
+import argparse
+from functools import partial
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from core.image_processor import get_files_from_folder
+from core.engine_pool import get_engine_pool
+from core.batch_pipeline import iter_batched_ocr
+from core.worker_pool import OCRWorkerPool
+from core.ocr_handler import (build_engine_kwargs, resolve_model_paths, load_image,
+                              _iter_serial_ocr, CLS_CONFIG_PATH)
+
+console = Console()
+
+
+def run_mode(ocr, mode, images, batch_size, use_angle_cls=True):
+    load_fn = partial(load_image, det_limit_side_len=960, det_limit_type='max')
+    if mode == 'batched':
+        stream = iter_batched_ocr(ocr, images, load_fn, use_angle_cls, batch_size)
+    elif mode == 'workers':
+        stream = ocr.imap_ocr(images, 960, 'max', use_angle_cls)
+    else:
+        stream = _iter_serial_ocr(ocr, images, load_fn, use_angle_cls)
+
+    start = time.perf_counter()
+    lines = 0
+    for _, _, result, error in stream:
+        if error is None and result and result[0]:
+            lines += len(result[0])
+    return time.perf_counter() - start, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 流水线吞吐量测试")
+    parser.add_argument('--image_dir', required=True)
+    parser.add_argument('--modes', nargs='+', default=['serial', 'batched'])
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads_per_worker', type=int, default=4)
+    parser.add_argument('--use_gpu', action='store_true')
+    parser.add_argument('--lang', default='ch')
+    args = parser.parse_args()
+
+    images = get_files_from_folder(args.image_dir)
+    if not images:
+        console.print(f"[red]目录中没有图片: {args.image_dir}[/red]")
+        return
+
+    det_model_dir, rec_model_dir, det_config_path, rec_config_path = resolve_model_paths(args.use_gpu)
+    engine_kwargs = build_engine_kwargs(args.lang, args.use_gpu, 0, det_model_dir, rec_model_dir)
+    config_paths = (det_config_path, rec_config_path, CLS_CONFIG_PATH)
+
+    table = Table(title=f"OCR 流水线吞吐量 ({len(images)} 张图片)")
+    table.add_column("模式")
+    table.add_column("耗时 (s)", justify="right")
+    table.add_column("图片/秒", justify="right")
+    table.add_column("文本行数", justify="right")
+
+    with get_engine_pool().acquire(engine_kwargs, config_paths) as ocr:
+        for mode in args.modes:
+            if mode == 'workers':
+                continue
+            elapsed, lines = run_mode(ocr, mode, images, args.batch_size)
+            table.add_row(mode, f"{elapsed:.2f}", f"{len(images) / elapsed:.2f}", str(lines))
+
+    if 'workers' in args.modes:
+        # 多进程扩展性：进程启动和模型加载时间单独统计，不计入吞吐量
+        base_rate = None
+        for num_workers in args.workers:
+            start = time.perf_counter()
+            worker_pool = OCRWorkerPool(engine_kwargs, num_workers, args.threads_per_worker)
+            run_mode(worker_pool, 'workers', images[:num_workers], args.batch_size)
+            startup = time.perf_counter() - start
+            elapsed, lines = run_mode(worker_pool, 'workers', images, args.batch_size)
+            worker_pool.close()
+
+            rate = len(images) / elapsed
+            base_rate = base_rate or rate
+            table.add_row(f"workers {num_workers}x{args.threads_per_worker} "
+                          f"(启动 {startup:.1f}s, 加速 {rate / base_rate:.2f}x)",
+                          f"{elapsed:.2f}", f"{rate:.2f}", str(lines))
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
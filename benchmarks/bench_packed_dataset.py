@@ -0,0 +1,161 @@
+"""训练数据集读取性能测试。
+
+生成一批识别裁剪图片，分别写成 SimpleDataSet 标注文件、LMDBDataSet 目录和 PackedDataSet 分片
+（ppocr.utils.gen_packed_dataset 的转换函数），比较随机访问的每秒样本数和建立索引的内存占用。
+--decode 时样本包含 DecodeImage，否则只读取编码后的图片和标签。
+
+用法:
+    python benchmarks/bench_packed_dataset.py --samples 20000 --reads 20000 --num_workers 0 4
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+import multiprocessing
+import cv2
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import paddleocr
+# ppocr.data 依赖 PaddleOCR 的 tools 包，使用 pip 安装的 paddleocr 中的版本
+sys.path.append(os.path.dirname(paddleocr.__file__))
+
+import lmdb
+from rich.console import Console
+from rich.table import Table
+from ppocr.data.simple_dataset import SimpleDataSet
+from ppocr.data.lmdb_dataset import LMDBDataSet
+from ppocr.data.packed_dataset import PackedDataSet
+from ppocr.utils.gen_packed_dataset import ShardedWriter, pack_label_file
+
+console = Console()
+logger = logging.getLogger("bench_packed_dataset")
+
+DATASETS = {
+    'SimpleDataSet': SimpleDataSet,
+    'LMDBDataSet': LMDBDataSet,
+    'PackedDataSet': PackedDataSet,
+}
+
+
+def make_samples(root, num_samples, seed=0):
+    """写出图片文件和 SimpleDataSet 标注文件，返回标注文件路径。"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(root, 'images'), exist_ok=True)
+    label_file = os.path.join(root, 'label.txt')
+    with open(label_file, 'w', encoding='utf-8') as f:
+        for i in range(num_samples):
+            width = int(rng.integers(64, 320))
+            img = rng.integers(0, 256, (32, width, 3), dtype=np.uint8)
+            name = f"images/{i:08d}.jpg"
+            cv2.imwrite(os.path.join(root, name), img)
+            f.write(f"{name}\t样本{i}\n")
+    return label_file
+
+
+def make_lmdb(root, label_file, lmdb_dir):
+    env = lmdb.open(lmdb_dir, map_size=1 << 34)
+    with env.begin(write=True) as txn, open(label_file, encoding='utf-8') as f:
+        num_samples = 0
+        for num_samples, line in enumerate(f, 1):
+            name, label = line.rstrip('\n').split('\t')
+            with open(os.path.join(root, name), 'rb') as img_file:
+                txn.put(b"image-%09d" % num_samples, img_file.read())
+            txn.put(b"label-%09d" % num_samples, label.encode('utf-8'))
+        txn.put(b"num-samples", str(num_samples).encode())
+    env.close()
+
+
+def make_packed(root, label_file, packed_dir, shard_size):
+    writer = ShardedWriter(packed_dir, shard_size)
+    try:
+        pack_label_file(root, label_file, writer)
+    finally:
+        writer.close()
+
+
+def make_config(name, root, label_file, lmdb_dir, packed_dir, decode):
+    transforms = [{'KeepKeys': {'keep_keys': ['image', 'label']}}]
+    if decode:
+        transforms.insert(0, {'DecodeImage': {'img_mode': 'BGR', 'channel_first': False}})
+    dataset = {'name': name, 'transforms': transforms}
+    if name == 'SimpleDataSet':
+        dataset.update(data_dir=root, label_file_list=[label_file])
+    else:
+        dataset['data_dir'] = lmdb_dir if name == 'LMDBDataSet' else packed_dir
+    return {'Global': {}, 'Train': {'dataset': dataset, 'loader': {'shuffle': True, 'batch_size_per_card': 256}}}
+
+
+_dataset = None
+
+
+def _init_worker(dataset):
+    global _dataset
+    _dataset = dataset
+
+
+def _read(indices):
+    for idx in indices:
+        _dataset[idx]
+    return len(indices)
+
+
+def read_rate(dataset, indices, num_workers):
+    start = time.perf_counter()
+    if num_workers == 0:
+        for idx in indices:
+            dataset[idx]
+    else:
+        # fork 出的子进程共享父进程打开的数据集，与 DataLoader 的多进程读取方式相同
+        context = multiprocessing.get_context('fork')
+        pool = context.Pool(num_workers, initializer=_init_worker, initargs=(dataset,))
+        pool.map(_read, np.array_split(indices, num_workers * 8))
+        pool.close()
+        pool.join()
+    return len(indices) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练数据集读取性能测试")
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--reads', type=int, default=20000)
+    parser.add_argument('--shard_size', type=int, default=100000)
+    parser.add_argument('--num_workers', type=int, nargs='+', default=[0, 4])
+    parser.add_argument('--decode', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        console.print(f"[cyan]生成 {args.samples} 个样本...[/cyan]")
+        label_file = make_samples(root, args.samples)
+        lmdb_dir = os.path.join(root, 'lmdb')
+        packed_dir = os.path.join(root, 'packed')
+        make_lmdb(root, label_file, lmdb_dir)
+        make_packed(root, label_file, packed_dir, args.shard_size)
+
+        title = "随机读取" + (" + 解码" if args.decode else " (不解码)")
+        table = Table(title=f"{title}，{args.samples} 个样本")
+        table.add_column("数据集")
+        table.add_column("索引内存 (MB)", justify="right")
+        for num_workers in args.num_workers:
+            table.add_column(f"{num_workers} 进程 (样本/秒)", justify="right")
+
+        indices = np.random.default_rng(1).integers(0, args.samples, args.reads)
+        for name, dataset_class in DATASETS.items():
+            config = make_config(name, root, label_file, lmdb_dir, packed_dir, args.decode)
+            tracemalloc.start()
+            dataset = dataset_class(config, 'Train', logger)
+            index_memory = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+            tracemalloc.stop()
+            rates = [read_rate(dataset, indices, num_workers) for num_workers in args.num_workers]
+            table.add_row(name, f"{index_memory:.1f}", *[f"{rate:,.0f}" for rate in rates])
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""识别预处理性能测试。
+
+比较逐个裁剪调用 resize_norm_img 再拼接成批（推理时的做法）和
+resize_norm_img_batch 一次处理整批的耗时与峰值内存，并校验输出完全一致。
+
+用法:
+    python benchmarks/bench_rec_preprocess.py --crops 6 64 512 --image_shape 3 48 320
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import paddleocr
+# ppocr.data 依赖 PaddleOCR 的 tools 包，使用 pip 安装的 paddleocr 中的版本
+sys.path.append(os.path.dirname(paddleocr.__file__))
+
+from rich.console import Console
+from rich.table import Table
+from ppocr.data.imaug.rec_img_aug import resize_norm_img, resize_norm_img_batch
+
+console = Console()
+
+
+def make_crops(num_crops, seed=0):
+    # 文本行裁剪：高 20-60 像素，长宽比 0.5-15
+    rng = np.random.default_rng(seed)
+    crops = []
+    for _ in range(num_crops):
+        height = int(rng.integers(20, 60))
+        width = max(4, int(height * rng.uniform(0.5, 15)))
+        crops.append(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    return crops
+
+
+def per_crop(crops, image_shape):
+    results = [resize_norm_img(crop, image_shape) for crop in crops]
+    return np.stack([norm_img for norm_img, _ in results]), np.array([ratio for _, ratio in results])
+
+
+def measure(fn, repeat):
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - start) / repeat * 1000, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别预处理性能测试")
+    parser.add_argument('--crops', type=int, nargs='+', default=[6, 64, 512])
+    parser.add_argument('--image_shape', type=int, nargs=3, default=[3, 48, 320])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    table = Table(title=f"识别预处理 (输出 {args.image_shape[0]}x{args.image_shape[1]}x{args.image_shape[2]})")
+    table.add_column("裁剪数", justify="right")
+    table.add_column("逐个 (ms)", justify="right")
+    table.add_column("批量 (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("逐个峰值内存 (MB)", justify="right")
+    table.add_column("批量峰值内存 (MB)", justify="right")
+    table.add_column("结果一致")
+
+    for num_crops in args.crops:
+        crops = make_crops(num_crops)
+        (ref, ref_ratios), ref_time, ref_peak = measure(lambda: per_crop(crops, args.image_shape), args.repeat)
+        (batch, ratios), batch_time, batch_peak = measure(
+            lambda: resize_norm_img_batch(crops, args.image_shape), args.repeat)
+        same = np.array_equal(ref, batch) and np.allclose(ref_ratios, ratios)
+        table.add_row(str(num_crops), f"{ref_time:.2f}", f"{batch_time:.2f}", f"{ref_time / batch_time:.1f}x",
+                      f"{ref_peak:.1f}", f"{batch_peak:.1f}", "是" if same else "否")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
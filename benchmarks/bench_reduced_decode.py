@@ -0,0 +1,113 @@
+"""JPEG 缩小解码性能测试。
+
+对 1200-4800 万像素的 JPEG，比较完整解码和按检测边长缩小解码（libjpeg DCT 缩放）的耗时：
+- app: core.ocr_handler.load_image（PIL draft），输出尺寸必须与完整解码一致；
+- ppocr: DecodeImage(limit_side_len) + DetResizeForTest，shape 必须映射回原图尺寸。
+同时报告两种解码得到的检测输入的平均像素差。
+
+用法:
+    python benchmarks/bench_reduced_decode.py --megapixels 12 24 48 --limit_side_len 960
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import paddleocr
+# ppocr.data 依赖 PaddleOCR 的 tools 包，使用 pip 安装的 paddleocr 中的版本
+sys.path.append(os.path.dirname(paddleocr.__file__))
+
+from rich.console import Console
+from rich.table import Table
+from core.ocr_handler import load_image
+from ppocr.data.imaug import create_operators, transform
+
+console = Console()
+
+
+def make_photo(megapixels, seed=0):
+    # 4:3 的平滑背景加噪声和几行"文字"，压缩后的大小接近手机照片
+    rng = np.random.default_rng(seed)
+    width = int(np.sqrt(megapixels * 1e6 * 4 / 3)) // 16 * 16
+    height = width * 3 // 4
+    base = cv2.resize(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8), (width, height),
+                      interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-6, 7, (height, width, 3))
+    img = np.clip(base.astype(np.int32) + noise, 0, 255).astype(np.uint8)
+    for row in range(1, 8):
+        cv2.putText(img, "Certificate 2024 NAME", (width // 10, row * height // 9), cv2.FONT_HERSHEY_SIMPLEX,
+                    width / 1500, (20, 20, 20), max(1, width // 800))
+    return img
+
+
+def det_ops(limit_side_len, reduced):
+    decode = {'img_mode': 'RGB', 'channel_first': False}
+    if reduced:
+        decode['limit_side_len'] = limit_side_len
+    return create_operators([
+        {'DecodeImage': decode},
+        {'DetResizeForTest': {'limit_side_len': limit_side_len, 'limit_type': 'max'}},
+        {'KeepKeys': {'keep_keys': ['image', 'shape']}},
+    ])
+
+
+def timed(fn, repeat):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JPEG 缩小解码性能测试")
+    parser.add_argument('--megapixels', type=int, nargs='+', default=[12, 24, 48])
+    parser.add_argument('--limit_side_len', type=int, default=960)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    table = Table(title=f"完整解码 vs 缩小解码 (检测边长 {args.limit_side_len})")
+    table.add_column("照片", justify="right")
+    table.add_column("流程")
+    table.add_column("完整 (ms)", justify="right")
+    table.add_column("缩小 (ms)", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_column("平均像素差", justify="right")
+    table.add_column("尺寸/坐标一致")
+
+    full_ops, reduced_ops = det_ops(args.limit_side_len, False), det_ops(args.limit_side_len, True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for megapixels in args.megapixels:
+            img = make_photo(megapixels)
+            path = os.path.join(tmp_dir, f"{megapixels}mp.jpg")
+            cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            with open(path, 'rb') as f:
+                data = f.read()
+            label = f"{img.shape[1]}x{img.shape[0]}"
+
+            full, full_time = timed(lambda: load_image(path, args.limit_side_len), args.repeat)
+            reduced, reduced_time = timed(lambda: load_image(path, args.limit_side_len, reduced_decode=True),
+                                          args.repeat)
+            diff = np.abs(np.asarray(full, np.float32) - np.asarray(reduced, np.float32)).mean()
+            table.add_row(label, "app load_image", f"{full_time:.0f}", f"{reduced_time:.0f}",
+                          f"{full_time / reduced_time:.1f}x", f"{diff:.2f}", "是" if full.size == reduced.size else "否")
+
+            (full_img, full_shape), full_time = timed(lambda: transform({'image': data}, full_ops), args.repeat)
+            (reduced_img, reduced_shape), reduced_time = timed(lambda: transform({'image': data}, reduced_ops),
+                                                               args.repeat)
+            diff = np.abs(full_img.astype(np.float32) - reduced_img.astype(np.float32)).mean()
+            same = full_img.shape == reduced_img.shape and np.allclose(full_shape, reduced_shape)
+            table.add_row(label, "ppocr DecodeImage", f"{full_time:.0f}", f"{reduced_time:.0f}",
+                          f"{full_time / reduced_time:.1f}x", f"{diff:.2f}", "是" if same else "否")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""自适应检测分辨率测试。
+
+对一组真实图片比较固定分辨率（load_image 的 LANCZOS 缩放到最长边 960）和
+自适应分辨率（低分辨率探测字高后一次缩放）的速度与召回：
+召回以固定分辨率识别出的文本行为基准，统计自适应模式识别出相同文本的比例。
+
+用法:
+    python benchmarks/bench_resolution.py --image_dir upload --min_text_heights 16 20 24
+"""
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from functools import partial
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from rich.console import Console
+from rich.table import Table
+from core.image_processor import get_files_from_folder
+from core.engine_pool import get_engine_pool
+from core.ocr_handler import build_engine_kwargs, resolve_model_paths, load_image, CLS_CONFIG_PATH
+from core.resolution_planner import load_planned_image
+
+console = Console()
+
+
+def run(ocr, images, load_fn):
+    # 返回 (总耗时, 检测输入平均像素数, 每张图片识别出的文本行)
+    texts = []
+    pixels = 0
+    start = time.perf_counter()
+    for path in images:
+        img = load_fn(path)
+        pixels += img.size[0] * img.size[1]
+        result = ocr.ocr(np.array(img), cls=True)
+        lines = result[0] if result and result[0] else []
+        texts.append(Counter(line[1][0] for line in lines))
+    return time.perf_counter() - start, pixels / max(len(images), 1), texts
+
+
+def text_recall(texts, reference):
+    found = sum(sum((counter & ref).values()) for counter, ref in zip(texts, reference))
+    total = sum(sum(ref.values()) for ref in reference)
+    return found / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应检测分辨率测试")
+    parser.add_argument('--image_dir', required=True)
+    parser.add_argument('--min_text_heights', type=int, nargs='+', default=[16, 20, 24])
+    parser.add_argument('--det_limit_side_len', type=int, default=960)
+    parser.add_argument('--use_gpu', action='store_true')
+    parser.add_argument('--lang', default='ch')
+    args = parser.parse_args()
+
+    images = get_files_from_folder(args.image_dir)
+    if not images:
+        console.print(f"[red]目录中没有图片: {args.image_dir}[/red]")
+        return
+
+    det_model_dir, rec_model_dir, det_config_path, rec_config_path = resolve_model_paths(args.use_gpu)
+    engine_kwargs = build_engine_kwargs(args.lang, args.use_gpu, 0, det_model_dir, rec_model_dir,
+                                        det_limit_side_len=args.det_limit_side_len)
+    config_paths = (det_config_path, rec_config_path, CLS_CONFIG_PATH)
+
+    table = Table(title=f"检测分辨率: 速度与召回 ({len(images)} 张图片)")
+    table.add_column("模式")
+    table.add_column("耗时 (s)", justify="right")
+    table.add_column("图片/秒", justify="right")
+    table.add_column("平均检测像素 (万)", justify="right")
+    table.add_column("文本行召回", justify="right")
+
+    with get_engine_pool().acquire(engine_kwargs, config_paths) as ocr:
+        # 先跑一张预热，避免首次推理的初始化计入耗时
+        ocr.ocr(np.array(load_image(images[0], args.det_limit_side_len)), cls=True)
+
+        fixed_load = partial(load_image, det_limit_side_len=args.det_limit_side_len, det_limit_type='max')
+        elapsed, pixels, reference = run(ocr, images, fixed_load)
+        table.add_row(f"固定 {args.det_limit_side_len}", f"{elapsed:.2f}", f"{len(images) / elapsed:.2f}",
+                      f"{pixels / 1e4:.0f}", "100.0%")
+
+        for min_text_height in args.min_text_heights:
+            planned_load = partial(load_planned_image, text_detector=ocr.text_detector,
+                                   max_side=args.det_limit_side_len, min_text_height=min_text_height)
+            elapsed, pixels, texts = run(ocr, images, planned_load)
+            table.add_row(f"自适应 字高>={min_text_height}px", f"{elapsed:.2f}", f"{len(images) / elapsed:.2f}",
+                          f"{pixels / 1e4:.0f}", f"{text_recall(texts, reference):.1%}")
+
+    console.print(table)
+
+
+if __name__ == '__main__':
+    main()
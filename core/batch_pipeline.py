@@ -0,0 +1,160 @@
+import copy
+import numpy as np
+from paddleocr.paddleocr import predict_system
+from rich.console import Console
+
+console = Console()
+
+# 批量模式默认参数
+DEFAULT_BATCH_SIZE = 32        # 每次送入流水线的图片数量，识别裁剪会在这些图片之间合并
+DEFAULT_DET_BATCH_SIZE = 8     # 检测模型单次推理的最大图片数
+DET_SIZE_BUCKET = 64           # 检测输入按该步长分桶，同一桶内补零到相同尺寸
+
+# 批量检测目前只支持输出单张概率图的 DB 系列模型
+BATCHABLE_DET_ALGORITHMS = ('DB', 'DB++')
+
+
+def _det_preprocess(text_detector, img):
+    data = {'image': img}
+    for op in text_detector.preprocess_op:
+        data = op(data)
+        if data is None:
+            return None
+    return data
+
+
+def group_det_inputs(prepared, max_batch_size=DEFAULT_DET_BATCH_SIZE, bucket=DET_SIZE_BUCKET):
+    """把 DetResizeForTest 之后尺寸相近的输入分到同一批。
+
+    prepared 为 [(图片序号, CHW 数组, shape_list)]，返回若干批次，
+    每批内的高宽向上取整到同一个 bucket 后相同，补零的面积有上限。
+    """
+    buckets = {}
+    for item in prepared:
+        _, chw, _ = item
+        key = (-(-chw.shape[1] // bucket), -(-chw.shape[2] // bucket))
+        buckets.setdefault(key, []).append(item)
+
+    groups = []
+    for key in sorted(buckets):
+        items = buckets[key]
+        for start in range(0, len(items), max_batch_size):
+            groups.append(items[start:start + max_batch_size])
+    return groups
+
+
+def _supports_batched_det(text_detector):
+    return (not getattr(text_detector, 'use_onnx', False)
+            and text_detector.det_algorithm in BATCHABLE_DET_ALGORITHMS)
+
+
+def _filter_det_boxes(text_detector, dt_boxes, image_shape):
+    if text_detector.args.det_box_type == 'poly':
+        return text_detector.filter_tag_det_res_only_clip(dt_boxes, image_shape)
+    return text_detector.filter_tag_det_res(dt_boxes, image_shape)
+
+
+def detect_batch(text_detector, img_arrays, max_batch_size=DEFAULT_DET_BATCH_SIZE):
+    """对多张图片做批量文本检测，返回与输入一一对应的检测框数组。"""
+    if not _supports_batched_det(text_detector):
+        return [text_detector(img)[0] for img in img_arrays]
+
+    dt_boxes_list = [None] * len(img_arrays)
+    prepared = []
+    for i, img in enumerate(img_arrays):
+        data = _det_preprocess(text_detector, img)
+        if data is None:
+            continue
+        chw, shape_list = data
+        prepared.append((i, chw, shape_list))
+
+    for group in group_det_inputs(prepared, max_batch_size):
+        channels = group[0][1].shape[0]
+        max_h = max(chw.shape[1] for _, chw, _ in group)
+        max_w = max(chw.shape[2] for _, chw, _ in group)
+        batch = np.zeros((len(group), channels, max_h, max_w), dtype=np.float32)
+        for k, (_, chw, _) in enumerate(group):
+            batch[k, :, :chw.shape[1], :chw.shape[2]] = chw
+
+        text_detector.input_tensor.copy_from_cpu(batch)
+        text_detector.predictor.run()
+        maps = text_detector.output_tensors[0].copy_to_cpu()
+
+        # 后处理按每张图自己的有效区域进行，补零部分不参与，坐标也就不会被拉伸
+        for k, (i, chw, shape_list) in enumerate(group):
+            preds = {'maps': maps[k:k + 1, :, :chw.shape[1], :chw.shape[2]]}
+            post_result = text_detector.postprocess_op(preds, np.expand_dims(shape_list, axis=0))
+            dt_boxes_list[i] = _filter_det_boxes(text_detector, post_result[0]['points'], img_arrays[i].shape)
+
+    return dt_boxes_list
+
+
+def ocr_batch(ocr, img_arrays, cls=True, det_batch_size=DEFAULT_DET_BATCH_SIZE):
+    """批量识别多张图片。
+
+    检测按尺寸分组批量推理，所有图片的文本行裁剪合并后交给识别器，
+    由识别器按宽高比排序组批。返回值与逐张调用 ocr.ocr(img) 的结果格式一致。
+    """
+    dt_boxes_list = detect_batch(ocr.text_detector, img_arrays, det_batch_size)
+
+    crops = []
+    owners = []
+    boxes_per_image = []
+    for i, (img, dt_boxes) in enumerate(zip(img_arrays, dt_boxes_list)):
+        if dt_boxes is None or len(dt_boxes) == 0:
+            boxes_per_image.append(None)
+            continue
+        boxes = predict_system.sorted_boxes(dt_boxes)
+        boxes_per_image.append(boxes)
+        for j, box in enumerate(boxes):
+            tmp_box = copy.deepcopy(box)
+            if ocr.args.det_box_type == 'quad':
+                crops.append(predict_system.get_rotate_crop_image(img, tmp_box))
+            else:
+                crops.append(predict_system.get_minarea_rect_crop(img, tmp_box))
+            owners.append((i, j))
+
+    rec_res = []
+    if crops:
+        if ocr.use_angle_cls and cls:
+            crops, _, _ = ocr.text_classifier(crops)
+        rec_res, _ = ocr.text_recognizer(crops)
+
+    lines_per_image = [[] for _ in img_arrays]
+    for (i, j), rec_result in zip(owners, rec_res):
+        if rec_result[1] >= ocr.drop_score:
+            lines_per_image[i].append([boxes_per_image[i][j].tolist(), rec_result])
+
+    return [[None] if boxes is None else [lines]
+            for boxes, lines in zip(boxes_per_image, lines_per_image)]
+
+
+def iter_batched_ocr(ocr, images, load_fn, use_angle_cls=True, batch_size=DEFAULT_BATCH_SIZE):
+    """按批加载并识别图片，按输入顺序产出 (序号, 图片, 原始结果, 异常)。"""
+    for start in range(0, len(images), batch_size):
+        chunk = []
+        for idx in range(start, min(start + batch_size, len(images))):
+            img = images[idx]
+            try:
+                chunk.append((idx, load_fn(img), None))
+            except Exception as e:
+                chunk.append((idx, img, e))
+
+        loaded = [(idx, img) for idx, img, error in chunk if error is None]
+        try:
+            results = ocr_batch(ocr, [np.array(img) for _, img in loaded], cls=use_angle_cls)
+            results = dict(zip((idx for idx, _ in loaded), results))
+        except Exception as e:
+            # 整批失败时退回逐张识别，避免一张坏图拖垮整批
+            console.print(f"[yellow]批量识别失败，改为逐张处理: {str(e)}[/yellow]")
+            results = {}
+            for idx, img in loaded:
+                try:
+                    results[idx] = ocr.ocr(np.array(img), cls=use_angle_cls)
+                except Exception as img_error:
+                    results[idx] = img_error
+
+        for idx, img, error in chunk:
+            if error is None and isinstance(results[idx], Exception):
+                error = results[idx]
+            yield idx, img, None if error is not None else results[idx], error
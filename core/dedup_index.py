@@ -0,0 +1,137 @@
+from math import comb
+from itertools import combinations
+import numpy as np
+import imagehash
+
+# 可选的感知哈希算法，均输出 8x8=64 位哈希
+HASH_FUNCTIONS = {
+    'average': imagehash.average_hash,
+    'phash': imagehash.phash,
+    'dhash': imagehash.dhash,
+}
+
+HASH_BITS = 64
+MAX_CHUNKS = 8  # 最多切成 8 段，每段至少 8 位，保证分桶有区分度
+# 一次分桶查询的开销约等于向量化比较这么多个哈希，条目较少时直接全量比较更快
+SCAN_COST_PER_LOOKUP = 64
+
+if hasattr(np, 'bitwise_count'):
+    def popcount64(values):
+        return np.bitwise_count(values)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount64(values):
+        values = np.ascontiguousarray(values, dtype=np.uint64)
+        return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def hash_to_int(img_hash):
+    """把 imagehash.ImageHash 打包成 64 位整数。"""
+    bits = np.asarray(img_hash.hash, dtype=bool).flatten()
+    if bits.size != HASH_BITS:
+        raise ValueError(f"只支持 {HASH_BITS} 位哈希，实际为 {bits.size} 位")
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _lookups_per_query(num_chunks, max_distance):
+    width = HASH_BITS // num_chunks
+    radius = max(0, max_distance) // num_chunks
+    return num_chunks * sum(comb(width, k) for k in range(radius + 1))
+
+
+def _choose_num_chunks(max_distance, expected_size):
+    # 段数越多，每段枚举的邻近值越少但候选越多；按预计条目数选总开销最小的段数
+    best_chunks, best_cost = 1, None
+    for num_chunks in range(1, min(max(0, max_distance) + 1, MAX_CHUNKS) + 1):
+        lookups = _lookups_per_query(num_chunks, max_distance)
+        candidates = expected_size * lookups / 2 ** (HASH_BITS // num_chunks)
+        cost = SCAN_COST_PER_LOOKUP * lookups + candidates
+        if best_cost is None or cost < best_cost:
+            best_chunks, best_cost = num_chunks, cost
+    return best_chunks
+
+
+def _flip_masks(bits, radius):
+    # 在 bits 位的分段内，汉明距离不超过 radius 的所有异或掩码
+    masks = [0]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(bits), r):
+            masks.append(sum(1 << p for p in positions))
+    return masks
+
+
+class HammingIndex:
+    """64 位哈希的多索引哈希 (multi-index hashing)。
+
+    把哈希切成 m 段，若两个哈希的汉明距离 <= r，则至少有一段的距离 <= r // m（抽屉原理）。
+    每段建一个 分段值 -> 编号列表 的表，查询时只枚举这些邻近分段值取出候选，
+    再用向量化 popcount 精确校验，代替与所有已保留哈希逐个比较。
+    capacity 为预计条目数，用来选择段数；条目较少时直接向量化全量比较。
+    """
+
+    def __init__(self, max_distance, capacity=1024):
+        self.max_distance = max_distance
+        self.num_chunks = _choose_num_chunks(max_distance, capacity)
+        self.chunk_radius = max(0, max_distance) // self.num_chunks
+        bounds = np.linspace(0, HASH_BITS, self.num_chunks + 1).astype(int)
+        self._chunks = [(int(lo), int(hi - lo)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self._masks = [_flip_masks(width, self.chunk_radius) for _, width in self._chunks]
+        self._tables = [{} for _ in self._chunks]
+        self._scan_limit = SCAN_COST_PER_LOOKUP * sum(len(masks) for masks in self._masks)
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self.size = 0
+
+    def _chunk_values(self, value):
+        return [(value >> shift) & ((1 << width) - 1) for shift, width in self._chunks]
+
+    def add(self, value):
+        if self.size == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+        item_id = self.size
+        self._hashes[item_id] = value
+        self.size += 1
+        for table, chunk in zip(self._tables, self._chunk_values(value)):
+            table.setdefault(chunk, []).append(item_id)
+        return item_id
+
+    def query(self, value):
+        """返回距离 <= max_distance 的已有条目中编号最小的一个，没有则返回 None。"""
+        if self.max_distance < 0 or self.size == 0:
+            return None
+        if self.size <= self._scan_limit:
+            distances = popcount64(self._hashes[:self.size] ^ np.uint64(value))
+            matched = np.flatnonzero(distances <= self.max_distance)
+            return int(matched[0]) if matched.size else None
+
+        candidates = []
+        for table, masks, chunk in zip(self._tables, self._masks, self._chunk_values(value)):
+            for mask in masks:
+                ids = table.get(chunk ^ mask)
+                if ids:
+                    candidates.extend(ids)
+        if not candidates:
+            return None
+        candidates = np.unique(np.asarray(candidates, dtype=np.int64))
+        distances = popcount64(self._hashes[candidates] ^ np.uint64(value))
+        matched = candidates[distances <= self.max_distance]
+        return int(matched[0]) if matched.size else None
+
+
+def find_unique(hash_values, max_distance):
+    """按输入顺序贪心去重。
+
+    与已保留哈希的距离 <= max_distance 的条目视为重复，
+    返回 (保留的下标列表, {重复下标: 与之相似的保留下标})。
+    """
+    index = HammingIndex(max_distance, capacity=max(1, len(hash_values)))
+    kept = []
+    duplicates = {}
+    for i, value in enumerate(hash_values):
+        match = index.query(value)
+        if match is None:
+            index.add(value)
+            kept.append(i)
+        else:
+            duplicates[i] = kept[match]
+    return kept, duplicates
@@ -0,0 +1,238 @@
+import os
+import gc
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+from collections import OrderedDict, namedtuple
+import numpy as np
+import yaml
+from paddleocr import PaddleOCR
+from rich.console import Console
+
+console = Console()
+
+# 引擎池默认配置
+DEFAULT_MEMORY_BUDGET_MB = 3072
+DEFAULT_IDLE_TIMEOUT = 30 * 60  # 秒
+
+# 引擎统计信息
+EngineStats = namedtuple('EngineStats', ['key', 'cold_start_seconds', 'warmup_seconds',
+                                         'memory_mb', 'uses', 'idle_seconds'])
+
+
+def load_yaml(yaml_path):
+    try:
+        with open(yaml_path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        return data
+    except Exception as e:
+        console.print(f"[red]加载YAML文件 {yaml_path} 时出错: {str(e)}[/red]")
+        return None
+
+
+def _current_rss_mb():
+    # 读取当前进程常驻内存（仅 Linux 可用）
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            rss_pages = int(f.read().split()[1])
+        return rss_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _model_dirs_size_mb(engine_kwargs):
+    total = 0
+    for name in ('det_model_dir', 'rec_model_dir', 'cls_model_dir'):
+        model_dir = engine_kwargs.get(name)
+        if not model_dir or not os.path.isdir(model_dir):
+            continue
+        for root, _, files in os.walk(model_dir):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / (1024 * 1024)
+
+
+def make_engine_key(engine_kwargs):
+    return tuple(sorted(engine_kwargs.items()))
+
+
+class _EngineEntry:
+    def __init__(self, key, engine, cold_start_seconds, warmup_seconds, memory_mb):
+        self.key = key
+        self.engine = engine
+        self.cold_start_seconds = cold_start_seconds
+        self.warmup_seconds = warmup_seconds
+        self.memory_mb = memory_mb
+        self.uses = 0
+        self.in_use = 0
+        self.last_used = time.time()
+        # PaddleOCR 预测器不是线程安全的，同一引擎同一时间只允许一个会话使用
+        self.lock = threading.Lock()
+
+
+class OCREnginePool:
+    """进程级 PaddleOCR 引擎池。
+
+    按 (语言, GPU, 模型路径, 检测/识别参数) 缓存已初始化的引擎，
+    在 Streamlit 重新运行和不同会话之间复用，并按空闲时间和内存预算淘汰。
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._building = {}  # 正在初始化的引擎键 -> Future
+        self._lock = threading.Lock()
+        # 同一时间只初始化一个引擎，RSS 增量才不会把并行初始化的其他引擎算进来
+        self._build_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _build(self, key, engine_kwargs, config_paths):
+        for config_path in config_paths:
+            if load_yaml(config_path) is None:
+                raise ValueError(f"无法加载配置文件: {config_path}")
+
+        with self._build_lock:
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            engine = PaddleOCR(**engine_kwargs)
+            cold_start_seconds = time.perf_counter() - start
+            fuse_preprocess_ops(engine)
+            warmup_seconds = warm_up_engine(engine, engine_kwargs.get('use_angle_cls', False))
+            rss_after = _current_rss_mb()
+
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            memory_mb = rss_after - rss_before
+        else:
+            memory_mb = _model_dirs_size_mb(engine_kwargs)
+
+        console.print(f"[green]OCR引擎初始化完成: 冷启动 {cold_start_seconds:.2f}s, "
+                      f"预热 {warmup_seconds:.2f}s, 约占用内存 {memory_mb:.0f}MB[/green]")
+        return _EngineEntry(key, engine, cold_start_seconds, warmup_seconds, memory_mb)
+
+    def _evict(self, keep_key=None):
+        now = time.time()
+        # 先淘汰空闲超时的引擎
+        for key, entry in list(self._entries.items()):
+            if key != keep_key and not entry.in_use and now - entry.last_used > self.idle_timeout:
+                self._remove(key)
+
+        # 再按最近最少使用顺序淘汰，直到满足内存预算
+        total_mb = sum(entry.memory_mb for entry in self._entries.values())
+        for key, entry in list(self._entries.items()):
+            if total_mb <= self.memory_budget_mb:
+                break
+            if key == keep_key or entry.in_use:
+                continue
+            total_mb -= entry.memory_mb
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        console.print(f"[yellow]淘汰空闲OCR引擎 (约 {entry.memory_mb:.0f}MB)[/yellow]")
+        entry.engine = None
+        self.evictions += 1
+        gc.collect()
+
+    def _take(self, key, entry):
+        # 调用方需持有 self._lock
+        self._entries.move_to_end(key)
+        entry.in_use += 1
+        self._evict(keep_key=key)
+        return entry
+
+    def checkout(self, engine_kwargs, config_paths=()):
+        """取出（必要时初始化）一个引擎条目，用完后必须调用 release。
+
+        初始化和预热耗时数秒，在全局锁之外进行：同一参数的其他会话等待同一次初始化，
+        不同参数的初始化依次进行（以便分别统计内存），复用已有引擎的会话和 stats() 不受影响。
+        """
+        key = make_engine_key(engine_kwargs)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    console.print(f"[cyan]复用已预热的OCR引擎 (已使用 {entry.uses} 次)[/cyan]")
+                    return self._take(key, entry)
+                future = self._building.get(key)
+                building = future is None
+                if building:
+                    self.misses += 1
+                    future = self._building[key] = Future()
+
+            if not building:
+                # 等待其他会话完成初始化后重新查找（初始化失败时抛出同一个异常）
+                future.result()
+                continue
+
+            try:
+                entry = self._build(key, engine_kwargs, config_paths)
+            except BaseException as e:
+                with self._lock:
+                    del self._building[key]
+                future.set_exception(e)
+                raise
+            with self._lock:
+                del self._building[key]
+                self._entries[key] = entry
+                self._take(key, entry)
+            future.set_result(entry)
+            return entry
+
+    def release(self, entry):
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.time()
+
+    @contextmanager
+    def acquire(self, engine_kwargs, config_paths=()):
+        """获取一个预热好的引擎，在 with 块内独占使用。"""
+        entry = self.checkout(engine_kwargs, config_paths)
+        try:
+            with entry.lock:
+                entry.uses += 1
+                yield entry.engine
+        finally:
+            self.release(entry)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return [EngineStats(dict(entry.key), entry.cold_start_seconds, entry.warmup_seconds,
+                                entry.memory_mb, entry.uses, now - entry.last_used)
+                    for entry in self._entries.values()]
+
+    def clear(self):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if not entry.in_use:
+                    self._remove(key)
+
+
+def fuse_preprocess_ops(engine):
+    # 检测预处理的 NormalizeImage -> ToCHWImage 合并为一个算子，只在推理时启用，
+    # 训练和评估的算子列表保持与配置文件一致
+    from ppocr.data.imaug import fuse_operators
+    text_detector = getattr(engine, 'text_detector', None)
+    if text_detector is not None:
+        text_detector.preprocess_op = fuse_operators(text_detector.preprocess_op)
+
+
+def warm_up_engine(engine, use_angle_cls=False):
+    # 用一张空白图片跑一遍检测、方向分类和识别，触发推理引擎的首次初始化
+    start = time.perf_counter()
+    blank_page = np.full((320, 320, 3), 255, dtype=np.uint8)
+    engine.ocr(blank_page, cls=use_angle_cls)
+    blank_line = np.full((48, 160, 3), 255, dtype=np.uint8)
+    engine.ocr(blank_line, det=False, cls=use_angle_cls)
+    return time.perf_counter() - start
+
+
+_engine_pool = OCREnginePool()
+
+
+def get_engine_pool():
+    return _engine_pool
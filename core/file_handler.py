@@ -1,30 +1,161 @@
 import os
-from PIL import Image
 import io
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from rich.console import Console
+from core.image_processor import compute_image_hashes
+
+console = Console()
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_INGEST_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# 按图片实际格式决定扩展名，而不是相信上传时的文件名
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+}
+
+IngestStats = namedtuple('IngestStats', ['files', 'new_files', 'total_bytes', 'seconds', 'mb_per_second'])
+
+_manifest_lock = threading.Lock()
+
+def _ingest_one(uploaded_file, upload_folder, hashed_digests=frozenset()):
+    data = uploaded_file.getbuffer()
+    digest = hashlib.sha256(data).hexdigest()
+
+    # 解析文件头获取格式和尺寸；清单中还没有哈希时，趁字节还在内存中缩小解码一次灰度图，
+    # 计算所有去重哈希记录到清单，去重阶段不再读取和解码文件
+    hashes = None
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        width, height = image.size
+        if digest not in hashed_digests:
+            try:
+                hashes = compute_image_hashes(image)
+            except Exception as e:
+                console.print(f"[yellow]计算 {uploaded_file.name} 的去重哈希失败，去重时再计算: {str(e)}[/yellow]")
+
+    ext = FORMAT_EXTENSIONS.get(image_format, os.path.splitext(uploaded_file.name)[1].lower())
+    file_name = os.path.join(upload_folder, f"{digest}{ext}")
+
+    # 相同内容只保存一次，Streamlit 每次重新运行都会重新提交上传的文件
+    is_new = not os.path.exists(file_name)
+    if is_new:
+        tmp_name = f"{file_name}.{threading.get_ident()}.tmp"
+        with open(tmp_name, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, file_name)
+
+    record = {
+        'file': os.path.basename(file_name),
+        'original_names': [uploaded_file.name],
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'size_bytes': len(data),
+    }
+    if hashes is not None:
+        record['hashes'] = hashes
+    return file_name, digest, record, is_new
+
+def _update_manifest(upload_folder, records):
+    manifest_path = os.path.join(upload_folder, MANIFEST_NAME)
+    with _manifest_lock:
+        manifest = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                console.print(f"[yellow]清单文件损坏，将重新生成: {manifest_path}[/yellow]")
+
+        for digest, record in records.items():
+            original_names = manifest.get(digest, {}).get('original_names', [])
+            for name in record['original_names']:
+                if name not in original_names:
+                    original_names.append(name)
+            # 本次没有重新计算的哈希沿用清单中的记录
+            manifest[digest] = dict(manifest.get(digest, {}), **record)
+            manifest[digest]['original_names'] = original_names
+
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+def load_manifest(upload_folder):
+    manifest_path = os.path.join(upload_folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_image_hashes(file_paths, hash_method='average'):
+    """从所在目录的清单中读取上传时计算的去重哈希，返回 {文件路径: 哈希}，没有记录的文件不包含在内。"""
+    manifests = {}
+    known_hashes = {}
+    for file_path in file_paths:
+        folder, file_name = os.path.split(file_path)
+        if folder not in manifests:
+            try:
+                manifest = load_manifest(folder)
+            except (OSError, ValueError):
+                manifest = {}
+            manifests[folder] = {record['file']: record.get('hashes', {}) for record in manifest.values()}
+        img_hash = manifests[folder].get(file_name, {}).get(hash_method)
+        if img_hash is not None:
+            known_hashes[file_path] = img_hash
+    return known_hashes
+
+def ingest_uploaded_files(uploaded_files, upload_folder, max_workers=DEFAULT_INGEST_WORKERS):
+    """并发保存上传文件的原始字节，文件名为内容的 SHA-256。
+
+    返回 (去重后的文件路径列表, IngestStats)，格式、尺寸和去重哈希记录在上传目录的 manifest.json 中。
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    start = time.perf_counter()
+    # Streamlit 每次重新运行都会重新提交上传的文件，已有哈希的文件不再解码
+    try:
+        hashed_digests = frozenset(digest for digest, record in load_manifest(upload_folder).items()
+                                   if 'hashes' in record)
+    except (OSError, ValueError):
+        hashed_digests = frozenset()
 
-def save_uploaded_files(uploaded_files, upload_folder):
     saved_files = []
-    for uploaded_file in uploaded_files:
-        # 获取文件名和扩展名
-        name, ext = os.path.splitext(uploaded_file.name)
-        
-        # 创建一个唯一的文件名，使用.png作为新的扩展名
-        file_name = os.path.join(upload_folder, f"{name}.png")
-        counter = 1
-        while os.path.exists(file_name):
-            file_name = os.path.join(upload_folder, f"{name}_{counter}.png")
-            counter += 1
-
-        # 打开上传的图片
-        image = Image.open(io.BytesIO(uploaded_file.getbuffer()))
-        
-        # 如果图片模式不是RGB，转换为RGB
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # 保存为PNG格式
-        image.save(file_name, 'PNG')
-        
-        saved_files.append(file_name)
-    
+    records = {}
+    new_files = 0
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_ingest_one, uploaded_file, upload_folder, hashed_digests) for uploaded_file in uploaded_files]
+        for uploaded_file, future in zip(uploaded_files, futures):
+            try:
+                file_name, digest, record, is_new = future.result()
+            except Exception as e:
+                console.print(f"[red]保存上传文件 {uploaded_file.name} 时出错: {str(e)}[/red]")
+                continue
+            total_bytes += record['size_bytes']
+            new_files += is_new
+            if digest in records:
+                records[digest]['original_names'].append(uploaded_file.name)
+            else:
+                records[digest] = record
+                saved_files.append(file_name)
+
+    _update_manifest(upload_folder, records)
+
+    seconds = time.perf_counter() - start
+    mb_per_second = total_bytes / (1024 * 1024) / seconds if seconds > 0 else 0.0
+    stats = IngestStats(len(saved_files), new_files, total_bytes, seconds, mb_per_second)
+    console.print(f"[green]保存上传文件 {stats.files} 个 (新增 {stats.new_files} 个), "
+                  f"{total_bytes / (1024 * 1024):.1f}MB, {mb_per_second:.1f}MB/s[/green]")
+    return saved_files, stats
+
+def save_uploaded_files(uploaded_files, upload_folder):
+    saved_files, _ = ingest_uploaded_files(uploaded_files, upload_folder)
     return saved_files
@@ -1,44 +1,105 @@
 from PIL import Image
-import imagehash
 import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from rich.console import Console
 from rich.progress import Progress
+from core.dedup_index import HammingIndex, HASH_FUNCTIONS, hash_to_int
 
 console = Console()
 
-def remove_duplicates(file_paths, folder_path, similarity_threshold):
-    unique_images = []
-    hashes = {}
+# 哈希只需要很小的灰度缩略图，JPEG 可以按 1/2、1/4、1/8 直接缩小解码为灰度图
+HASH_DRAFT_SIZE = (128, 128)
+DEFAULT_HASH_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+def detection_size(size, det_limit_side_len=960, det_limit_type='max'):
+    """检测前缩放后的 (宽, 高)：'max' 只缩小，'min' 只放大；不需要缩放时返回 None。"""
+    orig_w, orig_h = size
+    if det_limit_type == 'max':
+        ratio = det_limit_side_len / max(orig_h, orig_w)
+        if ratio < 1:
+            return int(orig_w * ratio), int(orig_h * ratio)
+    elif det_limit_type == 'min':
+        ratio = det_limit_side_len / min(orig_h, orig_w)
+        if ratio > 1:
+            return int(orig_w * ratio), int(orig_h * ratio)
+    return None
+
+def open_reduced(file_path, det_limit_side_len=960, det_limit_type='max'):
+    """打开图片，JPEG 直接按 1/2、1/4、1/8 中不小于检测输入尺寸的最大比例缩小解码。
+
+    返回 (图片, 按原图尺寸计算的检测输入尺寸)，不需要缩放时尺寸为 None。
+    """
+    img = Image.open(file_path)
+    target_size = detection_size(img.size, det_limit_side_len, det_limit_type)
+    if target_size is not None:
+        img.draft(None, target_size)
+    return img, target_size
+
+def compute_image_hashes(img):
+    """对已打开的图片只缩小解码一次灰度图，计算所有去重哈希，返回 {哈希算法: 64 位整数}。"""
+    img.draft('L', HASH_DRAFT_SIZE)
+    gray = img.convert('L')
+    return {method: hash_to_int(hash_fn(gray)) for method, hash_fn in HASH_FUNCTIONS.items()}
+
+def compute_image_hash(file_path, hash_method='average'):
+    with Image.open(file_path) as img:
+        img.draft('L', HASH_DRAFT_SIZE)
+        return hash_to_int(HASH_FUNCTIONS[hash_method](img))
+
+def _safe_hash(args):
+    file_path, hash_method = args
+    try:
+        return compute_image_hash(file_path, hash_method), None
+    except Exception as e:
+        return None, e
+
+def hash_images(file_paths, hash_method='average', max_workers=DEFAULT_HASH_WORKERS, use_processes=False,
+                known_hashes=None):
+    """并行解码并计算哈希，按输入顺序产出 (文件路径, 哈希, 异常)，不保留解码后的图片。
+
+    known_hashes 为 {文件路径: 哈希}，其中的图片（上传时已计算哈希）不再解码。
+    """
+    known_hashes = known_hashes or {}
+    missing = [file_path for file_path in file_paths if file_path not in known_hashes]
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        tasks = ((file_path, hash_method) for file_path in missing)
+        computed = executor.map(_safe_hash, tasks, chunksize=8 if use_processes else 1)
+        for file_path in file_paths:
+            if file_path in known_hashes:
+                yield file_path, known_hashes[file_path], None
+            else:
+                img_hash, error = next(computed)
+                yield file_path, img_hash, error
+
+def remove_duplicates(file_paths, folder_path, similarity_threshold, hash_method='average',
+                      max_workers=DEFAULT_HASH_WORKERS, use_processes=False, known_hashes=None):
+    # 返回去重后的文件路径，图片留到OCR阶段再解码；known_hashes 中的图片直接使用已有哈希
+    unique_paths = []
+    # 汉明距离小于 (100 - 相似度阈值) 视为重复
+    index = HammingIndex(99 - similarity_threshold, capacity=max(1, len(file_paths)))
 
     with Progress() as progress:
         task = progress.add_task("[cyan]去重处理中...[/cyan]", total=len(file_paths))
 
-        for file_path in file_paths:
-            try:
-                img = Image.open(file_path)
-                img_hash = imagehash.average_hash(img)
-                
-                is_duplicate = False
-                for existing_hash, existing_path in hashes.items():
-                    if (img_hash - existing_hash) < (100 - similarity_threshold):
-                        is_duplicate = True
-                        console.print(f"[yellow]检测到相似图片: {file_path} 与 {existing_path}[/yellow]")
-                        break
-
-                if not is_duplicate:
-                    hashes[img_hash] = file_path
-                    unique_images.append(img)
+        for file_path, img_hash, error in hash_images(file_paths, hash_method, max_workers, use_processes,
+                                                      known_hashes):
+            if error is not None:
+                console.print(f"[red]处理 {file_path} 时出错: {str(error)}[/red]")
+            else:
+                match = index.query(img_hash)
+                if match is None:
+                    index.add(img_hash)
+                    unique_paths.append(file_path)
                     console.print(f"[green]添加新图片: {file_path}[/green]")
                 else:
+                    console.print(f"[yellow]检测到相似图片: {file_path} 与 {unique_paths[match]}[/yellow]")
                     console.print(f"[yellow]跳过重复图片: {file_path}[/yellow]")
 
-            except Exception as e:
-                console.print(f"[red]处理 {file_path} 时出错: {str(e)}[/red]")
-
             progress.update(task, advance=1)
 
-    console.print(f"[bold green]去重完成。原始图片数: {len(file_paths)}, 去重后图片数: {len(unique_images)}[/bold green]")
-    return unique_images
+    console.print(f"[bold green]去重完成。原始图片数: {len(file_paths)}, 去重后图片数: {len(unique_paths)}[/bold green]")
+    return unique_paths
 
 def get_files_from_folder(folder_path):
     if not os.path.isdir(folder_path):
@@ -0,0 +1,137 @@
+import re
+from collections import namedtuple
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+
+# 与 flexible_name_match 相同的候选名字规则
+NAME_PATTERN = re.compile(r'[\u4e00-\u9fa5]{2,4}')
+SCORE_CHUNK_SIZE = 8192  # 按候选分块计算字符包含矩阵，控制内存占用
+
+BatchMatchResult = namedtuple('BatchMatchResult', ['scores', 'matched', 'best_matches'])
+
+
+def _substrings(text):
+    return {text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)}
+
+
+class NameMatcher:
+    """批量名字匹配器：一次对多个名字和多段OCR文本打分。
+
+    先把所有文本中的候选名字去重建成词表和字符索引，
+    再用 rapidfuzz 的 C 实现计算 名字 × 候选 的相似度矩阵，
+    综合分与 flexible_name_match 完全一致：ratio*0.5 + char_match*30 + containment*20。
+    """
+
+    def __init__(self, texts):
+        self.vocab = []
+        self._vocab_ids = {}
+        offsets = [0]
+        flat_ids = []
+        for text in texts:
+            for name in NAME_PATTERN.findall(text.lower()):
+                vocab_id = self._vocab_ids.get(name)
+                if vocab_id is None:
+                    vocab_id = self._vocab_ids[name] = len(self.vocab)
+                    self.vocab.append(name)
+                flat_ids.append(vocab_id)
+            offsets.append(len(flat_ids))
+        self._flat_ids = np.asarray(flat_ids, dtype=np.int64)
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+
+        # 子串 -> 包含该子串的候选编号，用于判断 "名字 in 候选"
+        self._substring_index = {}
+        for vocab_id, candidate in enumerate(self.vocab):
+            for sub in _substrings(candidate):
+                self._substring_index.setdefault(sub, []).append(vocab_id)
+
+    def _char_match(self, names):
+        # char_match[名字, 候选] = 名字中（按出现次数计）出现在候选里的字符数 / 名字长度
+        chars = sorted({char for name in names for char in name})
+        char_ids = {char: i for i, char in enumerate(chars)}
+        name_counts = np.zeros((len(names), len(chars)), dtype=np.float64)
+        for row, name in enumerate(names):
+            for char in name:
+                name_counts[row, char_ids[char]] += 1
+        name_lengths = np.array([len(name) for name in names], dtype=np.float64)[:, None]
+
+        char_match = np.empty((len(names), len(self.vocab)), dtype=np.float64)
+        for start in range(0, len(self.vocab), SCORE_CHUNK_SIZE):
+            block = self.vocab[start:start + SCORE_CHUNK_SIZE]
+            presence = np.zeros((len(block), len(chars)), dtype=np.float64)
+            for row, candidate in enumerate(block):
+                for char in set(candidate):
+                    col = char_ids.get(char)
+                    if col is not None:
+                        presence[row, col] = 1
+            char_match[:, start:start + len(block)] = (name_counts @ presence.T) / name_lengths
+        return char_match
+
+    def _containment(self, names):
+        containment = np.zeros((len(names), len(self.vocab)), dtype=np.float64)
+        for row, name in enumerate(names):
+            # 候选 in 名字
+            for sub in _substrings(name):
+                vocab_id = self._vocab_ids.get(sub)
+                if vocab_id is not None:
+                    containment[row, vocab_id] = 1
+            # 名字 in 候选
+            containment[row, self._substring_index.get(name, [])] = 1
+        return containment
+
+    def score_matrix(self, names):
+        """返回 [名字数, 候选词表大小] 的综合分矩阵。"""
+        names = [name.lower() for name in names]
+        if any(not name for name in names):
+            raise ValueError("名字不能为空")
+        if not self.vocab:
+            return np.zeros((len(names), 0), dtype=np.float64)
+
+        # fuzzywuzzy 的 ratio 是四舍六入五成双后的整数
+        ratio = np.rint(cdist(names, self.vocab, scorer=fuzz.ratio, dtype=np.float64, workers=-1))
+        return ratio * 0.5 + self._char_match(names) * 30 + self._containment(names) * 20
+
+    def match(self, names, threshold=70):
+        """对每个 (名字, 文本) 取最高分候选，返回 BatchMatchResult。
+
+        scores 与 matched 的形状为 [名字数, 文本数]；best_matches[i][j] 为最佳候选，
+        同分时取文本中最先出现的，没有正分候选时为空字符串，与 flexible_name_match 一致。
+        """
+        scores = self.score_matrix(names)
+        num_texts = len(self._offsets) - 1
+        lengths = np.diff(self._offsets)
+        nonempty = lengths > 0
+        starts = self._offsets[:-1][nonempty]
+        segment_ids = np.repeat(np.arange(num_texts), lengths)
+
+        best_scores = np.zeros((len(names), num_texts), dtype=np.float64)
+        best_matches = []
+        for row in range(len(names)):
+            flat_scores = scores[row, self._flat_ids]
+            row_best = [""] * num_texts
+            if flat_scores.size:
+                best_scores[row, nonempty] = np.maximum.reduceat(flat_scores, starts)
+                is_best = flat_scores == best_scores[row, segment_ids]
+                best_positions = np.flatnonzero(is_best)
+                first_segments, first_index = np.unique(segment_ids[best_positions], return_index=True)
+                for text_idx, position in zip(first_segments, best_positions[first_index]):
+                    if best_scores[row, text_idx] > 0:
+                        row_best[text_idx] = self.vocab[self._flat_ids[position]]
+            best_matches.append(row_best)
+
+        return BatchMatchResult(best_scores, best_scores >= threshold, best_matches)
+
+
+def score_candidates(user_name, candidates):
+    """对单个名字和少量候选打分，结果与 flexible_name_match 中的 combined_score 相同。"""
+    user_name = user_name.lower()
+    if not user_name:
+        raise ValueError("名字不能为空")
+    if not candidates:
+        return np.zeros(0, dtype=np.float64)
+    ratio = np.rint(cdist([user_name], candidates, scorer=fuzz.ratio, dtype=np.float64)[0])
+    char_match = np.array([sum(1 for char in user_name if char in name) / len(user_name)
+                           for name in candidates], dtype=np.float64)
+    containment = np.array([1 if user_name in name or name in user_name else 0
+                            for name in candidates], dtype=np.float64)
+    return ratio * 0.5 + char_match * 30 + containment * 20
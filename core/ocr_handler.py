@@ -1,6 +1,6 @@
 import os
 import json
-from paddleocr import PaddleOCR
+import tempfile
 from PIL import Image, ImageDraw
 import numpy as np
 from fuzzywuzzy import fuzz
@@ -8,8 +8,17 @@ from rich.console import Console
 from rich.progress import Progress
 import re
 import traceback
-import yaml
 from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from core.engine_pool import get_engine_pool, load_yaml
+from core.batch_pipeline import iter_batched_ocr, DEFAULT_BATCH_SIZE
+from core.worker_pool import checkout_worker_pool, release_worker_pool, DEFAULT_NUM_WORKERS, DEFAULT_THREADS_PER_WORKER
+from core.result_cache import get_result_cache, make_params_key, DEFAULT_CACHE_DIR
+from core.text_index import OCRTextIndex
+from core.roi_ocr import iter_roi_ocr
+from core.resolution_planner import load_planned_image, load_source_image, plan_image
+from core.image_processor import detection_size, open_reduced
 
 console = Console()
 
@@ -31,18 +40,48 @@ DET_MOBILE_CONFIG_PATH = os.path.join(CONFIGS_DIR, 'det_cml_config.yml')
 REC_MOBILE_CONFIG_PATH = os.path.join(CONFIGS_DIR, 'rec_distill_config.yml')
 CLS_CONFIG_PATH = os.path.join(CONFIGS_DIR, 'cls_config.yml')
 
-# 定义一个命名元组来存储OCR处理结果
-OCRResult = namedtuple('OCRResult', ['processed_images', 'ocr_results', 'individual_ocr_results'])
+# 名字词典约束识别：整行约束为名字的概率不低于自由解码结果的该比例时才采用，
+# 证书上名字常嵌在句子里，这类文本行仍保留自由解码结果
+NAME_LEXICON_MIN_RATIO = 0.05
+
+# 定义一个命名元组来存储OCR处理结果；
+# match_results 与输入图片一一对应，元素为 (是否匹配, 匹配位置, 文本框坐标所在的图片尺寸)，不保存图片本身
+# text_index_path 为保存的文本索引文件，会话中只保存路径，重新匹配时再用 OCRTextIndex.load 读取
+OCRResult = namedtuple('OCRResult', ['match_results', 'ocr_results', 'individual_ocr_results', 'text_index',
+                                     'text_index_path'], defaults=(None, None))
+
+def resolve_model_paths(use_gpu):
+    if use_gpu:
+        return DET_SERVER_MODEL_DIR, REC_SERVER_MODEL_DIR, DET_SERVER_CONFIG_PATH, REC_SERVER_CONFIG_PATH
+    return DET_MOBILE_MODEL_DIR, REC_MOBILE_MODEL_DIR, DET_MOBILE_CONFIG_PATH, REC_MOBILE_CONFIG_PATH
+
+def build_engine_kwargs(ocr_lang, use_gpu, gpu_id, det_model_dir, rec_model_dir,
+                        det_limit_side_len=960, det_limit_type='max',
+                        rec_image_shape="3,48,320", rec_batch_num=6,
+                        use_angle_cls=True,
+                        det_db_thresh=0.3, det_db_box_thresh=0.6, det_db_unclip_ratio=1.5):
+    # 这些参数共同决定一个引擎实例，也是引擎池的键
+    return dict(
+        use_angle_cls=use_angle_cls,
+        lang=ocr_lang,
+        use_gpu=use_gpu,
+        gpu_id=gpu_id,
+        gpu_mem=500,
+        det_model_dir=det_model_dir,
+        rec_model_dir=rec_model_dir,
+        cls_model_dir=CLS_MODEL_DIR,
+        det_limit_side_len=det_limit_side_len,
+        det_limit_type=det_limit_type,
+        det_db_thresh=det_db_thresh,
+        det_db_box_thresh=det_db_box_thresh,
+        det_db_unclip_ratio=det_db_unclip_ratio,
+        rec_image_shape=rec_image_shape,
+        rec_batch_num=rec_batch_num,
+        max_text_length=25,
+        use_space_char=True,
+        show_log=True
+    )
 
-def load_yaml(yaml_path):
-    try:
-        with open(yaml_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-        return data
-    except Exception as e:
-        console.print(f"[red]加载YAML文件 {yaml_path} 时出错: {str(e)}[/red]")
-        return None
-        
 def flexible_name_match(user_name, ocr_text, threshold=70):
     user_name = user_name.lower()
     ocr_text = ocr_text.lower()
@@ -70,22 +109,30 @@ def flexible_name_match(user_name, ocr_text, threshold=70):
     
     return best_match_ratio >= threshold, best_match, all_matches
 
-def preprocess_image(img, det_limit_side_len=960, det_limit_type='max'):
+def preprocess_image(img, det_limit_side_len=960, det_limit_type='max', target_size=None):
+    # target_size 为按原图尺寸算好的检测输入尺寸，缩小解码的图片用它保证输出尺寸不变
     if img.mode != 'RGB':
         img = img.convert('RGB')
     
-    orig_w, orig_h = img.size
-    if det_limit_type == 'max':
-        ratio = det_limit_side_len / max(orig_h, orig_w)
-        if ratio < 1:
-            img = img.resize((int(orig_w * ratio), int(orig_h * ratio)), Image.LANCZOS)
-    elif det_limit_type == 'min':
-        ratio = det_limit_side_len / min(orig_h, orig_w)
-        if ratio > 1:
-            img = img.resize((int(orig_w * ratio), int(orig_h * ratio)), Image.LANCZOS)
+    if target_size is None:
+        target_size = detection_size(img.size, det_limit_side_len, det_limit_type)
+    if target_size is not None and img.size != target_size:
+        img = img.resize(target_size, Image.LANCZOS)
     
     return img
 
+def scale_positions(matched_positions, scale_x, scale_y):
+    """按比例换算文本框坐标，支持 4 个点和 8 个数两种格式。"""
+    scaled = []
+    for item in matched_positions:
+        box = item['position']
+        if isinstance(box, list) and len(box) == 8:
+            box = [coord * (scale_x if i % 2 == 0 else scale_y) for i, coord in enumerate(box)]
+        elif isinstance(box, list):
+            box = [[point[0] * scale_x, point[1] * scale_y] for point in box]
+        scaled.append(dict(item, position=box))
+    return scaled
+
 def draw_box_around_text(image, matched_positions, matched_name):
     draw = ImageDraw.Draw(image)
     for item in matched_positions:
@@ -130,25 +177,38 @@ def draw_box_around_text(image, matched_positions, matched_name):
             console.print(f"[yellow]警告：无法识别的边框格式：{box}[/yellow]")
     return image
 
+@contextmanager
+def name_lexicon_decoding(engine, names, min_ratio=NAME_LEXICON_MIN_RATIO):
+    # 识别期间把 CTC 解码切换为名字词典约束的束搜索，结束后恢复原解码方式；
+    # 识别模型不是 CTC 解码时保持不变
+    decoder = getattr(getattr(engine, 'text_recognizer', None), 'postprocess_op', None)
+    if not hasattr(decoder, 'set_lexicon'):
+        console.print(f"[yellow]当前识别模型不支持名字词典约束，使用普通解码[/yellow]")
+        yield
+        return
+    saved = (decoder.decode_mode, decoder.lexicon_trie, decoder.lexicon_min_ratio)
+    try:
+        decoder.set_lexicon(names)
+        decoder.decode_mode = 'lexicon'
+        decoder.lexicon_min_ratio = min_ratio
+        yield
+    finally:
+        decoder.decode_mode, decoder.lexicon_trie, decoder.lexicon_min_ratio = saved
+
 def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_threshold,
                    det_limit_side_len=960, det_limit_type='max',
                    rec_image_shape="3,48,320", rec_batch_num=6,
                    use_angle_cls=True,
                    det_db_thresh=0.3, det_db_box_thresh=0.6, det_db_unclip_ratio=1.5,
-                   save_crop_res=False, crop_res_save_dir="./output"):
+                   save_crop_res=False, crop_res_save_dir="./output",
+                   pipeline_mode='serial', batch_size=DEFAULT_BATCH_SIZE,
+                   num_workers=DEFAULT_NUM_WORKERS, threads_per_worker=DEFAULT_THREADS_PER_WORKER,
+                   use_cache=True, cache_dir=DEFAULT_CACHE_DIR, adaptive_resolution=False, reduced_decode=False,
+                   name_lexicon=False):
     
     console.print(f"[cyan]当前工作目录: {os.getcwd()}[/cyan]")
     
-    if use_gpu:
-        det_model_dir = DET_SERVER_MODEL_DIR
-        rec_model_dir = REC_SERVER_MODEL_DIR
-        det_config_path = DET_SERVER_CONFIG_PATH
-        rec_config_path = REC_SERVER_CONFIG_PATH
-    else:
-        det_model_dir = DET_MOBILE_MODEL_DIR
-        rec_model_dir = REC_MOBILE_MODEL_DIR
-        det_config_path = DET_MOBILE_CONFIG_PATH
-        rec_config_path = REC_MOBILE_CONFIG_PATH
+    det_model_dir, rec_model_dir, det_config_path, rec_config_path = resolve_model_paths(use_gpu)
     
     console.print(f"[cyan]模型路径:[/cyan]")
     console.print(f"[cyan]  检测模型: {det_model_dir}[/cyan]")
@@ -165,39 +225,151 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
     console.print(f"[cyan]  检测限制类型: {det_limit_type}[/cyan]")
     console.print(f"[cyan]  识别图像形状: {rec_image_shape}[/cyan]")
     console.print(f"[cyan]  识别批次大小: {rec_batch_num}[/cyan]")
+    if pipeline_mode == 'workers' and use_gpu:
+        console.print(f"[yellow]多进程模式仅支持CPU，改为逐张处理[/yellow]")
+        pipeline_mode = 'serial'
+    console.print(f"[cyan]  处理模式: {pipeline_mode}[/cyan]")
+    if pipeline_mode == 'roi':
+        # 提前结束时只识别了部分文本行，不能作为整页结果写入缓存
+        use_cache = False
+    if adaptive_resolution and (pipeline_mode == 'workers' or det_limit_type != 'max'):
+        console.print(f"[yellow]自适应分辨率只支持 'max' 限制类型且不支持多进程模式，改用固定分辨率[/yellow]")
+        adaptive_resolution = False
+    console.print(f"[cyan]  自适应分辨率: {'是' if adaptive_resolution else '否'}[/cyan]")
+    console.print(f"[cyan]  JPEG 缩小解码: {'是' if reduced_decode else '否'}[/cyan]")
+    if name_lexicon and (pipeline_mode == 'workers' or not user_name.strip()):
+        console.print(f"[yellow]名字词典约束识别需要填写名字且不支持多进程模式，使用普通解码[/yellow]")
+        name_lexicon = False
+    console.print(f"[cyan]  名字词典约束识别: {'是' if name_lexicon else '否'}[/cyan]")
 
-    det_config = load_yaml(det_config_path)
-    rec_config = load_yaml(rec_config_path)
-    cls_config = load_yaml(CLS_CONFIG_PATH)
-    if det_config is None or rec_config is None or cls_config is None:
-        return OCRResult([], [], [])
+    engine_kwargs = build_engine_kwargs(
+        ocr_lang, use_gpu, gpu_id, det_model_dir, rec_model_dir,
+        det_limit_side_len=det_limit_side_len,
+        det_limit_type=det_limit_type,
+        rec_image_shape=rec_image_shape,
+        rec_batch_num=rec_batch_num,
+        use_angle_cls=use_angle_cls,
+        det_db_thresh=det_db_thresh,
+        det_db_box_thresh=det_db_box_thresh,
+        det_db_unclip_ratio=det_db_unclip_ratio
+    )
+    config_paths = (det_config_path, rec_config_path, CLS_CONFIG_PATH)
+    lexicon = [user_name.strip()] if name_lexicon else None
+    cache_params_key = make_params_key(engine_kwargs, use_angle_cls, lexicon) if use_cache else None
 
+    if pipeline_mode == 'workers':
+        if any(load_yaml(path) is None for path in config_paths):
+            return OCRResult([], [], [])
+        try:
+            worker_pool = checkout_worker_pool(engine_kwargs, num_workers, threads_per_worker)
+        except Exception as e:
+            console.print(f"[red]错误：启动OCR进程池时出错。{str(e)}[/red]")
+            console.print(f"[red]错误详情：\n{traceback.format_exc()}[/red]")
+            return OCRResult([], [], [])
+        try:
+            return _run_ocr(worker_pool, images, user_name, name_match_threshold,
+                            det_limit_side_len, det_limit_type, use_angle_cls,
+                            save_crop_res, crop_res_save_dir, pipeline_mode,
+                            cache_params_key=cache_params_key, reduced_decode=reduced_decode)
+        finally:
+            release_worker_pool(worker_pool)
+
+    pool = get_engine_pool()
     try:
-        ocr = PaddleOCR(
-            use_angle_cls=use_angle_cls,
-            lang=ocr_lang,
-            use_gpu=use_gpu,
-            gpu_mem=500,
-            det_model_dir=det_model_dir,
-            rec_model_dir=rec_model_dir,
-            cls_model_dir=CLS_MODEL_DIR,
-            det_limit_side_len=det_limit_side_len,
-            det_limit_type=det_limit_type,
-            det_db_thresh=det_db_thresh,
-            det_db_box_thresh=det_db_box_thresh,
-            det_db_unclip_ratio=det_db_unclip_ratio,
-            rec_image_shape=rec_image_shape,
-            rec_batch_num=rec_batch_num,
-            max_text_length=25,
-            use_space_char=True,
-            show_log=True
-        )
+        entry = pool.checkout(engine_kwargs, config_paths)
     except Exception as e:
         console.print(f"[red]错误：初始化PaddleOCR时出错。{str(e)}[/red]")
         console.print(f"[red]错误详情：\n{traceback.format_exc()}[/red]")
         return OCRResult([], [], [])
 
-    processed_images = []
+    try:
+        # 解码方式在引擎锁内切换，不影响其他会话
+        decoding = name_lexicon_decoding(entry.engine, lexicon) if lexicon else nullcontext()
+        with entry.lock, decoding:
+            entry.uses += 1
+            return _run_ocr(entry.engine, images, user_name, name_match_threshold,
+                            det_limit_side_len, det_limit_type, use_angle_cls,
+                            save_crop_res, crop_res_save_dir,
+                            pipeline_mode, batch_size, cache_params_key, adaptive_resolution,
+                            reduced_decode)
+    finally:
+        pool.release(entry)
+
+def load_image(img, det_limit_side_len=960, det_limit_type='max', reduced_decode=False):
+    if img is None:
+        raise ValueError("图像为空或无效")
+
+    target_size = None
+    if isinstance(img, str):
+        if not os.path.exists(img):
+            raise FileNotFoundError(f"找不到图像文件：{img}")
+        if reduced_decode:
+            # 大尺寸 JPEG 直接缩小解码，再缩放到按原图尺寸计算的检测输入尺寸
+            img, target_size = open_reduced(img, det_limit_side_len, det_limit_type)
+        else:
+            img = Image.open(img)
+
+    if not isinstance(img, Image.Image):
+        img = Image.fromarray(np.uint8(img))
+
+    return preprocess_image(img, det_limit_side_len, det_limit_type, target_size)
+
+def parse_ocr_result(result):
+    text_with_positions = []
+    if result is not None:
+        for item in result:
+            if isinstance(item, list):
+                for line in item:
+                    if isinstance(line, list) and len(line) >= 2:
+                        position = line[0]
+                        if isinstance(line[1], tuple) and len(line[1]) >= 2:
+                            text, confidence = line[1][:2]
+                        elif isinstance(line[1], str):
+                            text = line[1]
+                            confidence = line[2] if len(line) > 2 else 1.0
+                        else:
+                            continue
+                        text_with_positions.append({
+                            'text': text,
+                            'position': position,
+                            'confidence': confidence
+                        })
+            elif isinstance(item, dict):
+                text_with_positions.append(item)
+    return text_with_positions
+
+def _iter_serial_ocr(ocr, images, load_fn, use_angle_cls):
+    # 逐张图片加载并识别，按输入顺序产出 (序号, 图片, 原始结果, 异常)
+    for idx, img in enumerate(images):
+        try:
+            img = load_fn(img)
+            result = ocr.ocr(np.array(img), cls=use_angle_cls)
+        except Exception as e:
+            yield idx, img, None, e
+            continue
+        yield idx, img, result, None
+
+def _iter_loaded(images, load_fn):
+    for img in images:
+        try:
+            yield load_fn(img), None
+        except Exception as e:
+            yield img, e
+
+def _plan_for_ocr(img, text_detector, max_side=960):
+    # 返回规划后的图片和把识别结果坐标换算回原图的函数
+    planned = plan_image(img, text_detector, max_side)
+    return planned, partial(scale_positions, scale_x=img.size[0] / planned.size[0],
+                            scale_y=img.size[1] / planned.size[1])
+
+def _run_ocr(ocr, images, user_name, name_match_threshold,
+             det_limit_side_len, det_limit_type, use_angle_cls,
+             save_crop_res, crop_res_save_dir,
+             pipeline_mode='serial', batch_size=DEFAULT_BATCH_SIZE, cache_params_key=None,
+             adaptive_resolution=False, reduced_decode=False):
+    # 多进程模式下 ocr 是 OCRWorkerPool，其余模式下是 PaddleOCR 引擎
+    # 每张图片识别完只留下匹配结果和尺寸，图片本身在预览和导出时再从原文件加载
+    match_results = []
     all_ocr_results = []
     individual_ocr_results = []
 
@@ -205,51 +377,60 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
     output_dir = os.path.join(os.getcwd(), 'ocr_results')
     os.makedirs(output_dir, exist_ok=True)
 
-    with Progress() as progress:
-        task = progress.add_task("[cyan]OCR处理中...[/cyan]", total=len(images))
+    if adaptive_resolution:
+        # 先用低分辨率检测估计字高，再一次缩放到够用的最小尺寸
+        load_fn = partial(load_planned_image, text_detector=ocr.text_detector, max_side=det_limit_side_len,
+                          reduced_decode=reduced_decode)
+    else:
+        load_fn = partial(load_image, det_limit_side_len=det_limit_side_len, det_limit_type=det_limit_type,
+                          reduced_decode=reduced_decode)
 
-        for idx, img in enumerate(images):
-            try:
-                if img is None:
-                    raise ValueError("图像为空或无效")
+    roi_stats = {}
 
-                if isinstance(img, str):
-                    if not os.path.exists(img):
-                        raise FileNotFoundError(f"找不到图像文件：{img}")
-                    img = Image.open(img)
+    def ocr_stream_for(imgs, preloaded=False):
+        loader = (lambda img: img) if preloaded else load_fn
+        if pipeline_mode == 'roi':
+            return iter_roi_ocr(ocr, imgs, loader, user_name, name_match_threshold, use_angle_cls,
+                                roi_stats=roi_stats)
+        if pipeline_mode == 'batched':
+            return iter_batched_ocr(ocr, imgs, loader, use_angle_cls, batch_size)
+        if pipeline_mode == 'workers':
+            return ocr.imap_ocr(imgs, det_limit_side_len, det_limit_type, use_angle_cls, preloaded=preloaded,
+                                reduced_decode=reduced_decode)
+        return _iter_serial_ocr(ocr, imgs, loader, use_angle_cls)
 
-                if not isinstance(img, Image.Image):
-                    img = Image.fromarray(np.uint8(img))
+    if cache_params_key is not None:
+        # 先按像素哈希查缓存，只有未命中的图片才会交给OCR引擎
+        cache = get_result_cache(cache_dir)
+        prepare_miss = None
+        if pipeline_mode == 'workers':
+            load_many = partial(ocr.imap_load, det_limit_side_len=det_limit_side_len, det_limit_type=det_limit_type,
+                                reduced_decode=reduced_decode)
+        elif adaptive_resolution:
+            # 缓存键取规划前的原图，分辨率规划的探测检测只对未命中的图片执行
+            load_many = partial(_iter_loaded, load_fn=partial(load_source_image, max_side=det_limit_side_len,
+                                                              reduced_decode=reduced_decode))
+            prepare_miss = partial(_plan_for_ocr, text_detector=ocr.text_detector, max_side=det_limit_side_len)
+        else:
+            load_many = partial(_iter_loaded, load_fn=load_fn)
+        ocr_stream = cache.iter_ocr(images, load_many, partial(ocr_stream_for, preloaded=True),
+                                    parse_ocr_result, cache_params_key, chunk_size=batch_size,
+                                    prepare_miss=prepare_miss)
+    else:
+        ocr_stream = ocr_stream_for(images)
 
-                img = preprocess_image(img, det_limit_side_len, det_limit_type)
-                img_array = np.array(img)
+    with Progress() as progress:
+        task = progress.add_task("[cyan]OCR处理中...[/cyan]", total=len(images))
+
+        for idx, img, result, error in ocr_stream:
+            try:
+                if error is not None:
+                    raise error
 
-                result = ocr.ocr(img_array, cls=use_angle_cls)
-                
                 console.print(f"[cyan]OCR 原始结果:[/cyan]")
                 console.print(result)
 
-                text_with_positions = []
-                if result is not None:
-                    for item in result:
-                        if isinstance(item, list):
-                            for line in item:
-                                if isinstance(line, list) and len(line) >= 2:
-                                    position = line[0]
-                                    if isinstance(line[1], tuple) and len(line[1]) >= 2:
-                                        text, confidence = line[1][:2]
-                                    elif isinstance(line[1], str):
-                                        text = line[1]
-                                        confidence = line[2] if len(line) > 2 else 1.0
-                                    else:
-                                        continue
-                                    text_with_positions.append({
-                                        'text': text,
-                                        'position': position,
-                                        'confidence': confidence
-                                    })
-                        elif isinstance(item, dict):
-                            text_with_positions.append(item)
+                text_with_positions = parse_ocr_result(result)
                 
                 full_text = "\n".join([item['text'] for item in text_with_positions])
                 
@@ -264,8 +445,15 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
                 individual_result = {
                     'image_index': idx,
                     'ocr_result': text_with_positions,
-                    'full_text': full_text
+                    'full_text': full_text,
+                    # 文本框坐标所在的图片尺寸，预览和导出时据此换算坐标
+                    'image_size': list(img.size)
                 }
+                stats = roi_stats.get(idx)
+                if stats is not None:
+                    individual_result['roi_stats'] = stats._asdict()
+                    console.print(f"[cyan]图片 {idx+1} 识别了 {stats.recognized}/{stats.detected} 个文本行, "
+                                  f"跳过 {stats.skipped} 个[/cyan]")
                 individual_ocr_results.append(individual_result)
 
                 # 为每张图片保存单独的OCR结果
@@ -288,11 +476,10 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
                         if matched_name.lower() in item['text'].lower() or item['text'].lower() in matched_name.lower():
                             console.print(f"  文本: {item['text']}, 位置: {item['position']}")
                             matched_positions.append(item)
-                    marked_img = draw_box_around_text(img, matched_positions, matched_name)
-                    processed_images.append((marked_img, True, matched_positions))
+                    match_results.append((True, matched_positions, img.size))
                 else:
                     console.print(f"[yellow]图片 {idx+1} 未找到匹配: 用户名 '{user_name}' 未被检测到[/yellow]")
-                    processed_images.append((img, False, []))
+                    match_results.append((False, [], img.size))
 
                 if save_crop_res:
                     for i, item in enumerate(text_with_positions):
@@ -302,7 +489,7 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
             except Exception as e:
                 console.print(f"[red]图片 {idx+1} OCR处理时出错: {str(e)}[/red]")
                 console.print(f"[red]错误详情：\n{traceback.format_exc()}[/red]")
-                processed_images.append((img, False, []))
+                match_results.append((False, [], img.size if isinstance(img, Image.Image) else None))
                 error_result = {
                     'image_index': idx,
                     'ocr_result': [],
@@ -320,11 +507,15 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
 
             progress.update(task, advance=1)
 
-    console.print(f"[bold green]OCR处理完成。处理图片数: {len(processed_images)}[/bold green]")
+    console.print(f"[bold green]OCR处理完成。处理图片数: {len(match_results)}[/bold green]")
+    if roi_stats:
+        detected = sum(stats.detected for stats in roi_stats.values())
+        skipped = sum(stats.skipped for stats in roi_stats.values())
+        console.print(f"[cyan]提前结束模式: 共检测 {detected} 个文本行, 跳过识别 {skipped} 个[/cyan]")
     
     console.print(f"[cyan]返回值类型:[/cyan]")
-    console.print(f"processed_images 类型: {type(processed_images)}")
-    console.print(f"processed_images 长度: {len(processed_images)}")
+    console.print(f"match_results 类型: {type(match_results)}")
+    console.print(f"match_results 长度: {len(match_results)}")
     console.print(f"all_ocr_results 类型: {type(all_ocr_results)}")
     console.print(f"all_ocr_results 长度: {len(all_ocr_results)}")
     console.print(f"individual_ocr_results 类型: {type(individual_ocr_results)}")
@@ -336,5 +527,17 @@ def process_images(images, user_name, ocr_lang, use_gpu, gpu_id, name_match_thre
         json.dump(individual_ocr_results, f, ensure_ascii=False, indent=2)
     
     console.print(f"[green]所有图片的OCR结果汇总已保存到: {all_results_file}[/green]")
+
+    # 建立文本倒排索引，之后修改名字或阈值时可以直接重新匹配
+    # 每次处理写入单独的文件，多个会话同时处理时互不覆盖
+    text_index = OCRTextIndex(individual_ocr_results)
+    fd, text_index_file = tempfile.mkstemp(prefix='text_index_', suffix='.json', dir=output_dir)
+    os.close(fd)
+    text_index.save(text_index_file)
+    console.print(f"[green]文本索引已保存到: {text_index_file} (候选名字 {len(text_index.vocab)} 个)[/green]")
+    if cache_params_key is not None:
+        cache_stats = get_result_cache(cache_dir).stats()
+        console.print(f"[cyan]OCR结果缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, "
+                      f"共 {cache_stats['entries']} 条 ({cache_stats['size_mb']:.1f}MB)[/cyan]")
     
-    return OCRResult(processed_images, all_ocr_results, individual_ocr_results)
+    return OCRResult(match_results, all_ocr_results, individual_ocr_results, text_index, text_index_file)
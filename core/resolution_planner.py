@@ -0,0 +1,88 @@
+import os
+from collections import namedtuple
+import cv2
+import numpy as np
+from PIL import Image
+from rich.console import Console
+from core.roi_ocr import box_sizes
+from core.image_processor import open_reduced
+
+console = Console()
+
+PROBE_SIDE = 480            # 低分辨率探测的最长边
+MIN_TEXT_HEIGHT = 20        # 检测输入中文本行的最小像素高度，低于该值检测召回明显下降
+TEXT_HEIGHT_PERCENTILE = 20  # 用较小的文本行估计字高，保证大部分文本行都不低于最小高度
+MIN_PLAN_SIDE = 480         # 规划出的最长边下限
+SIDE_STEP = 32              # 检测模型要求输入边长是 32 的倍数
+
+# 分辨率规划：原图尺寸、检测输入尺寸 (宽, 高)、估计的原图字高（像素）、探测到的文本行数
+ResolutionPlan = namedtuple('ResolutionPlan', ['orig_size', 'size', 'text_height', 'num_probe_boxes'])
+
+
+def _round_size(width, height, scale):
+    return (max(SIDE_STEP, int(round(width * scale / SIDE_STEP)) * SIDE_STEP),
+            max(SIDE_STEP, int(round(height * scale / SIDE_STEP)) * SIDE_STEP))
+
+
+def plan_resolution(text_detector, img, max_side=960, min_text_height=MIN_TEXT_HEIGHT,
+                    probe_side=PROBE_SIDE):
+    """用一次低分辨率检测估计字高，选出让文本行不低于 min_text_height 的最小检测尺寸。
+
+    img 为 RGB 数组；最长边限制在 [MIN_PLAN_SIDE, max_side] 之间，小图中字很小时允许放大。
+    没有检测到文本时按 max_side 处理，与固定分辨率相同。
+    """
+    orig_h, orig_w = img.shape[:2]
+    probe_scale = min(1.0, probe_side / max(orig_h, orig_w))
+    probe = img
+    if probe_scale < 1:
+        probe = cv2.resize(img, (max(1, int(orig_w * probe_scale)), max(1, int(orig_h * probe_scale))),
+                           interpolation=cv2.INTER_AREA)
+    dt_boxes, _ = text_detector(probe)
+
+    if dt_boxes is None or len(dt_boxes) == 0:
+        text_height = None
+        target_side = max_side
+    else:
+        _, heights = box_sizes(dt_boxes)
+        text_height = float(np.percentile(heights, TEXT_HEIGHT_PERCENTILE)) / probe_scale
+        target_side = max(orig_h, orig_w) * min_text_height / text_height
+    target_side = min(max(target_side, MIN_PLAN_SIDE), max_side)
+    size = _round_size(orig_w, orig_h, target_side / max(orig_h, orig_w))
+    return ResolutionPlan((orig_w, orig_h), size, text_height,
+                          0 if dt_boxes is None else len(dt_boxes))
+
+
+def load_source_image(img, max_side=960, reduced_decode=False):
+    """解码分辨率规划前的原图，返回 RGB 的 PIL 图片。reduced_decode 时大尺寸 JPEG 先按 max_side 缩小解码。"""
+    if img is None:
+        raise ValueError("图像为空或无效")
+    if isinstance(img, str):
+        if not os.path.exists(img):
+            raise FileNotFoundError(f"找不到图像文件：{img}")
+        img = open_reduced(img, max_side)[0] if reduced_decode else Image.open(img)
+    if isinstance(img, Image.Image):
+        return img.convert('RGB') if img.mode != 'RGB' else img
+    arr = np.asarray(img, dtype=np.uint8)
+    if arr.ndim == 2:
+        arr = cv2.cvtColor(arr, cv2.COLOR_GRAY2RGB)
+    return Image.fromarray(arr)
+
+
+def plan_image(img, text_detector, max_side=960, min_text_height=MIN_TEXT_HEIGHT):
+    """对 load_source_image 得到的原图做分辨率规划，只做一次快速缩放，得到的尺寸已经是 32 的倍数，
+    检测模型内部不会再缩放。返回 PIL 图片。"""
+    arr = np.asarray(img, dtype=np.uint8)
+    plan = plan_resolution(text_detector, arr, max_side, min_text_height)
+    if plan.size != plan.orig_size:
+        shrinking = plan.size[0] * plan.size[1] < plan.orig_size[0] * plan.orig_size[1]
+        arr = cv2.resize(arr, plan.size, interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+    text_height = f"{plan.text_height:.1f}px" if plan.text_height is not None else "未知"
+    console.print(f"[cyan]分辨率规划: {plan.orig_size[0]}x{plan.orig_size[1]} -> {plan.size[0]}x{plan.size[1]}, "
+                  f"原图字高约 {text_height}[/cyan]")
+    return Image.fromarray(arr)
+
+
+def load_planned_image(img, text_detector, max_side=960, min_text_height=MIN_TEXT_HEIGHT,
+                       reduced_decode=False):
+    """按分辨率规划加载图片，等价于 load_source_image 后再 plan_image。返回 PIL 图片。"""
+    return plan_image(load_source_image(img, max_side, reduced_decode), text_detector, max_side, min_text_height)
@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from rich.console import Console
+
+console = Console()
+
+# 缓存默认配置，相对路径在 get_result_cache 调用时按当前工作目录解析
+DEFAULT_CACHE_DIR = 'ocr_cache'
+DEFAULT_MAX_SIZE_MB = 512
+DEFAULT_CHUNK_SIZE = 32  # 每次查询缓存的图片数，未命中的图片成批交给OCR
+
+
+def make_params_key(engine_kwargs, use_angle_cls=True, lexicon=None):
+    # 模型路径和检测/识别参数都会影响结果，全部纳入缓存键；
+    # 词典约束解码的结果与词典有关，词典也纳入缓存键
+    params = dict(engine_kwargs, cls=use_angle_cls)
+    if lexicon:
+        params['lexicon'] = sorted(lexicon)
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def hash_image(img_array, params_key):
+    img_array = np.ascontiguousarray(img_array)
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(params_key.encode('utf-8'))
+    hasher.update(str((img_array.shape, img_array.dtype.str)).encode('ascii'))
+    hasher.update(img_array.data)
+    return hasher.hexdigest()
+
+
+class OCRResultCache:
+    """以图片像素哈希和OCR参数为键的持久化识别结果缓存。
+
+    每条记录保存一张图片的 text_with_positions，按最近使用顺序在总大小超限时淘汰。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = None
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        # 按修改时间从旧到新建立 LRU 索引，命中时会更新修改时间
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_size = sum(self._index.values())
+
+    def _ensure_index(self):
+        if self._index is None:
+            self._load_index()
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text_with_positions = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                self._total_size -= self._index.pop(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return text_with_positions
+
+    def put(self, key, text_with_positions):
+        path = self._path(key)
+        data = json.dumps(text_with_positions, ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            self._ensure_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._total_size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_size > self.max_size and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._total_size -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            self._ensure_index()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._index),
+                'size_mb': self._total_size / (1024 * 1024),
+            }
+
+    def iter_ocr(self, images, load_many, run_misses, parse_fn, params_key, chunk_size=DEFAULT_CHUNK_SIZE,
+                 prepare_miss=None):
+        """先查缓存再识别，按输入顺序产出 (序号, 图片, text_with_positions, 异常)。
+
+        load_many(images) 按顺序产出 (图片, 异常)；run_misses(images) 对已加载的
+        未命中图片做OCR，产出与逐张模式相同的 (序号, 图片, 原始结果, 异常)。
+        prepare_miss(图片) 返回 (送入OCR的图片, 把文本框换算回原图坐标的函数)，只对未命中的图片调用，
+        用于分辨率规划等较慢的预处理；此时缓存键和产出的图片、坐标都以 load_many 加载的图片为准。
+        """
+        for start in range(0, len(images), chunk_size):
+            chunk = images[start:start + chunk_size]
+            outputs = []
+            misses = []
+            for offset, (img, error) in enumerate(load_many(chunk)):
+                idx = start + offset
+                if error is not None:
+                    outputs.append([idx, img, None, error])
+                    continue
+                key = hash_image(np.asarray(img), params_key)
+                cached = self.get(key)
+                outputs.append([idx, img, cached, None])
+                if cached is None:
+                    misses.append((offset, key))
+
+            if prepare_miss is not None:
+                prepared = []
+                for offset, key in misses:
+                    try:
+                        miss_img, to_source = prepare_miss(outputs[offset][1])
+                    except Exception as e:
+                        outputs[offset][3] = e
+                        continue
+                    prepared.append((offset, key, miss_img, to_source))
+            else:
+                prepared = [(offset, key, outputs[offset][1], None) for offset, key in misses]
+
+            if prepared:
+                miss_images = [miss_img for _, _, miss_img, _ in prepared]
+                for miss_idx, img, result, error in run_misses(miss_images):
+                    offset, key, _, to_source = prepared[miss_idx]
+                    if error is not None:
+                        outputs[offset][2:] = [None, error]
+                        continue
+                    text_with_positions = parse_fn(result)
+                    if to_source is not None:
+                        # 坐标换算回原图，命中和未命中的结果都对应 load_many 加载的图片
+                        text_with_positions = to_source(text_with_positions)
+                        img = outputs[offset][1]
+                    self.put(key, text_with_positions)
+                    outputs[offset][1:] = [img, text_with_positions, None]
+
+            for idx, img, result, error in outputs:
+                yield idx, img, result, error
+
+
+_result_caches = {}  # 缓存目录绝对路径 -> OCRResultCache
+_result_caches_lock = threading.Lock()
+
+
+def get_result_cache(cache_dir=DEFAULT_CACHE_DIR):
+    """返回 cache_dir 对应的进程级缓存，同一目录的所有会话共用一个实例。"""
+    cache_dir = os.path.abspath(cache_dir)
+    with _result_caches_lock:
+        cache = _result_caches.get(cache_dir)
+        if cache is None:
+            cache = _result_caches[cache_dir] = OCRResultCache(cache_dir)
+        return cache
@@ -1,23 +1,129 @@
 import os
-from PIL import Image
+import time
 import zipfile
+import tempfile
 from io import BytesIO
+from collections import namedtuple, deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+from core.ocr_handler import load_image, draw_box_around_text, scale_positions
 
-def separate_results(processed_images):
-    matched = [img for img, is_matched in processed_images if is_matched]
-    unmatched = [img for img, is_matched in processed_images if not is_matched]
+console = Console()
+
+DEFAULT_EXPORT_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+MAX_PENDING_ENCODES = 2  # 每个线程最多预先编码的图片数，限制内存占用
+
+# 导出目录中超过该时长的压缩包视为已下载或已放弃，下次导出时删除
+EXPORT_MAX_AGE_SECONDS = 6 * 3600
+
+# 已经压缩过的图片格式直接存储，再用 deflate 压缩只会浪费CPU
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# 处理结果只记录原图路径和匹配到的文本框，需要时再加载图片；
+# image_size 为文本框坐标所在图片的 (宽, 高)，None 表示与 load_image 加载的尺寸相同
+ResultRecord = namedtuple('ResultRecord', ['path', 'is_matched', 'matched_positions', 'image_size'],
+                          defaults=(None,))
+
+def make_result_record(path, match_result):
+    # match_result 为 _run_ocr 产出的 (是否匹配, 匹配位置, 图片尺寸)
+    is_matched, matched_positions, image_size = match_result
+    return ResultRecord(path, is_matched, matched_positions if is_matched else [],
+                        tuple(image_size) if image_size else None)
+
+def build_result_records(image_paths, match_results):
+    # match_results 与 image_paths 一一对应
+    records = [make_result_record(path, match_result) for path, match_result in zip(image_paths, match_results)]
+    matched = [record for record in records if record.is_matched]
+    unmatched = [record for record in records if not record.is_matched]
     return matched, unmatched
 
-def download_results(matched, unmatched):
-    with zipfile.ZipFile('results.zip', 'w') as zipf:
-        for i, img in enumerate(matched):
-            img_byte_arr = BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            zipf.writestr(f'matched/matched_{i+1}.png', img_byte_arr.getvalue())
-        
-        for i, img in enumerate(unmatched):
-            img_byte_arr = BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            zipf.writestr(f'unmatched/unmatched_{i+1}.png', img_byte_arr.getvalue())
-    
-    return 'results.zip'
+def match_result_records(text_index, image_paths, user_name, name_match_threshold, use_pinyin=False):
+    """用文本索引重新匹配名字，直接得到结果记录，不加载任何图片。"""
+    hits = {hit.image_index: hit for hit in text_index.match(user_name, name_match_threshold, use_pinyin)}
+    sizes = {doc.get('image_index', i): doc.get('image_size') for i, doc in enumerate(text_index.documents)}
+    match_results = []
+    for idx in range(len(image_paths)):
+        hit = hits.get(idx)
+        if hit is not None:
+            match_results.append((True, hit.matched_positions, sizes.get(idx)))
+        else:
+            match_results.append((False, [], sizes.get(idx)))
+    return build_result_records(image_paths, match_results)
+
+def render_record(record, det_limit_side_len=960, det_limit_type='max'):
+    # 文本框坐标是在OCR加载后的图片上得到的，按相同参数重新加载再标注
+    img = load_image(record.path, det_limit_side_len, det_limit_type)
+    if record.is_matched:
+        matched_positions = record.matched_positions
+        if record.image_size and tuple(record.image_size) != img.size:
+            # OCR 时使用了自适应分辨率，坐标换算到当前加载的尺寸
+            matched_positions = scale_positions(matched_positions, img.size[0] / record.image_size[0],
+                                                img.size[1] / record.image_size[1])
+        img = draw_box_around_text(img, matched_positions, "")
+    return img
+
+def _encode_annotated(record, det_limit_side_len, det_limit_type):
+    img = render_record(record, det_limit_side_len, det_limit_type)
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def _bounded_map(executor, fn, items, max_pending):
+    # 按顺序产出结果，同时最多只有 max_pending 个任务在执行或等待写入
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def remove_stale_exports(export_dir, max_age_seconds=EXPORT_MAX_AGE_SECONDS):
+    # 删除导出目录中过期的压缩包，会话结束后没有其他时机清理它们
+    if not os.path.isdir(export_dir):
+        return
+    now = time.time()
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if name.endswith(('.zip', '.tmp')) and now - os.path.getmtime(path) > max_age_seconds:
+                os.remove(path)
+        except OSError:
+            pass
+
+def download_results(matched, unmatched, output_path=None, max_workers=DEFAULT_EXPORT_WORKERS,
+                     det_limit_side_len=960, det_limit_type='max', output_dir=None):
+    """把处理结果流式写入 zip 文件并返回路径。
+
+    matched 和 unmatched 为 ResultRecord 列表：未匹配的图片直接从原始文件拷贝，
+    匹配的图片在线程池中重新加载并标注后编码为 PNG，任何时候只有少量图片在内存中。
+    不指定 output_path 时在 output_dir（默认为系统临时目录）中新建文件，多个会话同时导出互不覆盖，
+    由调用方用完后删除；导出失败时不留下文件。
+    """
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(prefix='results_', suffix='.zip', dir=output_dir)
+        os.close(fd)
+    tmp_path = f"{output_path}.tmp"
+    encode = partial(_encode_annotated, det_limit_side_len=det_limit_side_len, det_limit_type=det_limit_type)
+
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zipf, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            encoded = _bounded_map(executor, encode, matched, max_workers * MAX_PENDING_ENCODES)
+            for i, data in enumerate(encoded):
+                zipf.writestr(f'matched/matched_{i+1}.png', data, compress_type=zipfile.ZIP_STORED)
+
+            for i, record in enumerate(unmatched):
+                ext = os.path.splitext(record.path)[1].lower()
+                compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                zipf.write(record.path, f'unmatched/unmatched_{i+1}{ext}', compress_type=compress_type)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        for path in (tmp_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    console.print(f"[green]结果已导出到 {output_path}: 匹配 {len(matched)} 张, 未匹配 {len(unmatched)} 张, "
+                  f"{os.path.getsize(output_path) / (1024 * 1024):.1f}MB[/green]")
+    return output_path
@@ -0,0 +1,125 @@
+import copy
+from collections import namedtuple
+import numpy as np
+from paddleocr.paddleocr import predict_system
+from rich.console import Console
+from core.name_matcher import NAME_PATTERN, score_candidates
+
+console = Console()
+
+DEFAULT_ROI_BATCH_SIZE = 6  # 每批识别的文本行数，第一批越小越早结束
+
+# 名字行的排序权重：字高、长宽比（名字行较短）、在页面中的竖直位置
+HEIGHT_WEIGHT = 0.4
+ASPECT_WEIGHT = 0.4
+POSITION_WEIGHT = 0.2
+NAME_MAX_ASPECT = 8.0       # 2-4 个字加上"同学"之类的后缀，长宽比一般不超过该值
+NAME_MIN_ASPECT = 1.2       # 更窄的通常是单字、印章或噪点
+NAME_CENTER_Y = 0.35        # 证书上名字通常位于页面上部到中部
+
+# 每张图片的识别统计：检测到的文本行数、实际识别的行数、省下的行数
+ROIStats = namedtuple('ROIStats', ['detected', 'recognized', 'skipped'])
+
+
+def box_sizes(boxes):
+    """四边形的宽（上下边较长者）和高（左右边较长者）。"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+    width = np.maximum(np.linalg.norm(boxes[:, 1] - boxes[:, 0], axis=1),
+                       np.linalg.norm(boxes[:, 2] - boxes[:, 3], axis=1))
+    height = np.maximum(np.linalg.norm(boxes[:, 3] - boxes[:, 0], axis=1),
+                        np.linalg.norm(boxes[:, 2] - boxes[:, 1], axis=1))
+    return width, np.maximum(height, 1.0)
+
+
+def rank_boxes(boxes, image_shape):
+    """按"像名字所在行"的程度从高到低返回文本框序号。
+
+    - 字高：相对于本图文本行中位字高，名字常用更大的字号；
+    - 长宽比：名字行很短，过长的正文行和过窄的单字/印章降权；
+    - 位置：越接近页面上中部越优先。
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    width, height = box_sizes(boxes)
+    height_score = np.clip(height / np.median(height), 0, 2) / 2
+
+    aspect = width / height
+    aspect_score = np.exp(-np.maximum(aspect - NAME_MAX_ASPECT, 0) / NAME_MAX_ASPECT)
+    aspect_score[aspect < NAME_MIN_ASPECT] *= 0.3
+
+    points = np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+    center_y = points[:, :, 1].mean(axis=1) / max(image_shape[0], 1)
+    position_score = 1 - np.minimum(np.abs(center_y - NAME_CENTER_Y) / 0.5, 1)
+
+    priority = HEIGHT_WEIGHT * height_score + ASPECT_WEIGHT * aspect_score + POSITION_WEIGHT * position_score
+    # 同分时保持从上到下、从左到右的阅读顺序
+    return np.argsort(-priority, kind='stable')
+
+
+def line_matches(user_name, text, name_match_threshold):
+    """一行文本中是否有候选名字达到阈值，与 flexible_name_match 的判断相同。"""
+    candidates = NAME_PATTERN.findall(text.lower())
+    return bool(candidates) and score_candidates(user_name, candidates).max() >= name_match_threshold
+
+
+def _crop(ocr, img, box):
+    tmp_box = copy.deepcopy(box)
+    if ocr.args.det_box_type == 'quad':
+        return predict_system.get_rotate_crop_image(img, tmp_box)
+    return predict_system.get_minarea_rect_crop(img, tmp_box)
+
+
+def ocr_roi(ocr, img, user_name, name_match_threshold, cls=True, batch_size=DEFAULT_ROI_BATCH_SIZE):
+    """只为判断名字是否出现而识别一张图片。
+
+    检测出全部文本框后按 rank_boxes 的优先级分批识别，某一行的名字匹配达到阈值就停止，
+    剩余的文本框不再识别。返回 (与 ocr.ocr 相同格式的结果, ROIStats)，
+    结果中只包含已识别的行，按阅读顺序排列；没有找到名字时等同于识别整页。
+    """
+    dt_boxes, _ = ocr.text_detector(img)
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return [None], ROIStats(0, 0, 0)
+
+    boxes = predict_system.sorted_boxes(dt_boxes)
+    order = rank_boxes(boxes, img.shape)
+    recognized = {}
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size].tolist()
+        crops = [_crop(ocr, img, boxes[i]) for i in batch]
+        if ocr.use_angle_cls and cls:
+            crops, _, _ = ocr.text_classifier(crops)
+        rec_res, _ = ocr.text_recognizer(crops)
+
+        found = False
+        for i, rec_result in zip(batch, rec_res):
+            if rec_result[1] < ocr.drop_score:
+                continue
+            recognized[i] = rec_result
+            # 候选名字不跨行，逐行匹配与对整页文本匹配的结果相同
+            if line_matches(user_name, rec_result[0], name_match_threshold):
+                found = True
+        if found:
+            break
+
+    num_recognized = min(start + batch_size, len(order))
+    lines = [[boxes[i].tolist(), recognized[i]] for i in sorted(recognized)]
+    return [lines], ROIStats(len(boxes), num_recognized, len(boxes) - num_recognized)
+
+
+def iter_roi_ocr(ocr, images, load_fn, user_name, name_match_threshold, use_angle_cls=True,
+                 batch_size=DEFAULT_ROI_BATCH_SIZE, roi_stats=None):
+    """逐张图片按优先级识别，按输入顺序产出 (序号, 图片, 原始结果, 异常)。
+
+    roi_stats 不为 None 时，每张成功处理的图片的 ROIStats 记录在 roi_stats[序号] 中。
+    """
+    for idx, img in enumerate(images):
+        try:
+            img = load_fn(img)
+            result, stats = ocr_roi(ocr, np.array(img), user_name, name_match_threshold,
+                                    cls=use_angle_cls, batch_size=batch_size)
+        except Exception as e:
+            yield idx, img, None, e
+            continue
+        if roi_stats is not None:
+            roi_stats[idx] = stats
+        yield idx, img, result, None
@@ -0,0 +1,176 @@
+import os
+import json
+from collections import namedtuple
+from core.name_matcher import NAME_PATTERN, score_candidates
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+PINYIN_AVAILABLE = lazy_pinyin is not None
+
+INDEX_VERSION = 1
+
+# 与名字没有共同二元组（也不互相包含）的候选的最高得分，在名字为两个字、候选在中间多一个字时取到，
+# 如 "张三" 和 "张小三"：ratio 80 * 0.5 + 全部字符命中 30。阈值高于它时只需按二元组取候选
+MAX_SCORE_WITHOUT_SHARED_BIGRAM = 70
+
+NameHit = namedtuple('NameHit', ['doc', 'image_index', 'matched_name', 'score', 'matched_positions'])
+
+
+def pinyin_key(text):
+    """不带声调的全拼，没有安装 pypinyin 时返回 None。"""
+    if lazy_pinyin is None:
+        return None
+    return " ".join(lazy_pinyin(text))
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class OCRTextIndex:
+    """OCR 结果的倒排索引，修改名字或阈值后无需重新OCR即可重新匹配。
+
+    documents 为 _run_ocr 产出的 individual_ocr_results。
+    - 候选名字 -> [(文档, 在文档候选中的首次出现位置)]，与 flexible_name_match 的候选规则相同；
+    - 二元组 -> 候选名字：阈值高于 MAX_SCORE_WITHOUT_SHARED_BIGRAM 时，达到阈值的候选一定与名字
+      共享一个二元组，常见姓氏只会取回包含整个二元组的候选；
+    - 单字 -> 候选名字：单字名字或较低阈值时使用，得分为正的候选至少与名字共享一个字；
+    - 拼音 -> 候选名字（需要 pypinyin）：用于找出识别成同音字的名字；
+    - 每个文档内 二元组/整行文本 -> 行号：用于不扫描全部行就找出匹配名字所在的文本框。
+    """
+
+    def __init__(self, documents, vocab=None, candidate_docs=None):
+        self.documents = documents
+        if vocab is None:
+            vocab, candidate_docs = self._collect_candidates(documents)
+        self.vocab = vocab
+        self._candidate_docs = candidate_docs
+
+        self._bigram_postings = {}
+        self._char_postings = {}
+        self._pinyin_postings = {}
+        for vocab_id, name in enumerate(self.vocab):
+            for bigram in _bigrams(name):
+                self._bigram_postings.setdefault(bigram, []).append(vocab_id)
+            for char in set(name):
+                self._char_postings.setdefault(char, []).append(vocab_id)
+            key = pinyin_key(name)
+            if key is not None:
+                self._pinyin_postings.setdefault(key, []).append(vocab_id)
+
+        self._line_bigrams = []
+        self._line_texts = []
+        for document in documents:
+            bigrams = {}
+            texts = {}
+            for line_no, item in enumerate(document.get('ocr_result', [])):
+                text = item['text'].lower()
+                texts.setdefault(text, []).append(line_no)
+                for bigram in _bigrams(text):
+                    bigrams.setdefault(bigram, []).append(line_no)
+            self._line_bigrams.append(bigrams)
+            self._line_texts.append(texts)
+
+    @staticmethod
+    def _collect_candidates(documents):
+        vocab = []
+        vocab_ids = {}
+        candidate_docs = []
+        for doc, document in enumerate(documents):
+            seen = set()
+            for position, name in enumerate(NAME_PATTERN.findall(document.get('full_text', '').lower())):
+                if name in seen:
+                    continue
+                seen.add(name)
+                vocab_id = vocab_ids.get(name)
+                if vocab_id is None:
+                    vocab_id = vocab_ids[name] = len(vocab)
+                    vocab.append(name)
+                    candidate_docs.append([])
+                candidate_docs[vocab_id].append((doc, position))
+        return vocab, candidate_docs
+
+    def _matched_positions(self, doc, matched_name):
+        # 与 _run_ocr 相同：行文本包含匹配名字，或行文本是匹配名字的一部分
+        line_nos = set()
+        bigram_lines = self._line_bigrams[doc].get(matched_name[:2], [])
+        line_nos.update(line_no for line_no in bigram_lines
+                        if matched_name in self.documents[doc]['ocr_result'][line_no]['text'].lower())
+        texts = self._line_texts[doc]
+        substrings = {matched_name[i:j] for i in range(len(matched_name) + 1) for j in range(i, len(matched_name) + 1)}
+        for sub in substrings:
+            line_nos.update(texts.get(sub, []))
+        ocr_result = self.documents[doc]['ocr_result']
+        return [ocr_result[line_no] for line_no in sorted(line_nos)]
+
+    def match(self, user_name, threshold=70, use_pinyin=False):
+        """返回达到阈值的文档的 NameHit 列表（按文档顺序），未列出的文档视为未匹配。
+
+        匹配结果、得分和最佳匹配与对每个文档调用 flexible_name_match 相同。
+        use_pinyin 为 True 时，与名字拼音完全相同的候选视为达到阈值。
+        """
+        user_name = user_name.lower()
+        if not user_name:
+            raise ValueError("名字不能为空")
+        if len(user_name) >= 2 and threshold > MAX_SCORE_WITHOUT_SHARED_BIGRAM:
+            keys, postings = _bigrams(user_name), self._bigram_postings
+        else:
+            keys, postings = set(user_name), self._char_postings
+        vocab_ids = set()
+        for key in keys:
+            vocab_ids.update(postings.get(key, []))
+        homophones = set()
+        if use_pinyin:
+            key = pinyin_key(user_name)
+            if key is not None:
+                homophones.update(self._pinyin_postings.get(key, []))
+                vocab_ids.update(homophones)
+        if not vocab_ids:
+            return []
+
+        vocab_ids = sorted(vocab_ids)
+        scores = score_candidates(user_name, [self.vocab[vocab_id] for vocab_id in vocab_ids])
+
+        # 每个文档取最高分，同分取文档中最先出现的候选
+        best = {}
+        for vocab_id, score in zip(vocab_ids, scores.tolist()):
+            if vocab_id in homophones:
+                score = max(score, float(threshold))
+            if score < threshold:
+                continue
+            for doc, position in self._candidate_docs[vocab_id]:
+                current = best.get(doc)
+                if current is None or score > current[0] or (score == current[0] and position < current[1]):
+                    best[doc] = (score, position, vocab_id)
+
+        hits = []
+        for doc in sorted(best):
+            score, _, vocab_id = best[doc]
+            matched_name = self.vocab[vocab_id]
+            hits.append(NameHit(doc, self.documents[doc].get('image_index', doc), matched_name, score,
+                                self._matched_positions(doc, matched_name)))
+        return hits
+
+    def save(self, path):
+        data = {
+            'version': INDEX_VERSION,
+            'documents': self.documents,
+            'vocab': self.vocab,
+            'candidate_docs': self._candidate_docs,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            return cls(data['documents'])
+        candidate_docs = [[tuple(posting) for posting in postings] for postings in data['candidate_docs']]
+        return cls(data['documents'], data['vocab'], candidate_docs)
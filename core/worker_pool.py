@@ -0,0 +1,178 @@
+import os
+import threading
+import multiprocessing
+from collections import deque
+from rich.console import Console
+
+console = Console()
+
+# 多进程模式默认配置：进程数 × 每进程线程数 不超过 CPU 核数
+DEFAULT_THREADS_PER_WORKER = 4
+DEFAULT_NUM_WORKERS = max(1, (os.cpu_count() or 1) // DEFAULT_THREADS_PER_WORKER)
+MAX_PENDING_PER_WORKER = 2  # 每个进程最多排队的图片数，避免一次性把所有图片送进队列
+
+# 以下变量只在子进程中使用
+_worker_engine = None
+_worker_use_angle_cls = True
+
+
+def _limit_threads(threads_per_worker):
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads_per_worker)
+
+
+def _init_worker(engine_kwargs, threads_per_worker):
+    global _worker_engine, _worker_use_angle_cls
+    _limit_threads(threads_per_worker)
+    import cv2
+    cv2.setNumThreads(1)
+    from paddleocr import PaddleOCR
+    from core.engine_pool import fuse_preprocess_ops, warm_up_engine
+
+    _worker_use_angle_cls = engine_kwargs.get('use_angle_cls', False)
+    _worker_engine = PaddleOCR(**engine_kwargs)
+    fuse_preprocess_ops(_worker_engine)
+    warm_up_engine(_worker_engine, _worker_use_angle_cls)
+
+
+def _load_task(task):
+    img, det_limit_side_len, det_limit_type, reduced_decode = task
+    import numpy as np
+    from core.ocr_handler import load_image
+    try:
+        return np.array(load_image(img, det_limit_side_len, det_limit_type, reduced_decode)), None
+    except Exception as e:
+        return None, e
+
+
+def _ocr_task(task):
+    idx, img, det_limit_side_len, det_limit_type, use_angle_cls, preloaded, reduced_decode = task
+    import numpy as np
+    from core.ocr_handler import load_image
+    try:
+        if preloaded:
+            img_array = np.asarray(img)
+        else:
+            img_array = np.array(load_image(img, det_limit_side_len, det_limit_type, reduced_decode))
+        result = _worker_engine.ocr(img_array, cls=use_angle_cls and _worker_use_angle_cls)
+    except Exception as e:
+        return idx, None, None, e
+    return idx, img_array, result, None
+
+
+def _to_task_input(img):
+    # 有文件路径的图片只传路径，由子进程自己解码，减少进程间拷贝
+    filename = getattr(img, 'filename', None)
+    if filename and os.path.exists(filename):
+        return filename
+    return img
+
+
+class OCRWorkerPool:
+    """多进程 OCR 工作池。
+
+    每个进程持有一个预热好的 PaddleOCR，并限制自身的 CPU 线程数，
+    图片按顺序分发，结果按输入顺序流式返回。
+    """
+
+    def __init__(self, engine_kwargs, num_workers=DEFAULT_NUM_WORKERS,
+                 threads_per_worker=DEFAULT_THREADS_PER_WORKER):
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.engine_kwargs = dict(engine_kwargs, cpu_threads=threads_per_worker)
+        # paddle 在 fork 出的子进程中不可靠，统一使用 spawn
+        context = multiprocessing.get_context('spawn')
+        console.print(f"[cyan]启动 {num_workers} 个OCR进程，每个进程 {threads_per_worker} 个线程[/cyan]")
+        self._pool = context.Pool(num_workers, initializer=_init_worker,
+                                  initargs=(self.engine_kwargs, threads_per_worker))
+
+    def _bounded_imap(self, func, tasks):
+        # 在调用方一侧限流：最多 max_pending 个任务在排队或执行，按提交顺序取结果。
+        # 调用方中途放弃迭代（如 Streamlit 重新运行）时不会卡住进程池的任务分发线程，
+        # 已提交的任务执行完后结果直接丢弃
+        max_pending = self.num_workers * MAX_PENDING_PER_WORKER
+        pending = deque()
+        for task in tasks:
+            pending.append(self._pool.apply_async(func, (task,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def imap_load(self, images, det_limit_side_len=960, det_limit_type='max', reduced_decode=False):
+        """在子进程中并行解码和缩放图片，按输入顺序产出 (图片, 异常)。"""
+        from PIL import Image
+
+        tasks = ((_to_task_input(img), det_limit_side_len, det_limit_type, reduced_decode) for img in images)
+        for img, (img_array, error) in zip(images, self._bounded_imap(_load_task, tasks)):
+            yield (Image.fromarray(img_array), None) if error is None else (img, error)
+
+    def imap_ocr(self, images, det_limit_side_len=960, det_limit_type='max', use_angle_cls=True, preloaded=False,
+                 reduced_decode=False):
+        """按输入顺序产出 (序号, 图片, 原始结果, 异常)，与逐张模式格式一致。
+
+        preloaded 为 True 时 images 已经过 load_image 处理，子进程不再重复缩放。
+        """
+        from PIL import Image
+
+        tasks = ((idx, img if preloaded else _to_task_input(img),
+                  det_limit_side_len, det_limit_type, use_angle_cls, preloaded, reduced_decode)
+                 for idx, img in enumerate(images))
+        for idx, img_array, result, error in self._bounded_imap(_ocr_task, tasks):
+            img = Image.fromarray(img_array) if img_array is not None else images[idx]
+            yield idx, img, result, error
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+
+_worker_pools = {}  # 参数键 -> [工作池, 正在使用的会话数]
+_retired_pools = {}  # 已被新参数替换但仍有会话在使用的工作池 -> 正在使用的会话数
+_worker_pool_lock = threading.Lock()
+
+
+def _pool_key(engine_kwargs, num_workers, threads_per_worker):
+    return (tuple(sorted(engine_kwargs.items())), num_workers, threads_per_worker)
+
+
+def checkout_worker_pool(engine_kwargs, num_workers=DEFAULT_NUM_WORKERS,
+                         threads_per_worker=DEFAULT_THREADS_PER_WORKER):
+    """取出进程级共享的工作池，用完后必须调用 release_worker_pool。
+
+    参数变化时启动新的工作池；旧工作池空闲时立即关闭，仍有会话在识别时等最后一个会话归还后再关闭，
+    不会中断其他会话正在进行的 imap_ocr。
+    """
+    key = _pool_key(engine_kwargs, num_workers, threads_per_worker)
+    to_close = []
+    with _worker_pool_lock:
+        for other_key in [other_key for other_key in _worker_pools if other_key != key]:
+            pool, users = _worker_pools.pop(other_key)
+            if users == 0:
+                to_close.append(pool)
+            else:
+                _retired_pools[pool] = users
+        if key not in _worker_pools:
+            _worker_pools[key] = [OCRWorkerPool(engine_kwargs, num_workers, threads_per_worker), 0]
+        slot = _worker_pools[key]
+        slot[1] += 1
+        pool = slot[0]
+    for old_pool in to_close:
+        old_pool.close()
+    return pool
+
+
+def release_worker_pool(pool):
+    """归还 checkout_worker_pool 取出的工作池，已被替换的工作池在最后一个会话归还后关闭。"""
+    with _worker_pool_lock:
+        if pool in _retired_pools:
+            _retired_pools[pool] -= 1
+            if _retired_pools[pool] > 0:
+                return
+            del _retired_pools[pool]
+        else:
+            for slot in _worker_pools.values():
+                if slot[0] is pool:
+                    slot[1] -= 1
+            return
+    pool.close()
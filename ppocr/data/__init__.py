@@ -35,6 +35,7 @@ import paddle.distributed as dist
 from ppocr.data.imaug import transform, create_operators
 from ppocr.data.simple_dataset import SimpleDataSet, MultiScaleDataSet
 from ppocr.data.lmdb_dataset import LMDBDataSet, LMDBDataSetSR, LMDBDataSetTableMaster
+from ppocr.data.packed_dataset import PackedDataSet
 from ppocr.data.pgnet_dataset import PGDataSet
 from ppocr.data.pubtab_dataset import PubTabDataSet
 from ppocr.data.multi_scale_sampler import MultiScaleSampler
@@ -90,6 +91,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
         "PubTabDataSet",
         "LMDBDataSetSR",
         "LMDBDataSetTableMaster",
+        "PackedDataSet",
         "MultiScaleDataSet",
         "TextDetDataset",
         "TextRecDataset",
@@ -75,21 +75,91 @@ def transform(data, ops=None):
     return data
 
 
-def create_operators(op_param_list, global_config=None):
+def _fusable_normalize(op_params, i):
+    """Length of a fusable [DecodeImage ->] NormalizeImage -> ToCHWImage run
+    starting at op_params[i], 0 if there is none."""
+    names = [name for name, _ in op_params[i : i + 3]]
+    start = 1 if names[:1] == ["DecodeImage"] else 0
+    if names[start : start + 2] != ["NormalizeImage", "ToCHWImage"]:
+        return 0
+    if start == 1:
+        decode = op_params[i][1]
+        if (
+            decode.get("img_mode", "RGB") not in ["RGB", "BGR"]
+            or decode.get("channel_first", False)
+            or decode.get("limit_side_len")
+        ):
+            return 0
+    if op_params[i + start][1].get("order", "chw") != "hwc":
+        return 0
+    return start + 2
+
+
+def create_operators(op_param_list, global_config=None, fuse=False):
     """
     create operators based on the config
 
     Args:
         params(list): a dict list, used to create some operators
+        fuse(bool): replace consecutive [DecodeImage ->] NormalizeImage ->
+            ToCHWImage with one NormalizeToCHWImage. The returned list is then
+            shorter than the config, so indices into it (such as
+            ext_op_transform_idx) no longer match the config; only for
+            inference pipelines that run the list as a whole
     """
     assert isinstance(op_param_list, list), "operator config should be a list"
-    ops = []
+    op_params = []
     for operator in op_param_list:
         assert isinstance(operator, dict) and len(operator) == 1, "yaml format error"
         op_name = list(operator)[0]
         param = {} if operator[op_name] is None else operator[op_name]
         if global_config is not None:
             param.update(global_config)
+        op_params.append((op_name, param))
+
+    ops = []
+    i = 0
+    while i < len(op_params):
+        length = _fusable_normalize(op_params, i) if fuse else 0
+        if length:
+            param = dict(op_params[i + length - 2][1])
+            if length == 3:
+                param["decode"] = op_params[i][1]
+            ops.append(NormalizeToCHWImage(**param))
+            i += length
+            continue
+        op_name, param = op_params[i]
         op = eval(op_name)(**param)
         ops.append(op)
+        i += 1
     return ops
+
+
+def fuse_operators(ops):
+    """
+    Return a copy of an already created operator list, such as the
+    preprocess_op of an inference predictor, with consecutive
+    NormalizeImage(order="hwc") -> ToCHWImage replaced by NormalizeToCHWImage.
+    """
+    fused = []
+    i = 0
+    while i < len(ops):
+        op = ops[i]
+        if (
+            type(op) is NormalizeImage
+            and op.mean.shape == (1, 1, 3)
+            and i + 1 < len(ops)
+            and type(ops[i + 1]) is ToCHWImage
+        ):
+            fused.append(
+                NormalizeToCHWImage(
+                    scale=float(op.scale),
+                    mean=op.mean.reshape(-1).tolist(),
+                    std=op.std.reshape(-1).tolist(),
+                )
+            )
+            i += 2
+            continue
+        fused.append(op)
+        i += 1
+    return fused
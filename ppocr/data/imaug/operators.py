@@ -27,15 +27,99 @@ import math
 from PIL import Image
 
 
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def is_encoded_image(img):
+    """encoded image bytes, or a uint8 array viewing them (e.g. from a mmap)"""
+    if isinstance(img, np.ndarray):
+        return img.dtype == np.uint8 and img.ndim == 1 and img.size > 0
+    return type(img) is bytes and len(img) > 0
+
+
+def jpeg_size(buf):
+    """(width, height) from the SOF header of a JPEG buffer, None otherwise."""
+    buf = memoryview(buf).cast("B")
+    if buf[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 9 < len(buf):
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (buf[pos + 5] << 8) | buf[pos + 6]
+            width = (buf[pos + 7] << 8) | buf[pos + 8]
+            return width, height
+        pos += 2 + ((buf[pos + 2] << 8) | buf[pos + 3])
+    return None
+
+
+def reduced_decode_factor(width, height, limit_side_len, limit_type="max"):
+    """Largest libjpeg DCT scale (1, 2, 4 or 8) whose output side selected by
+    limit_type (the longer side for "max", the shorter one otherwise) stays
+    at or above limit_side_len."""
+    side = max(width, height) if limit_type == "max" else min(width, height)
+    for factor in [8, 4, 2]:
+        if (side + factor - 1) // factor >= limit_side_len:
+            return factor
+    return 1
+
+
 class DecodeImage(object):
-    """decode image"""
+    """decode image
+
+    limit_side_len: when set, JPEG inputs are decoded at the smallest
+        power-of-two reduction (1/2, 1/4, 1/8) that keeps the side selected
+        by limit_type at or above limit_side_len. The original size is kept
+        in data["src_shape"] so DetResizeForTest maps boxes back to original
+        pixels.
+    """
 
     def __init__(
-        self, img_mode="RGB", channel_first=False, ignore_orientation=False, **kwargs
+        self,
+        img_mode="RGB",
+        channel_first=False,
+        ignore_orientation=False,
+        limit_side_len=None,
+        limit_type="max",
+        **kwargs
     ):
         self.img_mode = img_mode
         self.channel_first = channel_first
         self.ignore_orientation = ignore_orientation
+        self.limit_side_len = limit_side_len
+        self.limit_type = limit_type
+
+    def decode_reduced(self, buf):
+        """Returns (image, (src_h, src_w)), src shape is None when the image
+        was decoded at full size."""
+        size = jpeg_size(buf) if self.limit_side_len else None
+        if size is None:
+            return None, None
+        factor = reduced_decode_factor(
+            size[0], size[1], self.limit_side_len, self.limit_type
+        )
+        if factor == 1:
+            return None, None
+        flags = REDUCED_DECODE_FLAGS[factor]
+        if self.ignore_orientation:
+            flags |= cv2.IMREAD_IGNORE_ORIENTATION
+        img = cv2.imdecode(np.frombuffer(buf, dtype="uint8"), flags)
+        if img is None:
+            return None, None
+        src_w, src_h = size
+        # EXIF orientation may have swapped the sides
+        if (img.shape[0] > img.shape[1]) != (src_h > src_w):
+            src_w, src_h = src_h, src_w
+        return img, (src_h, src_w)
 
     def __call__(self, data):
         img = data["image"]
@@ -44,14 +128,19 @@ class DecodeImage(object):
                 type(img) is str and len(img) > 0
             ), "invalid input 'img' in DecodeImage"
         else:
-            assert (
-                type(img) is bytes and len(img) > 0
-            ), "invalid input 'img' in DecodeImage"
-        img = np.frombuffer(img, dtype="uint8")
-        if self.ignore_orientation:
-            img = cv2.imdecode(img, cv2.IMREAD_IGNORE_ORIENTATION | cv2.IMREAD_COLOR)
+            assert is_encoded_image(img), "invalid input 'img' in DecodeImage"
+        reduced, src_shape = self.decode_reduced(img)
+        if reduced is not None:
+            img = reduced
+            data["src_shape"] = np.array(src_shape)
         else:
-            img = cv2.imdecode(img, 1)
+            img = np.frombuffer(img, dtype="uint8")
+            if self.ignore_orientation:
+                img = cv2.imdecode(
+                    img, cv2.IMREAD_IGNORE_ORIENTATION | cv2.IMREAD_COLOR
+                )
+            else:
+                img = cv2.imdecode(img, 1)
         if img is None:
             return None
         if self.img_mode == "GRAY":
@@ -108,6 +197,84 @@ class ToCHWImage(object):
         return data
 
 
+class NormalizeToCHWImage(object):
+    """fused [DecodeImage ->] NormalizeImage(order="hwc") -> ToCHWImage
+
+    The BGR->RGB swap of DecodeImage is folded into the channel order and
+    the normalization into one per-channel scale/bias, so the CHW float32
+    output is written in a single pass per channel. With reuse_buffer the
+    output array is reused across calls while the image size stays the same;
+    only use it when the caller copies the image before the next call.
+    """
+
+    def __init__(
+        self, scale=None, mean=None, std=None, decode=None, reuse_buffer=False, **kwargs
+    ):
+        self.decode_op = DecodeImage(**decode) if decode is not None else None
+        self.normalize_op = NormalizeImage(scale, mean, std, order="hwc")
+        self.to_chw_op = ToCHWImage()
+        std = self.normalize_op.std.reshape(-1).astype("float64")
+        mean = self.normalize_op.mean.reshape(-1).astype("float64")
+        self.alpha = float(self.normalize_op.scale) / std
+        self.beta = -mean / std
+        self.reuse_buffer = reuse_buffer
+        self._buffer = None
+
+    def _decode(self, img):
+        decode_op = self.decode_op
+        img = np.frombuffer(img, dtype="uint8")
+        if decode_op.ignore_orientation:
+            return cv2.imdecode(img, cv2.IMREAD_IGNORE_ORIENTATION | cv2.IMREAD_COLOR)
+        return cv2.imdecode(img, 1)
+
+    def _output(self, shape):
+        if not self.reuse_buffer:
+            return np.empty(shape, dtype="float32")
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype="float32")
+        return self._buffer
+
+    def __call__(self, data):
+        img = data["image"]
+        swap = False
+        if self.decode_op is not None:
+            assert is_encoded_image(img), "invalid input 'img' in DecodeImage"
+            img = self._decode(img)
+            if img is None:
+                return None
+            if self.decode_op.img_mode == "RGB":
+                assert img.shape[2] == 3, "invalid shape of image[%s]" % (img.shape)
+                swap = True
+        if isinstance(img, Image.Image):
+            img = np.array(img)
+
+        if not (
+            isinstance(img, np.ndarray)
+            and img.ndim == 3
+            and img.shape[2] == 3
+            and img.dtype in (np.uint8, np.float32)
+        ):
+            data["image"] = img[:, :, ::-1] if swap else img
+            return self.to_chw_op(self.normalize_op(data))
+
+        planes = cv2.split(img)
+        if swap:
+            planes = planes[::-1]
+        out = self._output((3,) + img.shape[:2])
+        for c, plane in enumerate(planes):
+            cv2.addWeighted(
+                plane,
+                self.alpha[c],
+                plane,
+                0.0,
+                self.beta[c],
+                dst=out[c],
+                dtype=cv2.CV_32F,
+            )
+        data["image"] = out
+        return data
+
+
 class Fasttext(object):
     def __init__(self, path="None", **kwargs):
         import fasttext
@@ -238,6 +405,11 @@ class DetResizeForTest(object):
             # img, shape = self.resize_image_type1(img)
             img, [ratio_h, ratio_w] = self.resize_image_type1(img)
         data["image"] = img
+        if "src_shape" in data:
+            # image was decoded at reduced size, map ratios to the original
+            resize_h, resize_w = src_h * ratio_h, src_w * ratio_w
+            src_h, src_w = data.pop("src_shape")
+            ratio_h, ratio_w = resize_h / src_h, resize_w / src_w
         data["shape"] = np.array([src_h, src_w, ratio_h, ratio_w])
         return data
 
@@ -641,6 +641,76 @@ def resize_norm_img(img, image_shape, padding=True, interpolation=cv2.INTER_LINE
     return padding_im, valid_ratio
 
 
+REC_NORM_CHUNK = 8  # crops normalized together by resize_norm_img_batch
+
+
+def resize_norm_img_batch(
+    imgs,
+    image_shape,
+    padding=True,
+    interpolation=cv2.INTER_LINEAR,
+    dynamic_width=False,
+):
+    """
+    Batch version of resize_norm_img for a list of uint8 crops.
+
+    Every crop is resized by OpenCV straight into its slice of one
+    preallocated uint8 buffer, then the whole batch is converted to NCHW
+    float32 and normalized once, in place. The padding is zero after
+    normalization, as in resize_norm_img.
+
+    Args:
+        imgs (list[ndarray]): HWC crops, or HW crops when image_shape[0] == 1.
+        image_shape (list): [C, H, W] of the output.
+        dynamic_width (bool): widen W to the widest crop ratio of the batch,
+            like resize_norm_img_chinese and the inference recognizer.
+
+    Returns:
+        batch (ndarray): [N, C, H, W] float32.
+        valid_ratios (ndarray): [N] float32, resized width / W.
+    """
+    imgC, imgH, imgW = image_shape
+    if dynamic_width and len(imgs) > 0:
+        crop_ratio = max(img.shape[1] / img.shape[0] for img in imgs)
+        max_wh_ratio = max(imgW * 1.0 / imgH, crop_ratio)
+        imgW = int(imgH * max_wh_ratio)
+
+    channel_shape = () if imgC == 1 else (imgC,)
+    buffer = np.zeros((len(imgs), imgH, imgW) + channel_shape, dtype=np.uint8)
+    resized_ws = np.empty(len(imgs), dtype=np.int64)
+    for i, img in enumerate(imgs):
+        if not padding:
+            cv2.resize(img, (imgW, imgH), dst=buffer[i], interpolation=interpolation)
+            resized_ws[i] = imgW
+            continue
+        ratio = img.shape[1] / float(img.shape[0])
+        if math.ceil(imgH * ratio) > imgW:
+            resized_w = imgW
+        else:
+            resized_w = int(math.ceil(imgH * ratio))
+        cv2.resize(img, (resized_w, imgH), dst=buffer[i, :, :resized_w])
+        resized_ws[i] = resized_w
+
+    batch = np.empty((len(imgs), imgC, imgH, imgW), dtype=np.float32)
+    if imgC == 1:
+        nchw = buffer[:, np.newaxis]
+    else:
+        nchw = buffer.transpose((0, 3, 1, 2))
+    # same float32 operations as resize_norm_img, in place and in chunks
+    # small enough to stay in cache between the passes
+    for start in range(0, len(imgs), REC_NORM_CHUNK):
+        chunk = batch[start : start + REC_NORM_CHUNK]
+        np.copyto(chunk, nchw[start : start + REC_NORM_CHUNK], casting="unsafe")
+        chunk /= 255
+        chunk -= 0.5
+        chunk /= 0.5
+    # padded columns are 0 after normalization, not the value of pixel 0
+    for i, resized_w in enumerate(resized_ws.tolist()):
+        batch[i, :, :, resized_w:] = 0
+    valid_ratios = np.minimum(1.0, resized_ws / imgW).astype(np.float32)
+    return batch, valid_ratios
+
+
 def resize_norm_img_chinese(img, image_shape):
     imgC, imgH, imgW = image_shape
     # todo: change to 0 and modified image shape
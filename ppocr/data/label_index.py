@@ -0,0 +1,232 @@
+# copyright (c) 2020 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compiled index of SimpleDataSet label files.
+
+For every label file a one-time build writes
+    <name>.index.npy   int64 records of
+                       [path_offset, path_length, label_offset, label_length]
+                       into the label file, for lines whose images exist
+    <name>.index.json  what the index was built from; a stale index is rebuilt
+The files are kept next to the label file, in label_index_dir if it is set,
+or in LABEL_INDEX_CACHE_DIR when the label file's directory is not writable.
+Readers mmap the label file and the records, so DataLoader workers share the
+page cache instead of holding per-process lists of lines.
+"""
+import os
+import json
+import mmap
+import array
+import bisect
+import hashlib
+import numpy as np
+
+LABEL_INDEX_FIELDS = 4
+LABEL_INDEX_CACHE_DIR = os.path.expanduser("~/.paddleocr/label_index/")
+
+
+class _ImageChecker(object):
+    """existence of images under data_dir, listing each directory once"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.dir_entries = {}
+
+    def _exists(self, file_name):
+        path = os.path.join(self.data_dir, file_name)
+        dirname, basename = os.path.split(path)
+        entries = self.dir_entries.get(dirname)
+        if entries is None:
+            try:
+                entries = set(os.listdir(dirname))
+            except OSError:
+                entries = set()
+            self.dir_entries[dirname] = entries
+        # listing misses e.g. "a/../b", fall back to the file system
+        return basename in entries or os.path.exists(path)
+
+    def __call__(self, file_name):
+        # multiple images -> one gt label, see SimpleDataSet._try_parse_filename_list
+        if len(file_name) > 0 and file_name[0] == "[":
+            try:
+                return all(self._exists(name) for name in json.loads(file_name))
+            except:
+                pass
+        return self._exists(file_name)
+
+
+def label_index_prefix(label_file, index_dir=None):
+    """
+    next to the label file, or in index_dir under a name unique per file;
+    read-only label directories fall back to LABEL_INDEX_CACHE_DIR
+    """
+    if index_dir is None:
+        if os.access(os.path.dirname(os.path.abspath(label_file)), os.W_OK):
+            return label_file
+        index_dir = LABEL_INDEX_CACHE_DIR
+    digest = hashlib.md5(os.path.abspath(label_file).encode("utf-8")).hexdigest()
+    return os.path.join(
+        index_dir, "{}.{}".format(os.path.basename(label_file), digest[:8])
+    )
+
+
+def _build_info(label_file, data_dir, delimiter):
+    stat = os.stat(label_file)
+    return {
+        "label_file_size": stat.st_size,
+        "label_file_mtime_ns": stat.st_mtime_ns,
+        "data_dir": os.path.abspath(data_dir),
+        "delimiter": delimiter,
+    }
+
+
+def build_label_index(label_file, data_dir, delimiter="\t", index_dir=None):
+    """
+    Parse a label file once and save its index, returns the number of lines
+    skipped because they are not valid utf-8, have no label or their images
+    do not exist.
+    """
+    prefix = label_index_prefix(label_file, index_dir)
+    delimiter_bytes = delimiter.encode("utf-8")
+    records = array.array("q")
+    image_exists = _ImageChecker(data_dir)
+    num_skipped = 0
+    offset = 0
+    with open(label_file, "rb") as f:
+        for line in f:
+            # same fields as SimpleDataSet: strip("\n"), then split
+            substr = line.strip(b"\n").split(delimiter_bytes, 2)
+            try:
+                # SimpleDataSet decodes whole lines and drops those that fail
+                line.decode("utf-8")
+            except UnicodeDecodeError:
+                substr = []
+            if len(substr) >= 2 and image_exists(substr[0].decode("utf-8")):
+                path_length = len(substr[0])
+                label_offset = offset + path_length + len(delimiter_bytes)
+                records.extend([offset, path_length, label_offset, len(substr[1])])
+            else:
+                num_skipped += 1
+            offset += len(line)
+
+    index = np.frombuffer(records, dtype=np.int64).reshape(-1, LABEL_INDEX_FIELDS)
+    info = _build_info(label_file, data_dir, delimiter)
+    info["num_samples"] = len(index)
+    info["num_skipped"] = num_skipped
+    dirname = os.path.dirname(prefix)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    # write then rename, so concurrent builders never expose a partial index
+    tmp_suffix = ".tmp{}".format(os.getpid())
+    with open(prefix + ".index.npy" + tmp_suffix, "wb") as f:
+        np.save(f, index)
+    with open(prefix + ".index.json" + tmp_suffix, "w") as f:
+        json.dump(info, f)
+    os.replace(prefix + ".index.npy" + tmp_suffix, prefix + ".index.npy")
+    os.replace(prefix + ".index.json" + tmp_suffix, prefix + ".index.json")
+    return num_skipped
+
+
+def label_index_is_fresh(label_file, data_dir, delimiter="\t", index_dir=None):
+    prefix = label_index_prefix(label_file, index_dir)
+    if not os.path.exists(prefix + ".index.npy"):
+        return False
+    try:
+        with open(prefix + ".index.json") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return False
+    expected = _build_info(label_file, data_dir, delimiter)
+    return all(info.get(key) == value for key, value in expected.items())
+
+
+class LabelIndex(object):
+    """
+    Rows of several label files, numbered consecutively in file order.
+    Indexes are built when missing or stale, and mmaps are opened lazily in
+    each process.
+    """
+
+    def __init__(
+        self, label_files, data_dir, delimiter="\t", index_dir=None, logger=None
+    ):
+        if isinstance(label_files, str):
+            label_files = [label_files]
+        self.label_files = list(label_files)
+        self.delimiter = delimiter
+        self.index_prefixes = []
+        num_samples = []
+        for label_file in self.label_files:
+            if not label_index_is_fresh(label_file, data_dir, delimiter, index_dir):
+                num_skipped = build_label_index(
+                    label_file, data_dir, delimiter, index_dir
+                )
+                if logger is not None:
+                    logger.info(
+                        "Built label index of {} at {}, {} lines skipped".format(
+                            label_file,
+                            label_index_prefix(label_file, index_dir),
+                            num_skipped,
+                        )
+                    )
+            prefix = label_index_prefix(label_file, index_dir)
+            self.index_prefixes.append(prefix)
+            num_samples.append(len(np.load(prefix + ".index.npy", mmap_mode="r")))
+        self.file_starts = [0] + np.cumsum(num_samples, dtype=np.int64).tolist()
+        self._files = {}
+
+    def __len__(self):
+        return self.file_starts[-1]
+
+    def num_samples(self, file_idx):
+        return self.file_starts[file_idx + 1] - self.file_starts[file_idx]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_files"] = {}
+        return state
+
+    def _open(self, file_idx):
+        opened = self._files.get(file_idx)
+        if opened is None:
+            index = np.load(
+                self.index_prefixes[file_idx] + ".index.npy", mmap_mode="r"
+            ).view(np.ndarray)
+            # mmap cannot map an empty file, which has no rows either
+            lines = b""
+            if len(index) > 0:
+                with open(self.label_files[file_idx], "rb") as f:
+                    lines = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            opened = self._files[file_idx] = (index, lines)
+        return opened
+
+    def _locate(self, row):
+        row = int(row)
+        file_idx = bisect.bisect_right(self.file_starts, row) - 1
+        index, lines = self._open(file_idx)
+        return index[row - self.file_starts[file_idx]].tolist(), lines
+
+    def get(self, row):
+        """(file name field, label) of a row"""
+        (path_offset, path_length, label_offset, label_length), lines = self._locate(
+            row
+        )
+        file_name = lines[path_offset : path_offset + path_length].decode("utf-8")
+        label = lines[label_offset : label_offset + label_length].decode("utf-8")
+        return file_name, label
+
+    def get_line(self, row):
+        """the label file line of a row, for error messages"""
+        (path_offset, _, label_offset, label_length), lines = self._locate(row)
+        return lines[path_offset : label_offset + label_length].decode("utf-8")
@@ -0,0 +1,220 @@
+# copyright (c) 2020 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Packed shard dataset format.
+
+A shard is three append-only files sharing a prefix:
+    <prefix>.data   encoded images stored back to back
+    <prefix>.label  utf-8 labels stored back to back
+    <prefix>.index  int64 records of
+                    [image_offset, image_length, label_offset, label_length]
+
+Shards are append-only: reopening a shard for writing drops incomplete
+trailing records left by an interrupted writer. Readers mmap the files and
+hand out encoded images as zero-copy uint8 arrays.
+"""
+import os
+import mmap
+import bisect
+import numpy as np
+from paddle.io import Dataset
+
+from .imaug import transform, create_operators
+
+PACKED_INDEX_FIELDS = 4
+PACKED_RECORD_BYTES = PACKED_INDEX_FIELDS * 8
+
+
+def packed_num_samples(prefix):
+    """Number of complete index records of a shard."""
+    return os.path.getsize(prefix + ".index") // PACKED_RECORD_BYTES
+
+
+def find_packed_shards(data_dir):
+    """Sorted prefixes of all shards under data_dir."""
+    prefixes = []
+    for dirpath, _, filenames in os.walk(data_dir):
+        for filename in filenames:
+            if filename.endswith(".index"):
+                prefixes.append(os.path.join(dirpath, filename[: -len(".index")]))
+    return sorted(prefixes)
+
+
+class PackedShardWriter(object):
+    """append samples to a shard, creating it if it does not exist"""
+
+    def __init__(self, prefix):
+        dirname = os.path.dirname(prefix)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.prefix = prefix
+        self.data_file = open(prefix + ".data", "ab")
+        self.label_file = open(prefix + ".label", "ab")
+        self.index_file = open(prefix + ".index", "ab")
+        self.data_offset = self.data_file.tell()
+        self.label_offset = self.label_file.tell()
+        # drop records left by an interrupted writer: a partial record or one
+        # pointing past the end of the payload
+        num_samples = self.index_file.tell() // PACKED_RECORD_BYTES
+        if num_samples > 0:
+            index = np.fromfile(prefix + ".index", dtype=np.int64)
+            index = index[: num_samples * PACKED_INDEX_FIELDS].reshape(
+                -1, PACKED_INDEX_FIELDS
+            )
+            complete = (index[:, 0] + index[:, 1] <= self.data_offset) & (
+                index[:, 2] + index[:, 3] <= self.label_offset
+            )
+            num_samples = int(np.cumprod(complete).sum())
+        self.index_file.truncate(num_samples * PACKED_RECORD_BYTES)
+        self.index_file.seek(0, os.SEEK_END)
+        self.num_samples = num_samples
+
+    def add(self, image, label):
+        """image: encoded image bytes, label: str"""
+        label = label.encode("utf-8")
+        self.data_file.write(image)
+        self.label_file.write(label)
+        record = np.array(
+            [self.data_offset, len(image), self.label_offset, len(label)],
+            dtype=np.int64,
+        )
+        self.data_offset += len(image)
+        self.label_offset += len(label)
+        self.index_file.write(record.tobytes())
+        self.num_samples += 1
+
+    def close(self):
+        # payload first, so the index never points past the end of the data
+        for f in [self.data_file, self.label_file, self.index_file]:
+            f.flush()
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class PackedShardReader(object):
+    """read-only mmap view of a shard"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.num_samples = packed_num_samples(prefix)
+        self.index = np.frombuffer(
+            self._mmap(prefix + ".index"),
+            dtype=np.int64,
+            count=self.num_samples * PACKED_INDEX_FIELDS,
+        ).reshape(-1, PACKED_INDEX_FIELDS)
+        self.data = self._mmap(prefix + ".data")
+        self.label = self._mmap(prefix + ".label")
+
+    @staticmethod
+    def _mmap(path):
+        # mmap cannot map an empty file
+        if os.path.getsize(path) == 0:
+            return b""
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, index):
+        """(encoded image as a zero-copy uint8 array, label)"""
+        img_offset, img_length, label_offset, label_length = self.index[
+            index
+        ].tolist()
+        img = np.frombuffer(
+            self.data, dtype=np.uint8, count=img_length, offset=img_offset
+        )
+        label = self.label[label_offset : label_offset + label_length]
+        return img, label.decode("utf-8")
+
+
+class PackedDataSet(Dataset):
+    """
+    Dataset over packed shards (see PackedShardWriter and
+    ppocr/utils/gen_packed_dataset.py), an alternative to LMDBDataSet.
+
+    Shards are opened lazily in each process, so DataLoader workers map the
+    same page cache instead of copying the dataset.
+    """
+
+    def __init__(self, config, mode, logger, seed=None):
+        super(PackedDataSet, self).__init__()
+
+        global_config = config["Global"]
+        dataset_config = config[mode]["dataset"]
+        loader_config = config[mode]["loader"]
+        data_dir = dataset_config["data_dir"]
+        self.do_shuffle = loader_config["shuffle"]
+
+        logger.info("Initialize indexs of datasets:%s" % data_dir)
+        self.shard_prefixes = find_packed_shards(data_dir)
+        num_samples = [packed_num_samples(prefix) for prefix in self.shard_prefixes]
+        self.shard_starts = [0] + np.cumsum(num_samples, dtype=np.int64).tolist()
+        self.data_idx_order_list = np.arange(self.shard_starts[-1], dtype=np.int64)
+        if self.do_shuffle:
+            np.random.shuffle(self.data_idx_order_list)
+        self._readers = {}
+        self.ops = create_operators(dataset_config["transforms"], global_config)
+        self.ext_op_transform_idx = dataset_config.get("ext_op_transform_idx", 1)
+
+        ratio_list = dataset_config.get("ratio_list", [1.0])
+        self.need_reset = True in [x < 1 for x in ratio_list]
+
+    def __getstate__(self):
+        # mmaps are reopened in the process that unpickles the dataset
+        state = self.__dict__.copy()
+        state["_readers"] = {}
+        return state
+
+    def get_packed_sample_info(self, sample_idx):
+        sample_idx = int(sample_idx)
+        shard_idx = bisect.bisect_right(self.shard_starts, sample_idx) - 1
+        reader = self._readers.get(shard_idx)
+        if reader is None:
+            reader = PackedShardReader(self.shard_prefixes[shard_idx])
+            self._readers[shard_idx] = reader
+        return reader.get(sample_idx - self.shard_starts[shard_idx])
+
+    def get_ext_data(self):
+        ext_data_num = 0
+        for op in self.ops:
+            if hasattr(op, "ext_data_num"):
+                ext_data_num = getattr(op, "ext_data_num")
+                break
+        load_data_ops = self.ops[: self.ext_op_transform_idx]
+        ext_data = []
+
+        while len(ext_data) < ext_data_num:
+            sample_idx = self.data_idx_order_list[np.random.randint(len(self))]
+            img, label = self.get_packed_sample_info(sample_idx)
+            data = {"image": img, "label": label}
+            data = transform(data, load_data_ops)
+            if data is None:
+                continue
+            ext_data.append(data)
+        return ext_data
+
+    def __getitem__(self, idx):
+        img, label = self.get_packed_sample_info(self.data_idx_order_list[idx])
+        data = {"image": img, "label": label}
+        data["ext_data"] = self.get_ext_data()
+        outs = transform(data, self.ops)
+        if outs is None:
+            return self.__getitem__(np.random.randint(self.__len__()))
+        return outs
+
+    def __len__(self):
+        return self.data_idx_order_list.shape[0]
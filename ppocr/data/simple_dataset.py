@@ -20,6 +20,7 @@ import random
 import traceback
 from paddle.io import Dataset
 from .imaug import transform, create_operators
+from .label_index import LabelIndex
 
 
 class SimpleDataSet(Dataset):
@@ -46,8 +47,22 @@ class SimpleDataSet(Dataset):
         self.do_shuffle = loader_config["shuffle"]
         self.seed = seed
         logger.info("Initialize indexs of datasets:%s" % label_file_list)
-        self.data_lines = self.get_image_info_list(label_file_list, ratio_list)
-        self.data_idx_order_list = list(range(len(self.data_lines)))
+        # compiled label index: mmap'd records instead of per-worker line lists,
+        # image existence is checked once when the index is built
+        self.label_index = None
+        if dataset_config.get("use_label_index", False):
+            self.label_index = LabelIndex(
+                label_file_list,
+                self.data_dir,
+                self.delimiter,
+                dataset_config.get("label_index_dir"),
+                logger,
+            )
+            self.data_lines = None
+            self.data_idx_order_list = self.get_label_index_rows(ratio_list)
+        else:
+            self.data_lines = self.get_image_info_list(label_file_list, ratio_list)
+            self.data_idx_order_list = list(range(len(self.data_lines)))
         if self.mode == "train" and self.do_shuffle:
             self.shuffle_data_random()
         self.ops = create_operators(dataset_config["transforms"], global_config)
@@ -67,11 +82,48 @@ class SimpleDataSet(Dataset):
                 data_lines.extend(lines)
         return data_lines
 
+    def get_label_index_rows(self, ratio_list):
+        """label index rows, sampled like get_image_info_list"""
+        rng = np.random.RandomState(self.seed)
+        rows = []
+        for idx in range(len(self.label_index.label_files)):
+            start = self.label_index.file_starts[idx]
+            num_samples = self.label_index.num_samples(idx)
+            file_rows = np.arange(start, start + num_samples, dtype=np.int64)
+            if self.mode == "train" or ratio_list[idx] < 1.0:
+                file_rows = rng.permutation(file_rows)
+                file_rows = file_rows[: round(num_samples * ratio_list[idx])]
+            rows.append(file_rows)
+        return np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+
     def shuffle_data_random(self):
+        if self.label_index is not None:
+            np.random.RandomState(self.seed).shuffle(self.data_idx_order_list)
+            return
         random.seed(self.seed)
         random.shuffle(self.data_lines)
         return
 
+    def get_data_line(self, file_idx):
+        """decoded label file line, for error messages"""
+        if self.label_index is not None:
+            return self.label_index.get_line(file_idx)
+        return self.data_lines[file_idx].decode("utf-8")
+
+    def get_file_label(self, file_idx):
+        """(file name, label) of a label file line"""
+        if self.label_index is not None:
+            file_name, label = self.label_index.get(file_idx)
+        else:
+            data_line = self.data_lines[file_idx].decode("utf-8")
+            substr = data_line.strip("\n").split(self.delimiter)
+            file_name, label = substr[0], substr[1]
+        return self._try_parse_filename_list(file_name), label
+
+    def image_exists(self, img_path):
+        # the label index only keeps lines whose images exist
+        return self.label_index is not None or os.path.exists(img_path)
+
     def _try_parse_filename_list(self, file_name):
         # multiple images -> one gt label
         if len(file_name) > 0 and file_name[0] == "[":
@@ -93,15 +145,10 @@ class SimpleDataSet(Dataset):
 
         while len(ext_data) < ext_data_num:
             file_idx = self.data_idx_order_list[np.random.randint(self.__len__())]
-            data_line = self.data_lines[file_idx]
-            data_line = data_line.decode("utf-8")
-            substr = data_line.strip("\n").split(self.delimiter)
-            file_name = substr[0]
-            file_name = self._try_parse_filename_list(file_name)
-            label = substr[1]
+            file_name, label = self.get_file_label(file_idx)
             img_path = os.path.join(self.data_dir, file_name)
             data = {"img_path": img_path, "label": label}
-            if not os.path.exists(img_path):
+            if not self.image_exists(img_path):
                 continue
             with open(data["img_path"], "rb") as f:
                 img = f.read()
@@ -118,16 +165,11 @@ class SimpleDataSet(Dataset):
 
     def __getitem__(self, idx):
         file_idx = self.data_idx_order_list[idx]
-        data_line = self.data_lines[file_idx]
         try:
-            data_line = data_line.decode("utf-8")
-            substr = data_line.strip("\n").split(self.delimiter)
-            file_name = substr[0]
-            file_name = self._try_parse_filename_list(file_name)
-            label = substr[1]
+            file_name, label = self.get_file_label(file_idx)
             img_path = os.path.join(self.data_dir, file_name)
             data = {"img_path": img_path, "label": label}
-            if not os.path.exists(img_path):
+            if not self.image_exists(img_path):
                 raise Exception("{} does not exist!".format(img_path))
             with open(data["img_path"], "rb") as f:
                 img = f.read()
@@ -137,7 +179,7 @@ class SimpleDataSet(Dataset):
         except:
             self.logger.error(
                 "When parsing line {}, error happened with msg: {}".format(
-                    data_line, traceback.format_exc()
+                    self.get_data_line(file_idx), traceback.format_exc()
                 )
             )
             outs = None
@@ -160,6 +202,9 @@ class MultiScaleDataSet(SimpleDataSet):
         super(MultiScaleDataSet, self).__init__(config, mode, logger, seed)
         self.ds_width = config[mode]["dataset"].get("ds_width", False)
         if self.ds_width:
+            assert (
+                self.label_index is None
+            ), "ds_width needs the width and height columns, use_label_index drops them"
             self.wh_aware()
 
     def wh_aware(self):
@@ -219,16 +264,11 @@ class MultiScaleDataSet(SimpleDataSet):
             img_width = properties[0]
             wh_ratio = None
 
-        data_line = self.data_lines[file_idx]
         try:
-            data_line = data_line.decode("utf-8")
-            substr = data_line.strip("\n").split(self.delimiter)
-            file_name = substr[0]
-            file_name = self._try_parse_filename_list(file_name)
-            label = substr[1]
+            file_name, label = self.get_file_label(file_idx)
             img_path = os.path.join(self.data_dir, file_name)
             data = {"img_path": img_path, "label": label}
-            if not os.path.exists(img_path):
+            if not self.image_exists(img_path):
                 raise Exception("{} does not exist!".format(img_path))
             with open(data["img_path"], "rb") as f:
                 img = f.read()
@@ -241,7 +281,7 @@ class MultiScaleDataSet(SimpleDataSet):
         except:
             self.logger.error(
                 "When parsing line {}, error happened with msg: {}".format(
-                    data_line, traceback.format_exc()
+                    self.get_data_line(file_idx), traceback.format_exc()
                 )
             )
             outs = None
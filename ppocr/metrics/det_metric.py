@@ -22,8 +22,17 @@ from .eval_det_iou import DetectionIoUEvaluator
 
 
 class DetMetric(object):
-    def __init__(self, main_indicator="hmean", **kwargs):
-        self.evaluator = DetectionIoUEvaluator()
+    def __init__(
+        self, main_indicator="hmean", eval_backend="shapely", num_workers=0, **kwargs
+    ):
+        """
+        eval_backend: shapely or vectorized, see DetectionIoUEvaluator
+        num_workers: when > 0, images are collected and evaluated in a process
+            pool of this size in get_metric
+        """
+        self.evaluator = DetectionIoUEvaluator(
+            backend=eval_backend, num_workers=num_workers
+        )
         self.main_indicator = main_indicator
         self.reset()
 
@@ -51,6 +60,9 @@ class DetMetric(object):
             det_info_list = [
                 {"points": det_polyon, "text": ""} for det_polyon in pred["points"]
             ]
+            if self.evaluator.num_workers > 0:
+                self.pending.append((gt_info_list, det_info_list))
+                continue
             result = self.evaluator.evaluate_image(gt_info_list, det_info_list)
             self.results.append(result)
 
@@ -62,6 +74,9 @@ class DetMetric(object):
                  'hmean': 0
             }
         """
+        if self.pending:
+            gts, dets = zip(*self.pending)
+            self.results.extend(self.evaluator.evaluate_images(gts, dets))
 
         metrics = self.evaluator.combine_results(self.results)
         self.reset()
@@ -69,11 +84,20 @@ class DetMetric(object):
 
     def reset(self):
         self.results = []  # clear results
+        self.pending = []
 
 
 class DetFCEMetric(object):
-    def __init__(self, main_indicator="hmean", **kwargs):
-        self.evaluator = DetectionIoUEvaluator()
+    def __init__(
+        self, main_indicator="hmean", eval_backend="shapely", num_workers=0, **kwargs
+    ):
+        """
+        eval_backend and num_workers: same as DetMetric, the images of all
+            score thresholds are evaluated together in get_metric
+        """
+        self.evaluator = DetectionIoUEvaluator(
+            backend=eval_backend, num_workers=num_workers
+        )
         self.main_indicator = main_indicator
         self.reset()
 
@@ -110,6 +134,9 @@ class DetFCEMetric(object):
                     for det_info in det_info_list
                     if det_info["score"] >= score_thr
                 ]
+                if self.evaluator.num_workers > 0:
+                    self.pending.append((score_thr, gt_info_list, det_info_list_thr))
+                    continue
                 result = self.evaluator.evaluate_image(gt_info_list, det_info_list_thr)
                 self.results[score_thr].append(result)
 
@@ -125,6 +152,12 @@ class DetFCEMetric(object):
             'thr 0.9':'precision: 0 recall: 0 hmean: 0',
             }
         """
+        if self.pending:
+            score_thrs, gts, dets = zip(*self.pending)
+            results = self.evaluator.evaluate_images(gts, dets)
+            for score_thr, result in zip(score_thrs, results):
+                self.results[score_thr].append(result)
+
         metrics = {}
         hmean = 0
         for score_thr in self.results.keys():
@@ -151,3 +184,4 @@ class DetFCEMetric(object):
             0.8: [],
             0.9: [],
         }  # clear results
+        self.pending = []
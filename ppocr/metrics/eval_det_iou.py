@@ -1,21 +1,155 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from shapely.geometry import Polygon
 
+try:
+    # vectorized geometry functions and STRtree.query over arrays (shapely>=2)
+    import shapely
+    from shapely import STRtree
+
+    HAS_SHAPELY2 = int(shapely.__version__.split(".")[0]) >= 2
+except ImportError:
+    HAS_SHAPELY2 = False
+
 """
 reference from :
 https://github.com/MhLiao/DB/blob/3c32b808d4412680310d3d28eeb6a2d5bf1566c5/concern/icdar2015_eval/detection/iou.py#L8
 """
 
 
+def to_polygons(points_list):
+    """Build shapely polygons for a list of point arrays, in one call when
+    all of them have the same number of points."""
+    if len(points_list) == 0:
+        return np.empty(0, dtype=object)
+    try:
+        coords = np.asarray(points_list, dtype=np.float64)
+    except ValueError:
+        coords = None
+    if coords is not None and coords.ndim == 3:
+        return shapely.polygons(coords)
+    return np.array([Polygon(points) for points in points_list], dtype=object)
+
+
 class DetectionIoUEvaluator(object):
-    def __init__(self, iou_constraint=0.5, area_precision_constraint=0.5):
+    """
+    backend:
+        shapely: pairwise shapely polygons for every GT x Det pair
+        vectorized: bbox-prefiltered pairs from an STRtree with batched
+            shapely>=2 operations, same metrics as shapely
+    num_workers: processes used by evaluate_images, 0 evaluates in-process.
+        The pool is started on first use and kept until close()
+    """
+
+    def __init__(
+        self,
+        iou_constraint=0.5,
+        area_precision_constraint=0.5,
+        backend="shapely",
+        num_workers=0,
+    ):
+        assert backend in [
+            "shapely",
+            "vectorized",
+        ], "backend must be in [shapely, vectorized] but got: {}".format(backend)
         self.iou_constraint = iou_constraint
         self.area_precision_constraint = area_precision_constraint
+        self.backend = backend
+        self.num_workers = num_workers
+        self._executor = None
+
+    def __getstate__(self):
+        # evaluate_image is sent to the workers together with the evaluator
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def evaluate_images(self, gts, preds):
+        """Evaluate a list of images, in a process pool when num_workers > 0."""
+        if self.num_workers <= 0 or len(gts) < 2:
+            return [self.evaluate_image(gt, pred) for gt, pred in zip(gts, preds)]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        chunksize = max(1, len(gts) // (self.num_workers * 4))
+        return list(
+            self._executor.map(self.evaluate_image, gts, preds, chunksize=chunksize)
+        )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
 
     def evaluate_image(self, gt, pred):
+        if self.backend == "vectorized" and HAS_SHAPELY2:
+            return self.evaluate_image_vectorized(gt, pred)
+        return self.evaluate_image_shapely(gt, pred)
+
+    def evaluate_image_vectorized(self, gt, pred):
+        gt_polys = to_polygons([item["points"] for item in gt])
+        gt_valid = shapely.is_valid(gt_polys)
+        gt_polys = gt_polys[gt_valid]
+        gt_dont_care = np.array(
+            [bool(item["ignore"]) for item in gt], dtype=bool
+        ).reshape(-1)[gt_valid]
+
+        det_polys = to_polygons([item["points"] for item in pred])
+        det_polys = det_polys[shapely.is_valid(det_polys)]
+        det_dont_care = np.zeros(len(det_polys), dtype=bool)
+
+        detMatched = 0
+        if len(gt_polys) > 0 and len(det_polys) > 0:
+            # only pairs with overlapping bounding boxes can intersect
+            gt_idx, det_idx = STRtree(det_polys).query(gt_polys)
+            order = np.lexsort((det_idx, gt_idx))
+            gt_idx, det_idx = gt_idx[order], det_idx[order]
+            pair_gt, pair_det = gt_polys[gt_idx], det_polys[det_idx]
+
+            # dets covered by a don't care GT, intersected in the same order
+            care = gt_dont_care[gt_idx]
+            care_inters = shapely.area(
+                shapely.intersection(pair_gt[care], pair_det[care])
+            )
+            det_areas = shapely.area(det_polys)[det_idx[care]]
+            precisions = np.zeros(len(det_areas))
+            np.divide(care_inters, det_areas, out=precisions, where=det_areas != 0)
+            over = precisions > self.area_precision_constraint
+            det_dont_care[det_idx[care][over]] = True
+
+            inters = shapely.area(shapely.intersection(pair_det, pair_gt))
+            unions = shapely.area(shapely.union(pair_det, pair_gt))
+            # degenerate pairs have no union, the loop backend counts them as 0
+            ious = np.divide(
+                inters, unions, out=np.zeros_like(inters), where=unions > 0
+            )
+            candidates = (
+                (ious > self.iou_constraint)
+                & ~gt_dont_care[gt_idx]
+                & ~det_dont_care[det_idx]
+            )
+            gt_matched = np.zeros(len(gt_polys), dtype=bool)
+            det_matched = np.zeros(len(det_polys), dtype=bool)
+            # same greedy order as the nested GT/Det loops
+            for gtNum, detNum in zip(
+                gt_idx[candidates].tolist(), det_idx[candidates].tolist()
+            ):
+                if not gt_matched[gtNum] and not det_matched[detNum]:
+                    gt_matched[gtNum] = True
+                    det_matched[detNum] = True
+                    detMatched += 1
+
+        numGtCare = int(len(gt_polys) - gt_dont_care.sum())
+        numDetCare = int(len(det_polys) - det_dont_care.sum())
+        return {
+            "gtCare": numGtCare,
+            "detCare": numDetCare,
+            "detMatched": detMatched,
+        }
+
+    def evaluate_image_shapely(self, gt, pred):
         def get_union(pD, pG):
             return Polygon(pD).union(Polygon(pG)).area
 
@@ -19,6 +19,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import cv2
 import paddle
@@ -26,6 +29,228 @@ from shapely.geometry import Polygon
 import pyclipper
 
 
+# stages reported in DBPostProcess.last_timings
+STAGES = ("threshold", "dilate", "contours", "scoring", "unclip")
+
+
+def order_quad_points(points):
+    """
+    Vectorized point ordering of DBPostProcess.get_mini_boxes for (N, 4, 2) quads.
+    """
+    order = np.argsort(points[:, :, 0], axis=1, kind="stable")
+    points = np.take_along_axis(points, order[:, :, None], axis=1)
+    rows = np.arange(len(points))
+    left_swap = points[:, 1, 1] <= points[:, 0, 1]
+    right_swap = points[:, 3, 1] <= points[:, 2, 1]
+    index_1 = np.where(left_swap, 1, 0)
+    index_4 = 1 - index_1
+    index_2 = np.where(right_swap, 3, 2)
+    index_3 = 5 - index_2
+    return np.stack(
+        [
+            points[rows, index_1],
+            points[rows, index_2],
+            points[rows, index_3],
+            points[rows, index_4],
+        ],
+        axis=1,
+    )
+
+
+# fixed-point precision of the cv2.fillPoly edge walk
+_FILL_SHIFT = 16
+
+
+def _line_runs(ax, ay, bx, by, r):
+    """
+    Columns [left, right] of the pixels that cv2.line (8-connected, as drawn
+    by cv2.fillPoly for every edge) sets on row r, for integer endpoints of
+    any shape broadcast with r; left > right where the line misses the row.
+    """
+    swap = bx < ax  # the line iterator walks from left to right
+    ax, ay, bx, by = (
+        np.where(swap, bx, ax),
+        np.where(swap, by, ay),
+        np.where(swap, ax, bx),
+        np.where(swap, ay, by),
+    )
+    dx, dy = bx - ax, by - ay
+    ady = np.abs(dy)
+    offset = (r - ay) * np.where(dy < 0, -1, 1)
+    on_line = (offset >= 0) & (offset <= ady)
+    # Bresenham: after i steps along the major axis the minor axis has moved
+    # ceil((2 * minor * i - major) / (2 * major)) pixels
+    steep = ady > dx
+    major = np.maximum(np.where(steep, ady, dx), 1)
+    minor = np.where(steep, dx, ady)
+    steep_x = ax - ((major - 2 * minor * offset) // (2 * major))
+    safe_minor = np.maximum(minor, 1)
+    run_lo = (2 * major * offset - major) // (2 * safe_minor) + 1
+    run_hi = (2 * major * offset + major) // (2 * safe_minor)
+    run_lo = np.where(minor == 0, 0, np.maximum(run_lo, 0))
+    run_hi = np.where(minor == 0, dx, np.minimum(run_hi, dx))
+    left = np.where(steep, steep_x, ax + run_lo)
+    right = np.where(steep, steep_x, ax + run_hi)
+    return np.where(on_line, left, 1), np.where(on_line, right, 0)
+
+
+def quad_mean_scores(bitmap, quads, integral=None):
+    """
+    Vectorized DBPostProcess.box_score_fast for (N, 4, 2) quads.
+    Every row of every quad is rasterized the way cv2.fillPoly does it, the
+    fixed-point walk of the edges for the interior plus the 8-connected
+    lines of the outline, and the row span is summed with the summed-area
+    table of bitmap, so no mask is allocated per box and the scores equal
+    box_score_fast. Quads with a vertex outside the map (cv2 clips their
+    lines) or more than two edges on a row are not rasterized here and get
+    nan, score them with box_score_fast.
+    """
+    h, w = bitmap.shape[:2]
+    num = len(quads)
+    if num == 0:
+        return np.zeros(0, dtype=np.float64)
+    if integral is None:
+        integral = cv2.integral(bitmap, sdepth=cv2.CV_64F)
+
+    xs, ys = quads[:, :, 0], quads[:, :, 1]
+    xmin = np.clip(np.floor(xs.min(axis=1)), 0, w - 1).astype(np.int64)
+    xmax = np.clip(np.ceil(xs.max(axis=1)), 0, w - 1).astype(np.int64)
+    ymin = np.clip(np.floor(ys.min(axis=1)), 0, h - 1).astype(np.int64)
+    ymax = np.clip(np.ceil(ys.max(axis=1)), 0, h - 1).astype(np.int64)
+    # same integer vertices as box_score_fast, relative to the box origin
+    origin = np.stack([xmin, ymin], axis=1)[:, None, :].astype(np.float32)
+    local = (quads - origin).astype(np.int32).astype(np.int64)
+    widths, heights = xmax - xmin, ymax - ymin
+    inside = (
+        (local[:, :, 0] >= 0).all(axis=1)
+        & (local[:, :, 0] <= widths[:, None]).all(axis=1)
+        & (local[:, :, 1] >= 0).all(axis=1)
+        & (local[:, :, 1] <= heights[:, None]).all(axis=1)
+    )
+
+    rows_per_box = heights + 1
+    box_of_row = np.repeat(np.arange(num), rows_per_box)
+    row_starts = np.cumsum(rows_per_box) - rows_per_box
+    row = np.arange(len(box_of_row)) - np.repeat(row_starts, rows_per_box)
+    r = row[:, None]
+
+    x0, y0 = local[box_of_row, :, 0], local[box_of_row, :, 1]
+    x1, y1 = np.roll(x0, -1, axis=1), np.roll(y0, -1, axis=1)
+
+    # interior: edges are active on rows [top, bottom), their fixed-point x
+    # starts at the upper vertex and each row is filled from the left edge
+    # rounded up to the right edge rounded down
+    one = 1 << _FILL_SHIFT
+    top, bottom = np.minimum(y0, y1), np.maximum(y0, y1)
+    top_x = np.where(y0 < y1, x0, x1) * one
+    span = np.where(y0 == y1, 1, y1 - y0)
+    dx = (x1 - x0) * one
+    # integer division truncating towards zero, like C
+    step = np.sign(dx) * np.sign(span) * (np.abs(dx) // np.abs(span))
+    active = (top <= r) & (r < bottom) & (y0 != y1)
+    edge_x = top_x + (r - top) * step
+
+    # rows without pixels end up with left > right
+    line_left, line_right = _line_runs(x0, y0, x1, y1, r)
+    drawn = line_left <= line_right
+    lo, hi = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    left = np.where(active, edge_x, hi).min(axis=1)
+    right = np.where(active, edge_x, lo).max(axis=1)
+    left = np.where(left == hi, hi, (left + one - 1) >> _FILL_SHIFT)
+    right = np.where(right == lo, lo, right >> _FILL_SHIFT)
+    left = np.minimum(left, np.where(drawn, line_left, hi).min(axis=1))
+    right = np.maximum(right, np.where(drawn, line_right, lo).max(axis=1))
+    num_active = active.sum(axis=1)
+
+    # more than two edges, or an odd count, means the quad is not convex
+    crossed = (num_active % 2 == 1) | (num_active > 2)
+    rasterized = inside & (np.bincount(box_of_row, crossed, minlength=num) == 0)
+    valid = (left <= right) & rasterized[box_of_row]
+    boxes = box_of_row[valid]
+    y = ymin[boxes] + row[valid]
+    left_x, right_x = xmin[boxes] + left[valid], xmin[boxes] + right[valid] + 1
+    sums = (integral[y + 1, right_x] - integral[y + 1, left_x]) - (
+        integral[y, right_x] - integral[y, left_x]
+    )
+    total = np.bincount(boxes, weights=sums, minlength=num)
+    count = np.bincount(boxes, weights=right_x - left_x, minlength=num)
+    scores = np.where(count > 0, total / np.maximum(count, 1), 0.0)
+    return np.where(rasterized, scores, np.nan)
+
+
+class IntegralBoxScorer(object):
+    """
+    Box scoring for one pred map, built once per image.
+    Gives the same score as DBPostProcess.box_score_fast: axis-aligned boxes
+    are scored in O(1) from the summed-area table, rotated boxes are
+    rasterized into a scratch mask that is reused across boxes.
+    """
+
+    def __init__(self, bitmap):
+        self.bitmap = bitmap
+        self.integral = cv2.integral(bitmap, sdepth=cv2.CV_64F)
+        self._scratch = np.zeros((0, 0), dtype=np.uint8)
+
+    def rect_mean(self, xmin, ymin, xmax, ymax):
+        """
+        Mean of bitmap[ymin : ymax + 1, xmin : xmax + 1].
+        """
+        integral = self.integral
+        total = (
+            integral[ymax + 1, xmax + 1]
+            - integral[ymin, xmax + 1]
+            - integral[ymax + 1, xmin]
+            + integral[ymin, xmin]
+        )
+        return float(total) / ((xmax - xmin + 1) * (ymax - ymin + 1))
+
+    def _mask(self, height, width):
+        if self._scratch.shape[0] < height or self._scratch.shape[1] < width:
+            self._scratch = np.zeros(
+                (
+                    max(height, self._scratch.shape[0]),
+                    max(width, self._scratch.shape[1]),
+                ),
+                dtype=np.uint8,
+            )
+        mask = self._scratch[:height, :width]
+        mask[:] = 0
+        return mask
+
+    def score(self, _box):
+        h, w = self.bitmap.shape[:2]
+        box = np.asarray(_box).reshape(-1, 2)
+        lo = np.floor(box.min(axis=0)).astype("int32").tolist()
+        hi = np.ceil(box.max(axis=0)).astype("int32").tolist()
+        xmin, ymin = min(max(lo[0], 0), w - 1), min(max(lo[1], 0), h - 1)
+        xmax, ymax = min(max(hi[0], 0), w - 1), min(max(hi[1], 0), h - 1)
+        points = (box - np.array([xmin, ymin], dtype=box.dtype)).astype("int32")
+
+        if len(points) == 4:
+            (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points.tolist()
+            if (x0 == x3 and x1 == x2 and y0 == y1 and y2 == y3) or (
+                x0 == x1 and x2 == x3 and y0 == y3 and y1 == y2
+            ):
+                # axis-aligned: the filled mask is the clipped rectangle itself
+                left = min(max(min(x0, x2), 0), xmax - xmin)
+                right = min(max(max(x0, x2), 0), xmax - xmin)
+                top = min(max(min(y0, y2), 0), ymax - ymin)
+                bottom = min(max(max(y0, y2), 0), ymax - ymin)
+                return self.rect_mean(
+                    xmin + left, ymin + top, xmin + right, ymin + bottom
+                )
+
+        mask = self._mask(ymax - ymin + 1, xmax - xmin + 1)
+        cv2.fillPoly(mask, points.reshape(1, -1, 2), 1)
+        return cv2.mean(self.bitmap[ymin : ymax + 1, xmin : xmax + 1], mask)[0]
+
+    def score_quads(self, quads):
+        scores = quad_mean_scores(self.bitmap, quads, self.integral)
+        for i in np.flatnonzero(np.isnan(scores)):
+            scores[i] = self.score(quads[i])
+        return scores
+
+
 class DBPostProcess(object):
     """
     The post process for Differentiable Binarization (DB).
@@ -40,6 +265,8 @@ class DBPostProcess(object):
         use_dilation=False,
         score_mode="fast",
         box_type="quad",
+        postprocess_mode="contour",
+        num_threads=0,
         **kwargs,
     ):
         self.thresh = thresh
@@ -52,15 +279,32 @@ class DBPostProcess(object):
         assert score_mode in [
             "slow",
             "fast",
-        ], "Score mode must be in [slow, fast] but got: {}".format(score_mode)
+            "integral",
+        ], "Score mode must be in [slow, fast, integral] but got: {}".format(
+            score_mode
+        )
+        self.postprocess_mode = postprocess_mode
+        assert postprocess_mode in [
+            "contour",
+            "batched",
+        ], "Postprocess mode must be in [contour, batched] but got: {}".format(
+            postprocess_mode
+        )
 
         self.dilation_kernel = None if not use_dilation else np.array([[1, 1], [1, 1]])
+        # num_threads > 1 postprocesses the images of a batch in a thread pool
+        self.num_threads = num_threads
+        self._executor = None
+        self.last_timings = None
 
-    def polygons_from_bitmap(self, pred, _bitmap, dest_width, dest_height):
+    def polygons_from_bitmap(
+        self, pred, _bitmap, dest_width, dest_height, timings=None
+    ):
         """
         _bitmap: single map with shape (1, H, W),
             whose values are binarized as {0, 1}
         """
+        timings = timings if timings is not None else dict.fromkeys(STAGES, 0.0)
 
         bitmap = _bitmap
         height, width = bitmap.shape
@@ -68,18 +312,29 @@ class DBPostProcess(object):
         boxes = []
         scores = []
 
+        tic = time.perf_counter()
         contours, _ = cv2.findContours(
             (bitmap * 255).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
         )
+        timings["contours"] += time.perf_counter() - tic
 
+        scorer = IntegralBoxScorer(pred) if self.score_mode == "integral" else None
         for contour in contours[: self.max_candidates]:
+            tic = time.perf_counter()
             epsilon = 0.002 * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
             points = approx.reshape((-1, 2))
+            toc = time.perf_counter()
+            timings["contours"] += toc - tic
             if points.shape[0] < 4:
                 continue
 
-            score = self.box_score_fast(pred, points.reshape(-1, 2))
+            if scorer is not None:
+                score = scorer.score(points.reshape(-1, 2))
+            else:
+                score = self.box_score_fast(pred, points.reshape(-1, 2))
+            tic = time.perf_counter()
+            timings["scoring"] += tic - toc
             if self.box_thresh > score:
                 continue
 
@@ -104,17 +359,20 @@ class DBPostProcess(object):
             )
             boxes.append(box.tolist())
             scores.append(score)
+            timings["unclip"] += time.perf_counter() - tic
         return boxes, scores
 
-    def boxes_from_bitmap(self, pred, _bitmap, dest_width, dest_height):
+    def boxes_from_bitmap(self, pred, _bitmap, dest_width, dest_height, timings=None):
         """
         _bitmap: single map with shape (1, H, W),
                 whose values are binarized as {0, 1}
         """
+        timings = timings if timings is not None else dict.fromkeys(STAGES, 0.0)
 
         bitmap = _bitmap
         height, width = bitmap.shape
 
+        tic = time.perf_counter()
         outs = cv2.findContours(
             (bitmap * 255).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
         )
@@ -124,38 +382,107 @@ class DBPostProcess(object):
             contours, _ = outs[0], outs[1]
 
         num_contours = min(len(contours), self.max_candidates)
+        timings["contours"] += time.perf_counter() - tic
 
         boxes = []
         scores = []
+        scorer = IntegralBoxScorer(pred) if self.score_mode == "integral" else None
         for index in range(num_contours):
+            tic = time.perf_counter()
             contour = contours[index]
             points, sside = self.get_mini_boxes(contour)
+            toc = time.perf_counter()
+            timings["contours"] += toc - tic
             if sside < self.min_size:
                 continue
             points = np.array(points)
-            if self.score_mode == "fast":
+            if scorer is not None:
+                score = scorer.score(points.reshape(-1, 2))
+            elif self.score_mode == "fast":
                 score = self.box_score_fast(pred, points.reshape(-1, 2))
             else:
                 score = self.box_score_slow(pred, contour)
+            tic = time.perf_counter()
+            timings["scoring"] += tic - toc
             if self.box_thresh > score:
                 continue
 
-            box = self.unclip(points, self.unclip_ratio)
-            if len(box) > 1:
-                continue
-            box = np.array(box).reshape(-1, 1, 2)
-            box, sside = self.get_mini_boxes(box)
-            if sside < self.min_size + 2:
-                continue
-            box = np.array(box)
+            box = self.expand_box(points, width, height, dest_width, dest_height)
+            if box is not None:
+                boxes.append(box)
+                scores.append(score)
+            timings["unclip"] += time.perf_counter() - tic
+        return np.array(boxes, dtype="int32"), scores
 
-            box[:, 0] = np.clip(np.round(box[:, 0] / width * dest_width), 0, dest_width)
-            box[:, 1] = np.clip(
-                np.round(box[:, 1] / height * dest_height), 0, dest_height
+    def expand_box(self, points, width, height, dest_width, dest_height):
+        """
+        Unclip a scored mini box and scale it to the destination size;
+        returns None when the expanded box is dropped.
+        """
+        box = self.unclip(points, self.unclip_ratio)
+        if len(box) > 1:
+            return None
+        box = np.array(box).reshape(-1, 1, 2)
+        box, sside = self.get_mini_boxes(box)
+        if sside < self.min_size + 2:
+            return None
+        box = np.array(box)
+
+        box[:, 0] = np.clip(np.round(box[:, 0] / width * dest_width), 0, dest_width)
+        box[:, 1] = np.clip(np.round(box[:, 1] / height * dest_height), 0, dest_height)
+        return box.astype("int32")
+
+    def boxes_from_bitmap_batched(
+        self, pred, _bitmap, dest_width, dest_height, timings=None
+    ):
+        """
+        Batched version of boxes_from_bitmap, returning the same boxes.
+        The candidates are the same contours, but the mini boxes are ordered
+        and scored for all contours at once: the score is the mean of pred
+        inside the quad, read from the summed-area table with the rows
+        rasterized like cv2.fillPoly, so it equals box_score_fast. Only the
+        boxes above box_thresh are unclipped, one by one as in
+        boxes_from_bitmap, since the pyclipper offset sets the final corners.
+        """
+        timings = timings if timings is not None else dict.fromkeys(STAGES, 0.0)
+        bitmap = _bitmap
+        height, width = bitmap.shape
+
+        tic = time.perf_counter()
+        outs = cv2.findContours(
+            (bitmap * 255).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
+        )
+        contours = outs[-2][: self.max_candidates]
+        rects = [cv2.minAreaRect(contour) for contour in contours]
+        keep = [
+            index for index, rect in enumerate(rects) if min(rect[1]) >= self.min_size
+        ]
+        toc = time.perf_counter()
+        timings["contours"] += toc - tic
+        if not keep:
+            return np.zeros((0, 4, 2), dtype="int32"), []
+        quads = order_quad_points(
+            np.array([cv2.boxPoints(rects[index]) for index in keep])
+        )
+
+        if self.score_mode == "slow":
+            scores = np.array(
+                [self.box_score_slow(pred, contours[index]) for index in keep]
             )
-            boxes.append(box.astype("int32"))
-            scores.append(score)
-        return np.array(boxes, dtype="int32"), scores
+        else:
+            scores = IntegralBoxScorer(pred).score_quads(quads)
+        tic = time.perf_counter()
+        timings["scoring"] += tic - toc
+
+        boxes = []
+        kept_scores = []
+        for index in np.flatnonzero(scores >= self.box_thresh):
+            box = self.expand_box(quads[index], width, height, dest_width, dest_height)
+            if box is not None:
+                boxes.append(box)
+                kept_scores.append(float(scores[index]))
+        timings["unclip"] += time.perf_counter() - tic
+        return np.array(boxes, dtype="int32").reshape(-1, 4, 2), kept_scores
 
     def unclip(self, box, unclip_ratio):
         poly = Polygon(box)
@@ -224,35 +551,80 @@ class DBPostProcess(object):
         cv2.fillPoly(mask, contour.reshape(1, -1, 2).astype("int32"), 1)
         return cv2.mean(bitmap[ymin : ymax + 1, xmin : xmax + 1], mask)[0]
 
+    def postprocess_single(self, pred, shape):
+        """
+        Postprocess one probability map of shape (H, W).
+        Returns ({"points": boxes}, timings) where timings holds the seconds
+        spent in each of STAGES.
+        """
+        timings = dict.fromkeys(STAGES, 0.0)
+        src_h, src_w, ratio_h, ratio_w = shape
+
+        tic = time.perf_counter()
+        segmentation = pred > self.thresh
+        toc = time.perf_counter()
+        timings["threshold"] += toc - tic
+        if self.dilation_kernel is not None:
+            mask = cv2.dilate(
+                np.array(segmentation).astype(np.uint8),
+                self.dilation_kernel,
+            )
+        else:
+            mask = segmentation
+        timings["dilate"] += time.perf_counter() - toc
+
+        if self.box_type == "poly":
+            boxes, scores = self.polygons_from_bitmap(
+                pred, mask, src_w, src_h, timings
+            )
+        elif self.box_type == "quad" and self.postprocess_mode == "batched":
+            boxes, scores = self.boxes_from_bitmap_batched(
+                pred, mask, src_w, src_h, timings
+            )
+        elif self.box_type == "quad":
+            boxes, scores = self.boxes_from_bitmap(pred, mask, src_w, src_h, timings)
+        else:
+            raise ValueError("box_type can only be one of ['quad', 'poly']")
+        return {"points": boxes}, timings
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        return self._executor
+
     def __call__(self, outs_dict, shape_list):
         pred = outs_dict["maps"]
         if isinstance(pred, paddle.Tensor):
             pred = pred.numpy()
         pred = pred[:, 0, :, :]
-        segmentation = pred > self.thresh
 
-        boxes_batch = []
-        for batch_index in range(pred.shape[0]):
-            src_h, src_w, ratio_h, ratio_w = shape_list[batch_index]
-            if self.dilation_kernel is not None:
-                mask = cv2.dilate(
-                    np.array(segmentation[batch_index]).astype(np.uint8),
-                    self.dilation_kernel,
-                )
-            else:
-                mask = segmentation[batch_index]
-            if self.box_type == "poly":
-                boxes, scores = self.polygons_from_bitmap(
-                    pred[batch_index], mask, src_w, src_h
-                )
-            elif self.box_type == "quad":
-                boxes, scores = self.boxes_from_bitmap(
-                    pred[batch_index], mask, src_w, src_h
+        start = time.perf_counter()
+        batch_size = pred.shape[0]
+        if self.num_threads > 1 and batch_size > 1:
+            # OpenCV and most numpy ops release the GIL, so images of a batch
+            # can be postprocessed in parallel; map keeps the input order
+            results = list(
+                self._get_executor().map(
+                    self.postprocess_single,
+                    [pred[batch_index] for batch_index in range(batch_size)],
+                    [shape_list[batch_index] for batch_index in range(batch_size)],
                 )
-            else:
-                raise ValueError("box_type can only be one of ['quad', 'poly']")
-
-            boxes_batch.append({"points": boxes})
+            )
+        else:
+            results = [
+                self.postprocess_single(pred[batch_index], shape_list[batch_index])
+                for batch_index in range(batch_size)
+            ]
+
+        # stage timings are summed over the images, total is the wall time
+        timings = dict.fromkeys(STAGES, 0.0)
+        for _, image_timings in results:
+            for stage, seconds in image_timings.items():
+                timings[stage] += seconds
+        timings["total"] = time.perf_counter() - start
+        self.last_timings = timings
+
+        boxes_batch = [boxes for boxes, _ in results]
         return boxes_batch
 
 
@@ -268,6 +640,8 @@ class DistillationDBPostProcess(object):
         use_dilation=False,
         score_mode="fast",
         box_type="quad",
+        postprocess_mode="contour",
+        num_threads=0,
         **kwargs,
     ):
         self.model_name = model_name
@@ -280,6 +654,8 @@ class DistillationDBPostProcess(object):
             use_dilation=use_dilation,
             score_mode=score_mode,
             box_type=box_type,
+            postprocess_mode=postprocess_mode,
+            num_threads=num_threads,
         )
 
     def __call__(self, predicts, shape_list):
@@ -52,55 +52,193 @@ def weighted_merge(g, p):
     return g
 
 
-def standard_nms(S, thres):
+def quad_aabbs(quads):
     """
-    Standard nms.
+    Axis-aligned bounding boxes [xmin, ymin, xmax, ymax] of N*4*2 quads.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+    return np.concatenate([quads.min(axis=1), quads.max(axis=1)], axis=1)
 
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
 
-    return S[keep]
+def grid_candidate_pairs(aabbs):
+    """
+    Pairs (a, b), a < b, of boxes whose bounding boxes overlap.
 
+    Every box is registered in the cells of a uniform grid it covers, so
+    only boxes sharing a cell are compared. The cell size is the median box
+    size, bounded so that the grid has at most about 4 * N cells.
+    """
+    num = len(aabbs)
+    if num < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    sizes = np.maximum(aabbs[:, 2:] - aabbs[:, :2], 1e-6)
+    extent = np.maximum(aabbs[:, 2:].max(axis=0) - aabbs[:, :2].min(axis=0), 1e-6)
+    cell = max(
+        float(np.median(sizes.max(axis=1))),
+        float(np.sqrt(extent[0] * extent[1] / (4 * num))),
+    )
+    origin = aabbs[:, :2].min(axis=0)
+    lo = np.floor((aabbs[:, :2] - origin) / cell).astype(np.int64)
+    hi = np.floor((aabbs[:, 2:] - origin) / cell).astype(np.int64)
+    grid_w = int(hi[:, 0].max()) + 1
 
-def standard_nms_inds(S, thres):
+    # one entry per (box, covered cell)
+    spans = hi - lo + 1
+    counts = spans[:, 0] * spans[:, 1]
+    boxes = np.repeat(np.arange(num), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = lo[boxes, 0] + local % spans[boxes, 0]
+    cell_y = lo[boxes, 1] + local // spans[boxes, 0]
+    keys = cell_y * grid_w + cell_x
+    order = np.argsort(keys, kind="stable")
+    keys, boxes = keys[order], boxes[order]
+
+    # pair every entry with the following entries of the same cell
+    group_end = np.searchsorted(keys, keys, side="right")
+    partners = group_end - np.arange(len(keys)) - 1
+    firsts = np.repeat(np.arange(len(keys)), partners)
+    seconds = (
+        firsts
+        + 1
+        + np.arange(partners.sum())
+        - np.repeat(np.cumsum(partners) - partners, partners)
+    )
+    a, b = boxes[firsts], boxes[seconds]
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    overlap = (
+        (aabbs[a, 0] <= aabbs[b, 2])
+        & (aabbs[b, 0] <= aabbs[a, 2])
+        & (aabbs[a, 1] <= aabbs[b, 3])
+        & (aabbs[b, 1] <= aabbs[a, 3])
+        & (a != b)
+    )
+    pair_keys = np.unique(a[overlap] * num + b[overlap])
+    return np.stack([pair_keys // num, pair_keys % num], axis=1)
+
+
+def _signed_areas(polys, counts):
+    index = np.arange(polys.shape[1])
+    valid = index[None, :] < counts[:, None]
+    nxt = np.where(index[None, :] + 1 < counts[:, None], index[None, :] + 1, 0)
+    nxt_polys = np.take_along_axis(polys, nxt[..., None], axis=1)
+    cross = polys[..., 0] * nxt_polys[..., 1] - polys[..., 1] * nxt_polys[..., 0]
+    return 0.5 * np.where(valid, cross, 0).sum(axis=1)
+
+
+def _clip_polygons(polys, counts, start, end):
     """
-    Standard nms, retun inds.
+    Sutherland-Hodgman step: clip P polygons by the half plane left of the
+    directed edges start -> end, all pairs at once.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+    width = polys.shape[1]
+    index = np.arange(width)[None, :]
+    valid = index < counts[:, None]
+    dx = (end - start)[:, None, 0]
+    dy = (end - start)[:, None, 1]
+    side = dx * (polys[..., 1] - start[:, None, 1]) - dy * (
+        polys[..., 0] - start[:, None, 0]
+    )
+    inside = side >= 0
 
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
+    prev = np.where(index == 0, np.maximum(counts[:, None] - 1, 0), index - 1)
+    prev_polys = np.take_along_axis(polys, prev[..., None], axis=1)
+    prev_side = np.take_along_axis(side, prev, axis=1)
+    crossing = valid & (inside != (prev_side >= 0))
+    denom = np.where(crossing, prev_side - side, 1.0)
+    t = np.where(crossing, prev_side / denom, 0.0)
+    cut = prev_polys + t[..., None] * (polys - prev_polys)
 
-    return keep
+    # every vertex emits [edge intersection], [itself if inside], in order
+    out = np.stack([cut, polys], axis=2).reshape(len(polys), 2 * width, 2)
+    keep = np.stack([crossing, valid & inside], axis=2)
+    keep = keep.reshape(len(polys), 2 * width)
+    order = np.argsort(~keep, axis=1, kind="stable")
+    new_counts = keep.sum(axis=1)
+    new_width = max(int(new_counts.max(initial=0)), 1)
+    out = np.take_along_axis(out, order[:, :new_width, None], axis=1)
+    return out, new_counts
 
 
-def nms(S, thres):
+def quad_iou_pairs(S, pairs):
     """
-    nms.
+    IoU of the quads S[pairs[:, 0]] and S[pairs[:, 1]] (first 8 values of
+    every row are the coordinates), computed by convex polygon clipping.
+    Pairs with a non-convex quad fall back to shapely via intersection().
     """
+    ious = np.zeros(len(pairs), dtype=np.float64)
+    if len(pairs) == 0:
+        return ious
+    quads = S[:, :8].reshape((-1, 4, 2)).astype(np.float64)
+    four = np.full(len(quads), 4)
+    areas = _signed_areas(quads, four)
+    # counter-clockwise in the x-right/y-up sense used by _clip_polygons
+    quads = np.where(areas[:, None, None] < 0, quads[:, ::-1], quads)
+    edges = np.roll(quads, -1, axis=1) - quads
+    next_edges = np.roll(edges, -1, axis=1)
+    turns = edges[..., 0] * next_edges[..., 1] - edges[..., 1] * next_edges[..., 0]
+    convex = (turns >= -1e-9 * np.abs(areas)[:, None] - 1e-12).all(axis=1)
+    areas = np.abs(areas)
+
+    a, b = pairs[:, 0], pairs[:, 1]
+    fast = convex[a] & convex[b]
+    degenerate = (areas[a] <= 0) | (areas[b] <= 0)
+    todo = np.nonzero(fast & ~degenerate)[0]
+    if len(todo):
+        polys, counts = quads[a[todo]], np.full(len(todo), 4)
+        clipper = quads[b[todo]]
+        for k in range(4):
+            polys, counts = _clip_polygons(
+                polys, counts, clipper[:, k], clipper[:, (k + 1) % 4]
+            )
+        inter = np.abs(_signed_areas(polys, counts))
+        union = areas[a[todo]] + areas[b[todo]] - inter
+        ious[todo] = np.where(union > 0, inter / np.where(union > 0, union, 1), 0)
+    for k in np.nonzero(~fast)[0].tolist():
+        ious[k] = intersection(S[a[k]], S[b[k]])
+    return ious
+
+
+def _nms_keep(S, thres):
+    if len(S) == 0:
+        return []
     order = np.argsort(S[:, 8])[::-1]
+    pairs = grid_candidate_pairs(quad_aabbs(S[:, :8].reshape((-1, 4, 2))))
+    ious = quad_iou_pairs(S, pairs)
+    pairs = pairs[ious > thres]
+
+    # suppression graph in processing order: a kept box removes its neighbours
+    neighbours = [[] for _ in range(len(S))]
+    for a, b in pairs.tolist():
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    suppressed = np.zeros(len(S), dtype=bool)
     keep = []
-    while order.size > 0:
-        i = order[0]
+    for i in order.tolist():
+        if suppressed[i]:
+            continue
         keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+        suppressed[neighbours[i]] = True
+    return keep
 
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
 
-    return keep
+def standard_nms(S, thres):
+    """
+    Standard nms.
+    """
+    return S[_nms_keep(S, thres)]
+
+
+def standard_nms_inds(S, thres):
+    """
+    Standard nms, retun inds.
+    """
+    return _nms_keep(S, thres)
+
+
+def nms(S, thres):
+    """
+    nms.
+    """
+    return _nms_keep(S, thres)
 
 
 def soft_nms(boxes_in, Nt_thres=0.3, threshold=0.8, sigma=0.5, method=2):
@@ -179,7 +317,15 @@ def nms_locality(polys, thres=0.3):
     S = []
     p = None
     for g in polys:
-        if p is not None and intersection(g, p) > thres:
+        # boxes whose bounding boxes do not overlap have zero IoU
+        if (
+            p is not None
+            and g[0:8:2].min() <= p[0:8:2].max()
+            and p[0:8:2].min() <= g[0:8:2].max()
+            and g[1:8:2].min() <= p[1:8:2].max()
+            and p[1:8:2].min() <= g[1:8:2].max()
+            and intersection(g, p) > thres
+        ):
             p = weighted_merge(g, p)
         else:
             if p is not None:
@@ -17,6 +17,9 @@ import paddle
 from paddle.nn import functional as F
 import re
 
+# below this batch size the per-row loop in decode is faster than decode_batch
+BATCH_DECODE_MIN_ROWS = 8
+
 
 class BaseRecLabelDecode(object):
     """Convert between text-label and text-index"""
@@ -47,6 +50,7 @@ class BaseRecLabelDecode(object):
         for i, char in enumerate(dict_character):
             self.dict[char] = i
         self.character = dict_character
+        self._char_table = None
 
     def pred_reverse(self, pred):
         pred_re = []
@@ -141,6 +145,15 @@ class BaseRecLabelDecode(object):
         return_word_box=False,
     ):
         """convert text-index into text-label."""
+        if (
+            not return_word_box
+            and isinstance(text_index, np.ndarray)
+            and text_index.ndim == 2
+            and text_index.shape[0] >= BATCH_DECODE_MIN_ROWS
+            and (text_prob is None or isinstance(text_prob, np.ndarray))
+        ):
+            return self.decode_batch(text_index, text_prob, is_remove_duplicate)
+
         result_list = []
         ignored_tokens = self.get_ignored_tokens()
         batch_size = len(text_index)
@@ -186,21 +199,428 @@ class BaseRecLabelDecode(object):
                 result_list.append((text, np.mean(conf_list).tolist()))
         return result_list
 
+    def get_char_table(self):
+        """
+        NumPy lookup table from index to character. Ignored tokens map to ''
+        as they are never part of the decoded text.
+        """
+        if self._char_table is None or len(self._char_table) != len(self.character):
+            characters = list(self.character)
+            for ignored_token in self.get_ignored_tokens():
+                characters[ignored_token] = ""
+            self._char_table = np.array(characters, dtype=str)
+        return self._char_table
+
+    def decode_batch(self, text_index, text_prob=None, is_remove_duplicate=False):
+        """
+        Vectorized decode for a [B, T] index array, same results as decode.
+        The blank/duplicate selection is computed for the whole batch, the
+        selected columns are moved to the front of every row and rows with the
+        same number of characters are averaged together.
+        """
+        batch_size, length = text_index.shape
+        selection = np.ones(text_index.shape, dtype=bool)
+        if is_remove_duplicate:
+            selection[:, 1:] = text_index[:, 1:] != text_index[:, :-1]
+        for ignored_token in self.get_ignored_tokens():
+            selection &= text_index != ignored_token
+        counts = selection.sum(axis=1)
+
+        order = np.argsort(~selection, axis=1, kind="stable")
+        compact_index = np.take_along_axis(text_index, order, axis=1)
+        compact_selection = np.arange(length)[None, :] < counts[:, None]
+
+        char_table = self.get_char_table()
+        chars = char_table[compact_index]
+        chars[~compact_selection] = ""
+        if char_table.dtype.itemsize <= np.dtype("U1").itemsize and length > 0:
+            # one code point per character: every row of U1 is one U{T} string
+            texts = np.ascontiguousarray(chars).view("U{}".format(length))
+            texts = texts.reshape(batch_size).tolist()
+        else:
+            texts = ["".join(row) for row in chars.tolist()]
+
+        if text_prob is None:
+            confs = [1.0 if length > 0 else 0.0] * batch_size
+        else:
+            compact_prob = np.take_along_axis(text_prob, order, axis=1)
+            confs = [0.0] * batch_size
+            for count in np.unique(counts).tolist():
+                rows = np.nonzero(counts == count)[0]
+                if count == 0:
+                    continue
+                # rows of the same length go through the same summation as
+                # np.mean on a single row, so the float32 results are identical
+                row_probs = np.ascontiguousarray(compact_prob[rows, :count])
+                for row, conf in zip(rows.tolist(), row_probs.mean(axis=1).tolist()):
+                    confs[row] = conf
+
+        result_list = []
+        for text, conf in zip(texts, confs):
+            if self.reverse:  # for arabic rec
+                text = self.pred_reverse(text)
+            result_list.append((text, conf))
+        return result_list
+
     def get_ignored_tokens(self):
         return [0]  # for ctc blank
 
 
+class LexiconTrie(object):
+    """
+    Trie over the character indices of a list of words. Nodes are numbered
+    from 0 (the root) and the edges are kept as a sorted array of
+    node * num_classes + char keys, so the children of many (node, char)
+    pairs are found with one searchsorted. Words with characters that are
+    not in char_dict are skipped.
+    """
+
+    def __init__(self, words, char_dict):
+        self.num_classes = max(char_dict.values()) + 1 if char_dict else 1
+        edges = {}
+        is_end = [False]
+        self.num_words = 0
+        for word in words:
+            word = word.strip()
+            if not word or any(char not in char_dict for char in word):
+                continue
+            node = 0
+            for char in word:
+                key = node * self.num_classes + char_dict[char]
+                child = edges.get(key)
+                if child is None:
+                    child = edges[key] = len(is_end)
+                    is_end.append(False)
+                node = child
+            if not is_end[node]:
+                is_end[node] = True
+                self.num_words += 1
+        keys = sorted(edges)
+        self.keys = np.array(keys, dtype=np.int64)
+        self.children = np.array([edges[key] for key in keys], dtype=np.int64)
+        self.is_end = np.array(is_end, dtype=bool)
+
+    def __len__(self):
+        return self.num_words
+
+    def child(self, nodes, chars):
+        """children of every (node, char) pair, -1 where there is no edge"""
+        keys = nodes * self.num_classes + chars
+        if len(self.keys) == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.children[pos], -1)
+
+
+# multiplier of the rolling hash that identifies a prefix, arithmetic wraps
+# around in uint64
+_PREFIX_HASH_BASE = np.uint64(1000003)
+
+
+def ctc_top_candidates(probs, beam_width=10, blank=0, prune_thresh=1e-3):
+    """
+    Candidate characters of every step of a [N, T, C] batch for beam search:
+    the beam_width most likely non-blank classes with probability >=
+    prune_thresh, and always the most likely non-blank class. Only classes
+    above the threshold are sorted, so the cost is one comparison and one
+    argmax over the batch. Returns the [N, T, k] classes and log
+    probabilities, -inf for empty slots.
+    """
+    shape, num_classes = probs.shape[:-1], probs.shape[-1]
+    k = max(1, min(beam_width, num_classes - 1))
+    probs = probs.reshape(-1, num_classes)
+    num_frames = len(probs)
+    rows = np.arange(num_frames)
+    # argmax without the blank column, on views instead of a copy
+    if blank == 0:
+        best = probs[:, 1:].argmax(axis=1) + 1
+    elif blank == num_classes - 1:
+        best = probs[:, :-1].argmax(axis=1)
+    else:
+        left = probs[:, :blank].argmax(axis=1)
+        right = probs[:, blank + 1 :].argmax(axis=1) + blank + 1
+        best = np.where(probs[rows, left] >= probs[rows, right], left, right)
+
+    frame_ids, chars = np.nonzero(probs >= prune_thresh)
+    other = (chars != blank) & (chars != best[frame_ids])
+    frame_ids = np.concatenate([rows, frame_ids[other]])
+    chars = np.concatenate([best, chars[other]])
+    cand_probs = probs[frame_ids, chars]
+    order = np.lexsort((-cand_probs, frame_ids))
+    frame_start = np.searchsorted(frame_ids[order], rows)
+    rank = np.arange(len(order)) - frame_start[frame_ids[order]]
+    order, rank = order[rank < k], rank[rank < k]
+
+    top = np.zeros((num_frames, k), dtype=np.int64)
+    top_log = np.full((num_frames, k), -np.inf)
+    top[frame_ids[order], rank] = chars[order]
+    top_log[frame_ids[order], rank] = np.log(np.maximum(cand_probs[order], 1e-30))
+    return top.reshape(shape + (k,)), top_log.reshape(shape + (k,))
+
+
+def ctc_prefix_beam_search_batch(
+    probs,
+    beam_width=10,
+    trie=None,
+    blank=0,
+    prune_thresh=1e-3,
+    candidates=None,
+    return_frames=False,
+):
+    """
+    CTC prefix beam search over a [N, T, C] batch of probability matrices.
+
+    The top beam_width candidate characters of every step (probability >=
+    prune_thresh) are selected for the whole batch at once, and each time
+    step advances the beams of all N lines together as arrays: extension
+    scores are a [N, beams, candidates] array, trie edges are looked up in
+    one call, beams reaching the same prefix are merged by (line, prefix
+    hash) with logaddexp.reduceat and the best beam_width prefixes of every
+    line are kept. Prefixes are rebuilt at the end from per-step parent
+    pointers. With a LexiconTrie only prefixes of lexicon words are kept and
+    only complete words are returned.
+
+    candidates: (top, top_log) of an earlier search over the same probs
+        with the same beam_width and prune_thresh, see ctc_top_candidates
+
+    Returns a list of (character indices, log probability) of the best prefix
+    of every line, or (None, -inf) when the trie allows no complete word.
+    With return_frames, the time step at which each character was emitted is
+    appended to every tuple (None when there is no word).
+    """
+    num_lines, length, num_classes = probs.shape
+    width = beam_width
+    k = max(1, min(beam_width, num_classes - 1))
+    if candidates is None:
+        candidates = ctc_top_candidates(probs, beam_width, blank, prune_thresh)
+    top, top_log = candidates
+
+    # beam slots of every line, unused slots have -inf scores
+    hashes = np.zeros((num_lines, width), dtype=np.uint64)
+    p_b = np.full((num_lines, width), -np.inf)
+    p_b[:, 0] = 0.0
+    p_nb = np.full((num_lines, width), -np.inf)
+    last = np.full((num_lines, width), -1)
+    nodes = np.zeros((num_lines, width), dtype=np.int64)
+    num_ext = min(2 * beam_width, width * k)
+    line_ids = np.repeat(np.arange(num_lines), width + num_ext)
+    slots = np.arange(width)
+    parents, appended = [], []
+    for t in range(length):
+        step_probs = probs[:, t, :]
+        total = np.logaddexp(p_b, p_nb)
+        stay_b = total + np.log(np.maximum(step_probs[:, blank, None], 1e-30))
+        last_probs = np.take_along_axis(step_probs, np.maximum(last, 0), axis=1)
+        last_log = np.log(np.maximum(last_probs, 1e-30))
+        stay_nb = np.where(last >= 0, p_nb + last_log, -np.inf)
+
+        chars = top[:, t, None, :]
+        # a repeated character only extends the prefix after a blank
+        ext = np.where(chars == last[:, :, None], p_b[:, :, None], total[:, :, None])
+        ext = ext + top_log[:, t, None, :]
+        if trie is not None:
+            ext_node = trie.child(nodes[:, :, None], chars)
+            ext[ext_node < 0] = -np.inf
+        else:
+            ext_node = np.zeros(ext.shape, dtype=np.int64)
+        ext = ext.reshape(num_lines, -1)
+        keep = np.argpartition(-ext, num_ext - 1, axis=1)[:, :num_ext]
+        ext_slot, ext_col = np.divmod(keep, k)
+        ext_char = np.take_along_axis(top[:, t, :], ext_col, axis=1)
+
+        # candidates: every slot without a new character, then the extensions
+        cand_parent = np.concatenate(
+            [np.broadcast_to(slots, (num_lines, width)), ext_slot], axis=1
+        ).ravel()
+        cand_char = np.concatenate(
+            [np.full((num_lines, width), -1), ext_char], axis=1
+        ).ravel()
+        cand_hash = np.concatenate(
+            [
+                hashes,
+                np.take_along_axis(hashes, ext_slot, axis=1) * _PREFIX_HASH_BASE
+                + (ext_char + 1).astype(np.uint64),
+            ],
+            axis=1,
+        ).ravel()
+        cand_b = np.concatenate(
+            [stay_b, np.full((num_lines, num_ext), -np.inf)], axis=1
+        ).ravel()
+        cand_nb = np.concatenate(
+            [stay_nb, np.take_along_axis(ext, keep, axis=1)], axis=1
+        ).ravel()
+        cand_last = np.concatenate([last, ext_char], axis=1).ravel()
+        cand_node = np.concatenate(
+            [nodes, np.take_along_axis(ext_node.reshape(num_lines, -1), keep, axis=1)],
+            axis=1,
+        ).ravel()
+
+        # merge candidates with the same prefix, the best one of a group
+        # (never an unused slot when the prefix is reachable) represents it
+        cand_score = np.logaddexp(cand_b, cand_nb)
+        order = np.lexsort((-cand_score, cand_hash, line_ids))
+        sorted_line, sorted_hash = line_ids[order], cand_hash[order]
+        starts = np.flatnonzero(
+            np.concatenate(
+                [
+                    [True],
+                    (sorted_line[1:] != sorted_line[:-1])
+                    | (sorted_hash[1:] != sorted_hash[:-1]),
+                ]
+            )
+        )
+        merged_b = np.logaddexp.reduceat(cand_b[order], starts)
+        merged_nb = np.logaddexp.reduceat(cand_nb[order], starts)
+        rep = order[starts]
+        group_line = line_ids[rep]
+        group_score = np.logaddexp(merged_b, merged_nb)
+
+        # best width groups of every line go to the slots in score order
+        group_order = np.lexsort((-group_score, group_line))
+        line_start = np.searchsorted(group_line[group_order], np.arange(num_lines))
+        rank = np.arange(len(group_order)) - line_start[group_line[group_order]]
+        chosen = group_order[rank < width]
+        chosen_line, chosen_slot = group_line[chosen], rank[rank < width]
+
+        p_b = np.full((num_lines, width), -np.inf)
+        p_nb = np.full((num_lines, width), -np.inf)
+        hashes = np.zeros((num_lines, width), dtype=np.uint64)
+        last = np.full((num_lines, width), -1)
+        nodes = np.zeros((num_lines, width), dtype=np.int64)
+        parent = np.zeros((num_lines, width), dtype=np.int64)
+        char = np.full((num_lines, width), -1)
+        p_b[chosen_line, chosen_slot] = merged_b[chosen]
+        p_nb[chosen_line, chosen_slot] = merged_nb[chosen]
+        hashes[chosen_line, chosen_slot] = cand_hash[rep[chosen]]
+        last[chosen_line, chosen_slot] = cand_last[rep[chosen]]
+        nodes[chosen_line, chosen_slot] = cand_node[rep[chosen]]
+        parent[chosen_line, chosen_slot] = cand_parent[rep[chosen]]
+        char[chosen_line, chosen_slot] = cand_char[rep[chosen]]
+        parents.append(parent)
+        appended.append(char)
+
+    scores = np.logaddexp(p_b, p_nb)
+    results = []
+    for line in range(num_lines):
+        result = (None, -np.inf, None)
+        for slot in np.argsort(-scores[line], kind="stable").tolist():
+            if scores[line, slot] == -np.inf:
+                break
+            if trie is None or trie.is_end[nodes[line, slot]]:
+                score = float(scores[line, slot])
+                text_index, frames = [], []
+                for step in range(length - 1, -1, -1):
+                    if appended[step][line, slot] >= 0:
+                        text_index.append(int(appended[step][line, slot]))
+                        frames.append(step)
+                    slot = parents[step][line, slot]
+                result = (text_index[::-1], score, frames[::-1])
+                break
+        results.append(result if return_frames else result[:2])
+    return results
+
+
+def ctc_prefix_beam_search(
+    probs, beam_width=10, trie=None, blank=0, prune_thresh=1e-3, return_frames=False
+):
+    """ctc_prefix_beam_search_batch for one [T, C] probability matrix"""
+    return ctc_prefix_beam_search_batch(
+        probs[None], beam_width, trie, blank, prune_thresh, return_frames=return_frames
+    )[0]
+
+
 class CTCLabelDecode(BaseRecLabelDecode):
-    """Convert between text-label and text-index"""
+    """Convert between text-label and text-index
+
+    decode_mode:
+        greedy: best class of every time step (default)
+        beam: CTC prefix beam search with beam_width beams
+        lexicon: prefix beam search constrained to the words in lexicon
+            (a list of words or a file with one word per line); falls back
+            to beam for lines that do not match any word, or whose best word
+            is less than lexicon_min_ratio times as likely as the beam result
+
+    In every mode the confidence is the mean probability of the decoded
+    characters, so drop_score thresholds carry over between modes.
+    """
 
-    def __init__(self, character_dict_path=None, use_space_char=False, **kwargs):
+    def __init__(
+        self,
+        character_dict_path=None,
+        use_space_char=False,
+        decode_mode="greedy",
+        beam_width=10,
+        lexicon=None,
+        lexicon_min_ratio=0.0,
+        **kwargs,
+    ):
         super(CTCLabelDecode, self).__init__(character_dict_path, use_space_char)
+        assert decode_mode in [
+            "greedy",
+            "beam",
+            "lexicon",
+        ], "decode_mode must be in [greedy, beam, lexicon] but got: {}".format(
+            decode_mode
+        )
+        self.decode_mode = decode_mode
+        self.beam_width = beam_width
+        self.lexicon_min_ratio = lexicon_min_ratio
+        self.lexicon_trie = None
+        if lexicon is not None:
+            self.set_lexicon(lexicon)
+
+    def set_lexicon(self, lexicon):
+        """lexicon: list of words or path to a file with one word per line"""
+        if isinstance(lexicon, str):
+            with open(lexicon, "r", encoding="utf-8") as fin:
+                lexicon = fin.read().splitlines()
+        self.lexicon_trie = LexiconTrie(lexicon, self.dict)
+
+    def beam_decode(self, preds):
+        candidates = ctc_top_candidates(preds, self.beam_width)
+        results = ctc_prefix_beam_search_batch(
+            preds, self.beam_width, candidates=candidates, return_frames=True
+        )
+        if self.decode_mode == "lexicon" and self.lexicon_trie is not None:
+            lexicon_results = ctc_prefix_beam_search_batch(
+                preds,
+                self.beam_width,
+                self.lexicon_trie,
+                candidates=candidates,
+                return_frames=True,
+            )
+            min_log_ratio = -np.inf
+            if self.lexicon_min_ratio > 0:
+                min_log_ratio = np.log(self.lexicon_min_ratio)
+            for i, lexicon_result in enumerate(lexicon_results):
+                # keep the word unless the unconstrained path is far more likely
+                text_index, score, _ = lexicon_result
+                if text_index is not None and score - results[i][1] >= min_log_ratio:
+                    results[i] = lexicon_result
+
+        result_list = []
+        for line, (text_index, _, frames) in enumerate(results):
+            text = "".join([self.character[idx] for idx in text_index])
+            if self.reverse:  # for arabic rec
+                text = self.pred_reverse(text)
+            # same scale as greedy decoding: mean probability of the decoded
+            # characters at the steps where they were emitted, so drop_score
+            # means the same in every decode_mode
+            conf_list = preds[line, frames, text_index] if text_index else [0]
+            result_list.append((text, np.mean(conf_list).tolist()))
+        return result_list
 
     def __call__(self, preds, label=None, return_word_box=False, *args, **kwargs):
         if isinstance(preds, tuple) or isinstance(preds, list):
             preds = preds[-1]
         if isinstance(preds, paddle.Tensor):
             preds = preds.numpy()
+        if self.decode_mode != "greedy" and not return_word_box:
+            text = self.beam_decode(preds)
+            if label is None:
+                return text
+            label = self.decode(label)
+            return text, label
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
         text = self.decode(
@@ -240,7 +660,7 @@ class DistillationCTCLabelDecode(CTCLabelDecode):
         **kwargs,
     ):
         super(DistillationCTCLabelDecode, self).__init__(
-            character_dict_path, use_space_char
+            character_dict_path, use_space_char, **kwargs
         )
         if not isinstance(model_name, list):
             model_name = [model_name]
@@ -0,0 +1,157 @@
+# copyright (c) 2020 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Convert a SimpleDataSet label file or an LMDBDataSet directory to packed
+shards readable by PackedDataSet. Running it again with the same output
+appends to the last shard. Run it as a module from the repository root, since
+ppocr/utils/logging.py would shadow the standard library when run as a script.
+
+    python -m ppocr.utils.gen_packed_dataset --mode label \
+        --data_dir ./train_data/ --input_path ./train_data/rec_gt_train.txt \
+        --output_dir ./train_data/packed/
+    python -m ppocr.utils.gen_packed_dataset --mode lmdb \
+        --input_path ./train_data/data_lmdb_release/training/ \
+        --output_dir ./train_data/packed/
+"""
+import os
+import sys
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(__dir__, "../..")))
+
+from ppocr.data.packed_dataset import (
+    PackedShardWriter,
+    find_packed_shards,
+    packed_num_samples,
+)
+
+
+class ShardedWriter(object):
+    """PackedShardWriter that starts a new shard every shard_size samples"""
+
+    def __init__(self, output_dir, shard_size=1000000, name="shard"):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.name = name
+        shards = find_packed_shards(output_dir)
+        self.shard_idx = len(shards) - 1 if shards else 0
+        if shards and packed_num_samples(shards[-1]) >= shard_size:
+            self.shard_idx += 1
+        self.writer = self._open()
+        self.num_samples = 0
+
+    def _open(self):
+        prefix = os.path.join(
+            self.output_dir, "{}_{:05d}".format(self.name, self.shard_idx)
+        )
+        return PackedShardWriter(prefix)
+
+    def add(self, image, label):
+        if self.writer.num_samples >= self.shard_size:
+            self.writer.close()
+            self.shard_idx += 1
+            self.writer = self._open()
+        self.writer.add(image, label)
+        self.num_samples += 1
+
+    def close(self):
+        self.writer.close()
+
+
+def pack_label_file(data_dir, label_file, writer, delimiter="\t"):
+    """pack the `image_path<delimiter>label` lines of a SimpleDataSet label file"""
+    with open(label_file, "rb") as f:
+        for line in f:
+            substr = line.decode("utf-8").strip("\n").split(delimiter)
+            if len(substr) < 2:
+                continue
+            img_path = os.path.join(data_dir, substr[0])
+            if not os.path.exists(img_path):
+                print("{} does not exist, skipped".format(img_path))
+                continue
+            with open(img_path, "rb") as img_file:
+                writer.add(img_file.read(), substr[1])
+
+
+def pack_lmdb(lmdb_dir, writer):
+    """pack every leaf LMDB under lmdb_dir, in path order"""
+    import lmdb
+
+    for dirpath, dirnames, filenames in sorted(os.walk(lmdb_dir + "/")):
+        if dirnames:
+            continue
+        env = lmdb.open(
+            dirpath,
+            max_readers=32,
+            readonly=True,
+            lock=False,
+            readahead=False,
+            meminit=False,
+        )
+        with env.begin(write=False) as txn:
+            num_samples = int(txn.get("num-samples".encode()))
+            for index in range(1, num_samples + 1):
+                label = txn.get("label-%09d".encode() % index)
+                imgbuf = txn.get("image-%09d".encode() % index)
+                if label is None or not imgbuf:
+                    continue
+                writer.add(imgbuf, label.decode("utf-8"))
+        env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="label",
+        help="Convert a label file (label) or an lmdb directory (lmdb)",
+    )
+    parser.add_argument(
+        "--data_dir",
+        type=str,
+        default=".",
+        help="The root directory of images. Only takes effect when mode=label",
+    )
+    parser.add_argument(
+        "--input_path",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Label files or lmdb directories to be converted",
+    )
+    parser.add_argument(
+        "--output_dir", type=str, required=True, help="Directory of the shards"
+    )
+    parser.add_argument(
+        "--delimiter", type=str, default="\t", help="Delimiter of the label file"
+    )
+    parser.add_argument(
+        "--shard_size", type=int, default=1000000, help="Samples per shard"
+    )
+
+    args = parser.parse_args()
+    writer = ShardedWriter(args.output_dir, args.shard_size)
+    try:
+        for input_path in args.input_path:
+            if args.mode == "label":
+                pack_label_file(args.data_dir, input_path, writer, args.delimiter)
+            elif args.mode == "lmdb":
+                pack_lmdb(input_path, writer)
+            else:
+                raise ValueError("mode should be label or lmdb")
+    finally:
+        writer.close()
+    print("Packed {} samples to {}".format(writer.num_samples, args.output_dir))
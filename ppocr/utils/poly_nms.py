@@ -15,6 +15,15 @@
 import numpy as np
 from shapely.geometry import Polygon
 
+try:
+    # vectorized geometry functions and STRtree.query over arrays (shapely>=2)
+    import shapely
+    from shapely import STRtree
+
+    HAS_SHAPELY2 = int(shapely.__version__.split(".")[0]) >= 2
+except ImportError:
+    HAS_SHAPELY2 = False
+
 
 def points2polygon(points):
     """Convert k points to 1 polygon.
@@ -128,7 +137,61 @@ def poly_nms(polygons, threshold):
     assert isinstance(polygons, list)
 
     polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
+    if not HAS_SHAPELY2 or len(polygons) < 2:
+        return _poly_nms_loop(polygons, threshold)
+    for points in polygons:
+        assert valid_boundary(points[:-1], False)
+
+    suppress = poly_suppress_pairs(polygons[:, :-1], threshold)
+    suppressed = np.zeros(len(polygons), dtype=bool)
+    keep_poly = []
+    # the highest score comes last; ties keep the later polygon first
+    for i in range(len(polygons) - 1, -1, -1):
+        if suppressed[i]:
+            continue
+        keep_poly.append(polygons[i].tolist())
+        suppressed[suppress[i]] = True
+    return keep_poly
+
 
+def poly_suppress_pairs(boundaries, threshold, buffer=0.0001):
+    """For every boundary, the boundaries whose boundary_iou with it exceeds
+    threshold.
+
+    Candidate pairs come from one STRtree query over the buffered polygons,
+    so exact IoU is only computed for pairs whose bounding boxes overlap,
+    in batched shapely calls.
+
+    Args:
+        boundaries (ndarray): Boundaries of shape (n, 2k) without scores.
+        threshold (float): IoU threshold.
+
+    Returns:
+        neighbours (list[list[int]]): Suppression lists.
+    """
+    polys = shapely.polygons(boundaries.reshape((len(boundaries), -1, 2)))
+    buffered = shapely.buffer(polys, buffer)
+    first, second = STRtree(buffered).query(buffered)
+    upper = first < second
+    first, second = first[upper], second[upper]
+
+    # same arithmetic as poly_iou: buffered intersection, unbuffered union
+    inters = shapely.area(shapely.intersection(buffered[first], buffered[second]))
+    areas = shapely.area(polys)
+    unions = areas[first] + areas[second] - inters
+    ious = np.zeros(len(first))
+    nonzero = unions != 0
+    ious[nonzero] = inters[nonzero] / unions[nonzero]
+
+    neighbours = [[] for _ in range(len(boundaries))]
+    over = ious > threshold
+    for a, b in zip(first[over].tolist(), second[over].tolist()):
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    return neighbours
+
+
+def _poly_nms_loop(polygons, threshold):
     keep_poly = []
     index = [i for i in range(polygons.shape[0])]
 
@@ -0,0 +1,3 @@
+# ppocr.data imports the `tools` package shipped with paddleocr, which puts
+# its own directory on sys.path when it is imported, as it is in the app
+import paddleocr  # noqa: F401
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+
+from ppocr.postprocess import db_postprocess
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_score_quads_matches_box_score_fast(seed):
+    rng = np.random.default_rng(seed)
+    bitmap = rng.random((120, 160)).astype(np.float32)
+    # rotated boxes, arbitrary quads, degenerate ones and quads past the border
+    centers = rng.uniform(-10, 170, (400, 2))
+    quads = centers[:, None, :] + rng.uniform(-25, 25, (400, 4, 2))
+    quads[::7, 2] = quads[::7, 1]
+    quads = np.concatenate(
+        [
+            quads,
+            [rotated_box(c, rng) for c in rng.uniform(10, 110, (100, 2))],
+        ]
+    ).astype(np.float32)
+    # scores near box_thresh decide which boxes are kept, so compare tightly
+    post = db_postprocess.DBPostProcess()
+    expected = np.array([post.box_score_fast(bitmap, q) for q in quads])
+    scores = db_postprocess.IntegralBoxScorer(bitmap).score_quads(quads)
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12)
+
+
+def rotated_box(center, rng):
+    size = rng.uniform(2, 40, 2)
+    return cv2.boxPoints((tuple(center), tuple(size), rng.uniform(-90, 90)))
+
+
+@pytest.mark.parametrize("score_mode", ["fast", "slow"])
+def test_batched_mode_returns_contour_boxes(score_mode):
+    rng = np.random.default_rng(0)
+    pred = rng.uniform(0, 0.2, (320, 320)).astype(np.float32)
+    for _ in range(40):
+        center = tuple(rng.uniform(20, 300, 2))
+        size = tuple(rng.uniform(6, 60, 2))
+        box = cv2.boxPoints((center, size, rng.uniform(-10, 10)))
+        cv2.fillPoly(pred, [box.astype(np.int32)], float(rng.uniform(0.4, 0.95)))
+    # a ring, whose hole is a contour of its own
+    cv2.circle(pred, (160, 160), 40, 0.9, 8)
+    outs_dict = {"maps": cv2.GaussianBlur(pred, (3, 3), 0)[None, None]}
+    shape_list = [(640, 480, 1.5, 2.0)]
+
+    results = [
+        db_postprocess.DBPostProcess(
+            box_thresh=0.6, score_mode=score_mode, postprocess_mode=mode
+        )(outs_dict, shape_list)[0]["points"]
+        for mode in ["contour", "batched"]
+    ]
+    assert len(results[0]) > 0
+    np.testing.assert_array_equal(results[1], results[0])
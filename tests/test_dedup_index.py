@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from core.dedup_index import HammingIndex, find_unique
+
+
+def random_hashes(num, num_bases, max_flips, seed=0):
+    # near-duplicates: random 64-bit bases with a few bits flipped
+    rng = np.random.default_rng(seed)
+    bases = rng.integers(0, 2**63, num_bases, dtype=np.uint64).tolist()
+    values = []
+    for _ in range(num):
+        value = bases[rng.integers(num_bases)]
+        for bit in rng.choice(64, rng.integers(0, max_flips + 1), replace=False):
+            value ^= 1 << int(bit)
+        values.append(value)
+    return values
+
+
+def brute_force_unique(hash_values, max_distance):
+    kept = []
+    duplicates = {}
+    for i, value in enumerate(hash_values):
+        match = next(
+            (j for j in kept if bin(value ^ hash_values[j]).count("1") <= max_distance),
+            None,
+        )
+        if match is None:
+            kept.append(i)
+        else:
+            duplicates[i] = match
+    return kept, duplicates
+
+
+@pytest.mark.parametrize("max_distance", [-1, 0, 3, 10])
+def test_find_unique_matches_brute_force(max_distance):
+    values = random_hashes(1000, 150, 12)
+    assert find_unique(values, max_distance) == brute_force_unique(values, max_distance)
+
+
+@pytest.mark.parametrize("max_distance", [0, 5, 17])
+def test_index_lookup_matches_scan(max_distance):
+    values = random_hashes(500, 60, 20, seed=1)
+    index = HammingIndex(max_distance, capacity=8)
+    index._scan_limit = 0  # always go through the chunk tables
+    for value in values:
+        distances = [bin(value ^ values[j]).count("1") for j in range(index.size)]
+        expected = next((j for j, d in enumerate(distances) if d <= max_distance), None)
+        assert index.query(value) == expected
+        index.add(value)
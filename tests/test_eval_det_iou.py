@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+
+from ppocr.metrics.eval_det_iou import HAS_SHAPELY2, DetectionIoUEvaluator
+
+KEYS = ("gtCare", "detCare", "detMatched")
+
+
+def random_quads(rng, num):
+    return [
+        cv2.boxPoints(
+            (tuple(rng.uniform(0, 300, 2)), tuple(rng.uniform(5, 80, 2)), angle)
+        ).tolist()
+        for angle in rng.uniform(-30, 30, num)
+    ]
+
+
+def random_image(rng):
+    gt_points = random_quads(rng, rng.integers(0, 25))
+    gt = [
+        {"points": points, "ignore": bool(rng.random() < 0.2)} for points in gt_points
+    ]
+    # detections jittered around the GTs, plus unmatched and invalid ones
+    det_points = [
+        (np.asarray(points) + rng.normal(0, 4, (4, 2))).tolist()
+        for points in gt_points
+        if rng.random() < 0.8
+    ]
+    det_points += random_quads(rng, rng.integers(0, 5))
+    if rng.random() < 0.3:
+        det_points.append([[0, 0], [10, 10], [10, 0], [0, 10]])  # self-intersecting
+    return gt, [{"points": points} for points in det_points]
+
+
+@pytest.mark.skipif(not HAS_SHAPELY2, reason="needs shapely>=2")
+def test_vectorized_backend_matches_shapely():
+    rng = np.random.default_rng(0)
+    shapely_eval = DetectionIoUEvaluator(backend="shapely")
+    vectorized_eval = DetectionIoUEvaluator(backend="vectorized")
+    for _ in range(60):
+        gt, pred = random_image(rng)
+        expected = shapely_eval.evaluate_image(gt, pred)
+        result = vectorized_eval.evaluate_image(gt, pred)
+        assert {key: result[key] for key in KEYS} == {
+            key: expected[key] for key in KEYS
+        }
+
+
+def test_evaluate_images_in_workers():
+    rng = np.random.default_rng(1)
+    images = [random_image(rng) for _ in range(8)]
+    gts, preds = [gt for gt, _ in images], [pred for _, pred in images]
+    evaluator = DetectionIoUEvaluator(backend="vectorized", num_workers=2)
+    try:
+        results = evaluator.evaluate_images(gts, preds)
+    finally:
+        evaluator.close()
+    expected = DetectionIoUEvaluator(backend="vectorized").evaluate_images(gts, preds)
+    assert [{key: r[key] for key in KEYS} for r in results] == [
+        {key: r[key] for key in KEYS} for r in expected
+    ]
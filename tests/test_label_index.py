@@ -0,0 +1,111 @@
+import logging
+import os
+
+import pytest
+
+from ppocr.data import label_index
+from ppocr.data.simple_dataset import SimpleDataSet
+
+LINES = [
+    "imgs/a.jpg\t你好",
+    "imgs/b.jpg\tlabel with spaces",
+    "imgs/missing.jpg\tgone",
+    "imgs/c.jpg",  # no label
+    '["imgs/a.jpg"]\tfrom a list',
+    "imgs/sub/../c.jpg\tdotted path",
+    "imgs/d.jpg\textra\tcolumns",
+    "",
+    "imgs/e.jpg\t",
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "imgs" / "sub").mkdir(parents=True)
+    for name in "abcde":
+        (tmp_path / "imgs" / "{}.jpg".format(name)).write_bytes(name.encode())
+    label_file = tmp_path / "train.txt"
+    label_file.write_bytes("\n".join(LINES).encode("utf-8") + b"\n")
+    return tmp_path
+
+
+def make_dataset(data_dir, mode="Eval", **dataset_options):
+    config = {
+        "Global": {},
+        mode: {
+            "dataset": {
+                "data_dir": str(data_dir),
+                "label_file_list": [str(data_dir / "train.txt")],
+                "transforms": [{"KeepKeys": {"keep_keys": ["img_path", "label"]}}],
+                **dataset_options,
+            },
+            "loader": {"shuffle": False},
+        },
+    }
+    return SimpleDataSet(config, mode, logging.getLogger(__name__), seed=0)
+
+
+def readable_samples(dataset):
+    # line mode keeps every line and fails on the unreadable ones when loading
+    samples = []
+    for idx in range(len(dataset)):
+        try:
+            file_name, label = dataset.get_file_label(dataset.data_idx_order_list[idx])
+        except (IndexError, UnicodeDecodeError):
+            continue
+        if dataset.image_exists(os.path.join(dataset.data_dir, file_name)):
+            samples.append(dataset[idx])
+    return samples
+
+
+def test_label_index_matches_line_mode(data_dir):
+    lines = make_dataset(data_dir)
+    indexed = make_dataset(data_dir, use_label_index=True)
+    assert len(indexed) == 6
+    assert [indexed[idx] for idx in range(len(indexed))] == readable_samples(lines)
+
+
+def test_label_index_rebuilt_when_label_file_changes(data_dir):
+    assert len(make_dataset(data_dir, use_label_index=True)) == 6
+    with open(data_dir / "train.txt", "ab") as f:
+        f.write("imgs/b.jpg\tappended\n".encode("utf-8"))
+    indexed = make_dataset(data_dir, use_label_index=True)
+    assert len(indexed) == 7
+    assert indexed[6] == [str(data_dir / "imgs" / "b.jpg"), "appended"]
+
+
+def test_undecodable_lines_are_skipped(data_dir):
+    with open(data_dir / "train.txt", "ab") as f:
+        f.write(b"imgs/a.jpg\t\xff\xfe\n")
+        f.write(b"imgs/\xc3.jpg\tlabel\n")
+    expected = readable_samples(make_dataset(data_dir))
+    num_skipped = label_index.build_label_index(
+        str(data_dir / "train.txt"), str(data_dir)
+    )
+    assert num_skipped == len(LINES) + 2 - 6
+    indexed = make_dataset(data_dir, use_label_index=True)
+    assert [indexed[idx] for idx in range(len(indexed))] == expected
+
+
+def test_read_only_label_dir_uses_cache_dir(data_dir, tmp_path, monkeypatch):
+    label_dir = str(data_dir)
+    access = label_index.os.access
+    monkeypatch.setattr(
+        label_index.os,
+        "access",
+        lambda path, mode: path != label_dir and access(path, mode),
+    )
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setattr(label_index, "LABEL_INDEX_CACHE_DIR", cache_dir)
+
+    indexed = make_dataset(data_dir, use_label_index=True)
+    assert len(indexed) == 6
+    assert not (data_dir / "train.txt.index.npy").exists()
+    assert indexed.label_index.index_prefixes[0].startswith(cache_dir)
+
+    # an explicit label_index_dir still wins
+    index_dir = tmp_path / "index"
+    indexed = make_dataset(
+        data_dir, use_label_index=True, label_index_dir=str(index_dir)
+    )
+    assert indexed.label_index.index_prefixes[0].startswith(str(index_dir))
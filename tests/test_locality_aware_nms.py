@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+import pytest
+
+from ppocr.postprocess import locality_aware_nms
+
+
+def random_boxes(num, seed=0):
+    # overlapping rotated quads with scores, a few non-convex and duplicated
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(num) * 40
+    quads = np.array(
+        [
+            cv2.boxPoints((tuple(center), tuple(box_size), angle))
+            for center, box_size, angle in zip(
+                rng.uniform(0, size, (num, 2)),
+                rng.uniform(20, 120, (num, 2)) * [1.0, 0.4],
+                rng.uniform(-15, 15, num),
+            )
+        ]
+    )
+    quads[::17, 2] = quads[::17, 0] + 0.2 * (quads[::17, 2] - quads[::17, 0])
+    quads[5::23] = quads[4::23][: len(quads[5::23])]
+    return np.concatenate([quads.reshape(num, 8), rng.random((num, 1))], axis=1)
+
+
+def legacy_nms(S, thres):
+    order = np.argsort(S[:, 8])[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = np.array(
+            [locality_aware_nms.intersection(S[i], S[t]) for t in order[1:]]
+        )
+        order = order[np.where(ovr <= thres)[0] + 1]
+    return keep
+
+
+def test_quad_iou_pairs_matches_intersection():
+    S = random_boxes(120)
+    pairs = np.array([(a, b) for a in range(120) for b in range(a + 1, 120)])
+    expected = [locality_aware_nms.intersection(S[a], S[b]) for a, b in pairs]
+    ious = locality_aware_nms.quad_iou_pairs(S, pairs)
+    np.testing.assert_allclose(ious, expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("thres", [0.1, 0.3, 0.7])
+def test_nms_matches_legacy(thres):
+    S = random_boxes(200, seed=1)
+    expected = legacy_nms(S, thres)
+    assert locality_aware_nms.nms(S, thres) == expected
+    assert locality_aware_nms.standard_nms_inds(S, thres) == expected
+    np.testing.assert_array_equal(
+        locality_aware_nms.standard_nms(S, thres), S[expected]
+    )
+
+
+def test_nms_empty():
+    assert locality_aware_nms.nms(np.zeros((0, 9)), 0.3) == []
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from core.name_matcher import NameMatcher
+from core.ocr_handler import flexible_name_match
+
+SURNAMES = "王李张刘陈杨赵黄周吴"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平"
+
+
+def random_name(rng, length):
+    return rng.choice(list(SURNAMES)) + "".join(rng.choice(list(GIVEN), length - 1))
+
+
+def random_texts(rng, num):
+    texts = []
+    for _ in range(num):
+        num_names = rng.integers(0, 4)
+        parts = [random_name(rng, rng.integers(2, 6)) for _ in range(num_names)]
+        texts.append(" ".join(parts + ["证书No.", str(rng.integers(1000))]))
+    return texts + ["", "Certificate 2024"]
+
+
+@pytest.mark.parametrize("threshold", [50, 70])
+def test_match_agrees_with_flexible_name_match(threshold):
+    rng = np.random.default_rng(0)
+    texts = random_texts(rng, 80)
+    names = [random_name(rng, rng.integers(2, 5)) for _ in range(20)]
+    # names that occur in the texts, as substrings and with extra characters
+    names += [texts[0].split()[0], texts[1].split()[0][:2], "王伟a"]
+
+    result = NameMatcher(texts).match(names, threshold=threshold)
+    for row, name in enumerate(names):
+        for col, text in enumerate(texts):
+            matched, best, all_matches = flexible_name_match(name, text, threshold)
+            best_score = max([score for _, score in all_matches], default=0)
+            assert result.scores[row, col] == pytest.approx(max(best_score, 0))
+            assert result.matched[row, col] == matched
+            assert result.best_matches[row][col] == best
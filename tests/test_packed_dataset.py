@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from ppocr.data.packed_dataset import (
+    PACKED_RECORD_BYTES,
+    PackedShardReader,
+    PackedShardWriter,
+)
+
+SAMPLES = [(bytes([i]) * (i + 3), "标签{}".format(i)) for i in range(6)]
+
+
+def write_shard(prefix, samples):
+    with PackedShardWriter(prefix) as writer:
+        for image, label in samples:
+            writer.add(image, label)
+    return writer.num_samples
+
+
+def read_shard(prefix):
+    reader = PackedShardReader(prefix)
+    return [
+        (bytes(img), label)
+        for img, label in (reader.get(i) for i in range(reader.num_samples))
+    ]
+
+
+def test_reopen_appends(tmp_path):
+    prefix = str(tmp_path / "shard")
+    assert write_shard(prefix, SAMPLES[:4]) == 4
+    assert write_shard(prefix, SAMPLES[4:]) == 6
+    assert read_shard(prefix) == SAMPLES
+
+
+@pytest.mark.parametrize(
+    "suffix, cut",
+    [
+        (".index", 5),  # partial index record
+        (".data", 1),  # last image only partly written
+        (".label", 1),  # last label only partly written
+    ],
+)
+def test_reopen_drops_interrupted_records(tmp_path, suffix, cut):
+    prefix = str(tmp_path / "shard")
+    write_shard(prefix, SAMPLES[:4])
+    path = prefix + suffix
+    os.truncate(path, os.path.getsize(path) - cut)
+
+    with PackedShardWriter(prefix) as writer:
+        assert writer.num_samples == 3
+        assert os.path.getsize(prefix + ".index") == 3 * PACKED_RECORD_BYTES
+        for image, label in SAMPLES[4:]:
+            writer.add(image, label)
+    assert read_shard(prefix) == SAMPLES[:3] + SAMPLES[4:]
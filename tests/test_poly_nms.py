@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from ppocr.utils import poly_nms
+
+
+def random_boundaries(num, seed=0):
+    # FCE/DRRG-like boundaries: jittered octagons with a trailing score
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, 8, endpoint=False)
+    centers = rng.uniform(0, np.sqrt(num) * 30, (num, 1, 2))
+    radii = rng.uniform(8, 40, (num, 1, 1)) * rng.uniform(0.8, 1.2, (num, 8, 1))
+    points = centers + radii * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    scores = rng.random((num, 1))
+    scores[::10] = scores[1::10][: len(scores[::10])]  # ties
+    return np.concatenate([points.reshape(num, 16), scores], axis=1).tolist()
+
+
+@pytest.mark.skipif(not poly_nms.HAS_SHAPELY2, reason="needs shapely>=2")
+@pytest.mark.parametrize("threshold", [0.1, 0.3, 0.6])
+def test_poly_nms_matches_loop(threshold):
+    boundaries = random_boundaries(150)
+    expected = poly_nms._poly_nms_loop(
+        np.array(sorted(boundaries, key=lambda x: x[-1])), threshold
+    )
+    assert poly_nms.poly_nms(boundaries, threshold) == expected
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from ppocr.data.imaug.rec_img_aug import (
+    REC_NORM_CHUNK,
+    resize_norm_img,
+    resize_norm_img_batch,
+)
+
+
+def random_crops(channels, num, seed=0):
+    rng = np.random.default_rng(seed)
+    crops = []
+    for _ in range(num):
+        h = int(rng.integers(8, 64))
+        w = int(h * rng.uniform(0.3, 15))
+        shape = (h, w) if channels == 1 else (h, w, channels)
+        crops.append(rng.integers(0, 256, shape, dtype=np.uint8))
+    return crops
+
+
+@pytest.mark.parametrize("channels", [1, 3])
+@pytest.mark.parametrize("padding", [True, False])
+def test_batch_matches_resize_norm_img(channels, padding):
+    image_shape = [channels, 48, 320]
+    crops = random_crops(channels, REC_NORM_CHUNK * 2 + 3)
+    batch, valid_ratios = resize_norm_img_batch(crops, image_shape, padding)
+    assert batch.shape == (len(crops), channels, 48, 320)
+    for i, crop in enumerate(crops):
+        expected, valid_ratio = resize_norm_img(crop, image_shape, padding)
+        np.testing.assert_array_equal(batch[i], expected)
+        assert valid_ratios[i] == np.float32(valid_ratio)
+
+
+def test_dynamic_width_uses_widest_crop():
+    image_shape = [3, 48, 320]
+    crops = random_crops(3, 5, seed=1)
+    batch, _ = resize_norm_img_batch(crops, image_shape, dynamic_width=True)
+    max_wh_ratio = max([320 / 48] + [crop.shape[1] / crop.shape[0] for crop in crops])
+    width = int(48 * max_wh_ratio)
+    assert batch.shape[-1] == width
+    for i, crop in enumerate(crops):
+        expected, _ = resize_norm_img(crop, [3, 48, width])
+        np.testing.assert_array_equal(batch[i], expected)
+
+
+def test_empty_batch():
+    batch, valid_ratios = resize_norm_img_batch([], [3, 48, 320])
+    assert batch.shape == (0, 3, 48, 320) and valid_ratios.shape == (0,)
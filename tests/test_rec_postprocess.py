@@ -0,0 +1,75 @@
+import inspect
+
+import numpy as np
+import pytest
+
+from ppocr.postprocess import rec_postprocess
+
+DECODERS = [
+    cls
+    for _, cls in inspect.getmembers(rec_postprocess, inspect.isclass)
+    if issubclass(cls, rec_postprocess.BaseRecLabelDecode)
+    and cls.__module__ == rec_postprocess.__name__
+]
+
+
+@pytest.mark.parametrize("cls", DECODERS, ids=lambda cls: cls.__name__)
+@pytest.mark.parametrize(
+    "batch_size", [2, rec_postprocess.BATCH_DECODE_MIN_ROWS + 2]
+)
+def test_decode_numpy_batch(cls, batch_size):
+    decoder = cls()
+    rng = np.random.default_rng(0)
+    text_index = rng.integers(0, len(decoder.character), (batch_size, 25))
+    text_prob = rng.random((batch_size, 25)).astype(np.float32)
+    assert len(decoder.decode(text_index, text_prob)) == batch_size
+
+
+@pytest.mark.parametrize("is_remove_duplicate", [True, False])
+def test_ctc_decode_batch_matches_loop(is_remove_duplicate):
+    decoder = rec_postprocess.CTCLabelDecode()
+    rng = np.random.default_rng(1)
+    # mostly blanks and repeats, like real CTC output
+    text_index = rng.integers(0, 4, (32, 40)) * rng.integers(0, 2, (32, 40))
+    text_prob = rng.random((32, 40)).astype(np.float32)
+    batch = decoder.decode_batch(text_index, text_prob, is_remove_duplicate)
+    loop = [
+        decoder.decode(text_index[i : i + 1], text_prob[i : i + 1], is_remove_duplicate)
+        for i in range(len(text_index))
+    ]
+    loop = [result[0] for result in loop]
+    assert batch == loop
+
+
+def test_beam_search_batch_matches_single_lines():
+    rng = np.random.default_rng(2)
+    probs = rng.random((4, 20, 8)) ** 4
+    probs[:, :, 0] += 1
+    probs /= probs.sum(axis=2, keepdims=True)
+    char_dict = {char: i + 1 for i, char in enumerate("abcdefg")}
+    trie = rec_postprocess.LexiconTrie(["ab", "abc", "d"], char_dict)
+    for lexicon in [None, trie]:
+        batch = rec_postprocess.ctc_prefix_beam_search_batch(probs, 5, lexicon)
+        single = [rec_postprocess.ctc_prefix_beam_search(p, 5, lexicon) for p in probs]
+        assert batch == single
+    for text_index, _ in rec_postprocess.ctc_prefix_beam_search_batch(probs, 5, trie):
+        assert text_index in [None, [1, 2], [1, 2, 3], [4]]
+
+
+def test_beam_confidence_on_greedy_scale():
+    decoder = rec_postprocess.CTCLabelDecode()
+    rng = np.random.default_rng(3)
+    num_classes = len(decoder.character)
+    # one dominant class per step, so both modes decode the same text
+    best = rng.integers(0, 6, (4, 30)) * rng.integers(0, 2, (4, 30))
+    preds = np.full((4, 30, num_classes), 1e-4, dtype=np.float32)
+    peak = rng.uniform(0.6, 0.99, (4, 30, 1))
+    np.put_along_axis(preds, best[:, :, None], peak, axis=2)
+    preds /= preds.sum(axis=2, keepdims=True)
+    greedy = decoder(preds)
+    decoder.decode_mode = "beam"
+    beam = decoder(preds)
+    assert [text for text, _ in beam] == [text for text, _ in greedy]
+    np.testing.assert_allclose(
+        [conf for _, conf in beam], [conf for _, conf in greedy], rtol=1e-6
+    )